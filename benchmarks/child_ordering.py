@@ -0,0 +1,92 @@
+"""
+Benchmark of the makespan of a suite whose tasks compete for a limit, simulated with the children in their
+original order and after ordering them by critical path.
+
+Usage::
+
+    python benchmarks/child_ordering.py --families 20 --tasks 50 --tokens 10
+"""
+
+import argparse
+import datetime
+import random
+import time
+
+import pyflow
+from pyflow.dependencies import DependencyGraph
+from pyflow.simulation import Simulator
+
+
+def build_suite(families, tasks, tokens, seed=0):
+    """
+    Builds a suite of families of tasks sharing a limit, where the last task of each family starts a chain
+    of post-processing tasks outside of the limit. Returns the suite and the run times of its tasks.
+    """
+
+    rng = random.Random(seed)
+    durations = {}
+
+    with pyflow.Suite("s") as s:
+        limit = pyflow.Limit("l", tokens)
+        for f in range(families):
+            with pyflow.Family("f{}".format(f)):
+                with pyflow.Family("run", inlimits=limit):
+                    run = [pyflow.Task("t{}".format(t)) for t in range(tasks)]
+                with pyflow.Family("post"):
+                    previous = run[-1]
+                    for p in range(rng.randint(1, 10)):
+                        previous = pyflow.Task("p{}".format(p), triggers=previous)
+            for t in run:
+                durations[t.fullname] = rng.randint(60, 600)
+            for t in s.find_node("f{}/post".format(f)).executable_children:
+                durations[t.fullname] = rng.randint(300, 900)
+
+    return s, durations
+
+
+def simulate(label, suite, durations):
+    start = time.perf_counter()
+    report = Simulator(
+        suite, durations=durations, start=datetime.datetime(2020, 1, 1)
+    ).run()
+    elapsed = time.perf_counter() - start
+    print(
+        "{:<32} makespan {:8.0f} s (simulated in {:.3f} s)".format(
+            label, report.makespan, elapsed
+        )
+    )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--families", type=int, default=20)
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--tokens", type=int, default=10)
+    args = parser.parse_args()
+
+    suite, durations = build_suite(args.families, args.tasks, args.tokens)
+    print("{} tasks, {} tokens".format(len(suite.all_tasks), args.tokens))
+
+    before = simulate("original order", suite, durations)
+
+    start = time.perf_counter()
+    critical = DependencyGraph(suite).reorder_children(durations)
+    print(
+        "{:<32} critical path {:8.0f} s, lower bound {:8.0f} s (in {:.3f} s)".format(
+            "reorder_children",
+            critical.makespan,
+            critical.lower_bound,
+            time.perf_counter() - start,
+        )
+    )
+
+    after = simulate("critical path order", suite, durations)
+    assert sorted(before.tasks) == sorted(after.tasks)
+    print(
+        "{:<32} {:8.1f} %".format("gain", 100 * (1 - after.makespan / before.makespan))
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark of the operations on an ecFlow server, against an in-process `FakeServer` with a fixed latency per call:
+suspending, altering and replacing many families one call at a time, as with `replace_on_server`, and in batches
+with a `ClientSession`.
+
+Usage::
+
+    python benchmarks/client_batching.py --families 200 --tasks 50 --latency 0.002
+"""
+
+import argparse
+import time
+
+import pyflow
+
+
+def build(families, tasks):
+    """
+    Builds a suite of families of tasks.
+    """
+
+    with pyflow.Suite("s", host=pyflow.LocalHost()) as s:
+        for i in range(families):
+            with pyflow.Family("f{}".format(i), labels={"info": ""}):
+                for j in range(tasks):
+                    pyflow.Task("t{}".format(j), script="echo {}".format(j))
+    return s
+
+
+def timed(label, server, function):
+    calls = len(server.calls)
+    start = time.perf_counter()
+    function()
+    print(
+        "{:<40} {:10.3f} ms {:8d} calls".format(
+            label, (time.perf_counter() - start) * 1000, len(server.calls) - calls
+        )
+    )
+
+
+def unbatched(suite, families):
+    client = pyflow.importer.ecflow.Client("localhost", "3141")
+    for f in families:
+        client.suspend(f.fullname)
+        client.alter(f.fullname, "change", "label", "info", "updated")
+    for f in families:
+        f.replace_on_server("localhost:3141")
+    for f in families:
+        client.resume(f.fullname)
+
+
+def batched(suite, families):
+    with pyflow.ClientSession("localhost:3141") as session:
+        session.suspend(*families)
+        session.alter(families, "change", "label", "info", "updated")
+        session.replace(*families)
+        session.resume(*families)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--families", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.002)
+    args = parser.parse_args()
+
+    suite = build(args.families, args.tasks)
+    families = [f for f in suite.children if isinstance(f, pyflow.Family)]
+    print("{} tasks".format(len(suite.all_tasks)))
+
+    server = pyflow.FakeServer(latency=args.latency)
+    with server.patch():
+        timed("loading the suite", server, lambda: suite.replace_on_server("localhost"))
+        timed("one call per operation", server, lambda: unbatched(suite, families))
+        timed("batched with a session", server, lambda: batched(suite, families))
+
+
+if __name__ == "__main__":
+    main()
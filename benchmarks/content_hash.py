@@ -0,0 +1,69 @@
+"""
+Benchmark of the content hashes of nodes, comparing two builds of a large suite with `changed_nodes` before and
+after changing a few of its tasks.
+
+Usage::
+
+    python benchmarks/content_hash.py --families 1500 --tasks 100
+"""
+
+import argparse
+import time
+
+import pyflow
+
+
+def build(families, tasks):
+    """
+    Builds a suite of families of tasks, each with variables, labels, events, a script and triggers.
+    """
+
+    with pyflow.Suite("s", host=pyflow.LocalHost()) as s:
+        for i in range(families):
+            with pyflow.Family("f{}".format(i), FAMILY_PARAM=i) as f:
+                for j in range(tasks):
+                    t = pyflow.Task(
+                        "t{}".format(j),
+                        PARAM="value {} {}".format(i, j),
+                        labels={"info": "task {} of family {}".format(j, i)},
+                        events=["done"],
+                        script="echo $PARAM {}".format(j),
+                    )
+                    if j:
+                        t.triggers = f["t{}".format(j - 1)].complete
+    return s
+
+
+def timed(label, function):
+    start = time.perf_counter()
+    result = function()
+    print("{:<40} {:10.3f} ms".format(label, (time.perf_counter() - start) * 1000))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--families", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=100)
+    args = parser.parse_args()
+
+    old = build(args.families, args.tasks)
+    new = build(args.families, args.tasks)
+    print("{} tasks".format(len(new.all_tasks)))
+
+    timed("hashing the first build", lambda: old.content_hash)
+    timed("hashing the second build", lambda: new.content_hash)
+    timed("comparing the unchanged builds", lambda: pyflow.changed_nodes(old, new))
+
+    for i in sorted(set([0, args.families // 2, args.families - 1])):
+        new["f{}".format(i)]["t0"].script = "echo changed"
+    timed("rehashing after changing a few tasks", lambda: new.content_hash)
+    changes = timed(
+        "comparing the changed builds", lambda: pyflow.changed_nodes(old, new)
+    )
+    for path, change in changes:
+        print("    {} {}".format(change, path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark of the loading of a large ecFlow definition file into pyflow suites, reporting the parse throughput and
+the peak memory of the process.
+
+Usage::
+
+    python benchmarks/definition_loading.py --families 100 --tasks 100
+"""
+
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+import pyflow
+
+
+def write_definition(path, families, tasks):
+    """
+    Writes a definition file of a suite of families of tasks, each with variables, events, meters, labels and
+    triggers on earlier tasks.
+    """
+
+    with open(path, "w") as f:
+        f.write("suite s\n  edit ECF_HOME '/tmp'\n  limit l 10\n")
+        for i in range(families):
+            f.write("  family f{}\n".format(i))
+            f.write("    repeat date YMD 20200101 20201231 1\n    inlimit /s:l\n")
+            for j in range(tasks):
+                f.write("    task t{}\n".format(j))
+                f.write("      edit PARAM '{}'\n".format(j))
+                f.write('      label info "task {} of family {}"\n'.format(j, i))
+                f.write("      event 1 done\n      meter progress 0 100 100\n")
+                if j:
+                    f.write(
+                        "      trigger t{} == complete or t{}:done\n".format(
+                            j - 1, j // 2
+                        )
+                    )
+                    f.write("      trigger -a t{}:progress ge 50\n".format(j - 1))
+                if i:
+                    f.write(
+                        "      trigger -a ../f{}/t{} == complete\n".format(i - 1, j)
+                    )
+            f.write("  endfamily\n")
+        f.write("endsuite\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--families", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "suite.def")
+        write_definition(path, args.families, args.tasks)
+        size = os.path.getsize(path)
+
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        loader = pyflow.DefinitionLoader(host=pyflow.LocalHost())
+        (suite,) = loader.load(path)
+        elapsed = time.perf_counter() - start
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(
+        "{} lines, {:.1f} MB loaded in {:.2f} s: {:.0f} lines/s, {:.2f} MB/s".format(
+            loader.lines,
+            size / 1e6,
+            elapsed,
+            loader.lines / elapsed,
+            size / elapsed / 1e6,
+        )
+    )
+    print(
+        "{} tasks, peak memory {:.0f} MB ({:.0f} MB while loading)".format(
+            len(suite.all_tasks), peak / 1024, (peak - before) / 1024
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark of the dependency graph of a suite with a million trigger edges: building the graph, checking it for
+cycles, finding the redundant trigger terms and computing the critical path.
+
+Each task waits for the completion of the previous tasks of its family, so that all its trigger terms but the last
+one are redundant.
+
+Usage::
+
+    python benchmarks/dependency_graph.py --families 100 --tasks 1000 --fan-in 10
+"""
+
+import argparse
+import time
+
+import pyflow
+from pyflow.dependencies import DependencyGraph
+
+
+def build_suite(families, tasks, fan_in):
+    """
+    Builds a suite of families of tasks, each triggered by the completion of the previous `fan_in` tasks.
+    """
+
+    with pyflow.Suite("s", host=pyflow.LocalHost()) as s:
+        for f in range(families):
+            with pyflow.Family("f{}".format(f)):
+                previous = []
+                for t in range(tasks):
+                    task = pyflow.Task("t{}".format(t), script="echo")
+                    if previous:
+                        task.triggers = pyflow.all_complete(previous[-fan_in:])
+                    previous.append(task)
+    return s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--families", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--fan-in", type=int, default=10)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    suite = build_suite(args.families, args.tasks, args.fan_in)
+    print("suite built in {:.3f} s".format(time.perf_counter() - start))
+
+    start = time.perf_counter()
+    graph = DependencyGraph(suite)
+    elapsed = time.perf_counter() - start
+    edges = sum(1 for _ in graph.edges())
+    print(
+        "{} nodes, {} edges, graph built in {:.3f} s".format(len(graph), edges, elapsed)
+    )
+
+    for name, function in (
+        ("check", graph.check),
+        ("redundant_triggers", graph.redundant_triggers),
+        ("critical_path", lambda: graph.critical_path(60)),
+    ):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        if name == "redundant_triggers":
+            name += " ({} terms)".format(sum(len(r) for r in result.values()))
+        print("{:<36} {:.3f} s".format(name, elapsed))
+
+
+if __name__ == "__main__":
+    main()
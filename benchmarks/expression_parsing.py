@@ -0,0 +1,83 @@
+"""
+Benchmark of the parsing of ecFlow trigger expressions into pyflow expressions, on a corpus generated from the
+triggers of a large suite.
+
+Usage::
+
+    python benchmarks/expression_parsing.py --families 100 --tasks 1000
+"""
+
+import argparse
+import random
+import time
+
+import pyflow
+
+
+def build_suite(families, tasks, seed=0):
+    """
+    Builds a suite of families of tasks, each triggered by the status, event, meter or repeat of earlier tasks.
+    """
+
+    rng = random.Random(seed)
+
+    with pyflow.Suite("s") as s:
+        previous = []
+        for f in range(families):
+            with pyflow.Family("f{}".format(f)) as family:
+                pyflow.RepeatDate("YMD", 20200101, 20201231)
+                for t in range(tasks):
+                    task = pyflow.Task("t{}".format(t))
+                    task.add_node(pyflow.Event("e"))
+                    task.add_node(pyflow.Meter("m", 0, 100))
+                    if previous:
+                        a, b = rng.choice(previous), rng.choice(previous)
+                        kind = rng.randrange(4)
+                        if kind == 0:
+                            task.triggers = a.complete
+                        elif kind == 1:
+                            task.triggers = a.e | b.aborted
+                        elif kind == 2:
+                            task.triggers = (a.m >= rng.randint(0, 100)) & ~b.complete
+                        else:
+                            task.triggers = (
+                                family.YMD.julian % 7 == 0
+                            ) | a.complete & b.complete
+                    previous.append(task)
+                    if len(previous) > 50:
+                        previous.pop(0)
+
+    return s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--families", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=1000)
+    args = parser.parse_args()
+
+    suite = build_suite(args.families, args.tasks)
+    corpus = [
+        (t, t.triggers.value.simplify().generate_expression(t))
+        for t in suite.all_tasks
+        if "_trigger" in t._nodes
+    ]
+    size = sum(len(text) for _, text in corpus)
+    print("{} expressions, {:.1f} MB".format(len(corpus), size / 1e6))
+
+    expressions = pyflow.ExpressionParser()
+    start = time.perf_counter()
+    parsed = [expressions.parse(text, t) for t, text in corpus]
+    elapsed = time.perf_counter() - start
+    print(
+        "parsed in {:.3f} s, {:.0f} expressions/s, {:.1f} MB/s".format(
+            elapsed, len(corpus) / elapsed, size / elapsed / 1e6
+        )
+    )
+
+    for (t, text), e in zip(corpus, parsed):
+        assert e.simplify().generate_expression(t) == text, text
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark of the loading of a large JSON suite description, parsed as a whole and passed to the suite, streamed
+with `load_json`, and as JSON Lines with `load_json_lines`, reporting times and peak traced memory.
+
+Usage::
+
+    python benchmarks/json_loading.py --families 100 --tasks 100
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pyflow
+
+
+def write_documents(directory, families, tasks):
+    """
+    Writes the same suite as a JSON document and as JSON Lines, returning their paths.
+    """
+
+    def task(i, j):
+        return {
+            "PARAM": "value {} {}".format(i, j),
+            "labels": {"info": "task {} of family {}".format(j, i)},
+            "meters": {"progress": [0, 100]},
+            "triggers": {"complete": "t{}".format(j - 1)} if j else None,
+        }
+
+    def clean(d):
+        return dict((k, v) for k, v in d.items() if v is not None)
+
+    document = os.path.join(directory, "suite.json")
+    lines = os.path.join(directory, "suite.jsonl")
+    with open(document, "w") as f, open(lines, "w") as g:
+        f.write('{"FOO": 42')
+        g.write(json.dumps({"path": "/s", "FOO": 42}) + "\n")
+        for i in range(families):
+            f.write(', "f{}": {{"limits": {{"l": 10}}'.format(i))
+            family = {"path": "/s/f{}".format(i), "type": "family", "limits": {"l": 10}}
+            g.write(json.dumps(family) + "\n")
+            for j in range(tasks):
+                record = clean(task(i, j))
+                f.write(', "t{}": {}'.format(j, json.dumps(record)))
+                record["path"] = "/s/f{}/t{}".format(i, j)
+                g.write(json.dumps(record) + "\n")
+            f.write("}")
+        f.write("}")
+    return document, lines
+
+
+def measure(label, function, size):
+    tracemalloc.start()
+    start = time.perf_counter()
+    suite = function()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        "{:<16} {:6.2f} s, {:6.2f} MB/s, peak {:6.1f} MB, {} tasks".format(
+            label, elapsed, size / elapsed / 1e6, peak / 1e6, len(suite.all_tasks)
+        )
+    )
+    return suite
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--families", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=100)
+    args = parser.parse_args()
+    host = pyflow.LocalHost()
+
+    with tempfile.TemporaryDirectory() as directory:
+        document, lines = write_documents(directory, args.families, args.tasks)
+        size = os.path.getsize(document)
+        print("{:.1f} MB document".format(size / 1e6))
+
+        def whole():
+            with open(document) as f:
+                return pyflow.Suite("s", host=host, json=json.load(f))
+
+        measure("json.load", whole, size)
+        measure(
+            "load_json",
+            lambda: pyflow.load_json(pyflow.Suite("s", host=host), document),
+            size,
+        )
+        measure(
+            "load_json_lines",
+            lambda: pyflow.load_json_lines(lines, host=host)[0],
+            os.path.getsize(lines),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Memory used by synthetic suites of various shapes and sizes, by class of nodes and attributes, scripts and
+expressions, and by subtree, optionally failing when a suite exceeds a memory budget, e.g. in continuous integration.
+
+Usage::
+
+    python benchmarks/memory_report.py --shapes ensemble --tasks 100000
+    python benchmarks/memory_report.py --tasks 10000 --budget 200MiB
+"""
+
+import argparse
+import sys
+import time
+
+from suite_phases import SHAPES
+
+import pyflow
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--shapes", nargs="+", choices=sorted(SHAPES), default=sorted(SHAPES)
+    )
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--budget", help="the memory budget of each suite, e.g. 1GiB")
+    args = parser.parse_args()
+
+    failed = False
+    for shape in args.shapes:
+        suite = SHAPES[shape](args.tasks)
+        start = time.perf_counter()
+        report = pyflow.MemoryReport(suite)
+        print("{} suite of {} tasks".format(shape, args.tasks))
+        print(report)
+        print("Measured in {:.3f} s\n".format(time.perf_counter() - start))
+        if args.budget:
+            try:
+                report.check(args.budget)
+            except pyflow.MemoryBudgetError as e:
+                print("FAILED: {} ({})\n".format(e, shape))
+                failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
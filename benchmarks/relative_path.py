@@ -0,0 +1,110 @@
+"""
+Benchmark of the relative paths generated for trigger references, on a suite with dense
+cross-family triggers.
+
+Usage::
+
+    python benchmarks/relative_path.py --families 50 --tasks 100 --fan-in 10
+"""
+
+import argparse
+import os
+import random
+import time
+
+import pyflow
+from pyflow.expressions import generation_cache
+
+
+def build_suite(families, tasks, fan_in, seed=0):
+    """
+    Builds a suite of nested families, where the tasks of each family are triggered by the same
+    `fan_in` tasks, picked randomly in the other families.
+    """
+
+    rng = random.Random(seed)
+
+    with pyflow.Suite("s") as s:
+        all_tasks = []
+        for f in range(families):
+            with pyflow.Family("f{}".format(f)):
+                with pyflow.Family("g{}".format(f % 7)):
+                    all_tasks.append(
+                        [pyflow.Task("t{}".format(t)) for t in range(tasks)]
+                    )
+
+        for f, family_tasks in enumerate(all_tasks):
+            others = [t for g, ts in enumerate(all_tasks) if g != f for t in ts]
+            upstream = rng.sample(others, fan_in)
+            for t in family_tasks:
+                t.triggers = pyflow.all_complete(upstream)
+
+    return s
+
+
+def references(suite):
+    """Returns the list of (referenced node, trigger node) pairs of the suite."""
+
+    result = []
+    for t in suite.all_tasks:
+        for trigger in t.triggers:
+            for term in trigger.value._operands:
+                result.append((term._left._node, t))
+    return result
+
+
+def os_relative_path(node, context):
+    """The former implementation, based on os.path.relpath."""
+
+    if node.suite is not context.suite:
+        return node.fullname
+    f = os.path.relpath(node.fullname, context.parent.fullname)
+    return "./" + f if f[0].isdigit() else f
+
+
+def timed(label, func, count):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(
+        "{:<32} {:8.3f} s {:10.2f} us/reference".format(
+            label, elapsed, 1e6 * elapsed / count
+        )
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--families", type=int, default=50)
+    parser.add_argument("--tasks", type=int, default=100)
+    parser.add_argument("--fan-in", type=int, default=10)
+    args = parser.parse_args()
+
+    suite = build_suite(args.families, args.tasks, args.fan_in)
+    refs = references(suite)
+    print("{} tasks, {} trigger references".format(len(suite.all_tasks), len(refs)))
+
+    expected = timed(
+        "os.path.relpath",
+        lambda: [os_relative_path(n, c) for n, c in refs],
+        len(refs),
+    )
+    uncached = timed(
+        "relative_path (uncached)",
+        lambda: [n.relative_path(c) for n, c in refs],
+        len(refs),
+    )
+    with generation_cache():
+        cached = timed(
+            "relative_path (cached)",
+            lambda: [n.relative_path(c) for n, c in refs],
+            len(refs),
+        )
+    assert expected == uncached == cached
+
+    timed("generate_node", suite.generate_node, len(refs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark of the offline simulation of suites of various shapes and sizes, from indexing the suite and compiling its
+expressions to running the simulation to completion, reporting the number of simulated runs per second. The tasks of
+the ensemble shape run once per day of their year long repeat.
+
+Usage::
+
+    python benchmarks/simulation.py --shapes wide trigger-dense --tasks 100000
+    python benchmarks/simulation.py --profile --shapes trigger-dense
+"""
+
+import argparse
+import cProfile
+import pstats
+import time
+
+from suite_phases import SHAPES
+
+from pyflow.simulation import Simulator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--shapes", nargs="+", choices=sorted(SHAPES), default=sorted(SHAPES)
+    )
+    parser.add_argument("--tasks", nargs="+", type=int, default=[10000, 100000])
+    parser.add_argument(
+        "--profile", action="store_true", help="print the most expensive functions"
+    )
+    args = parser.parse_args()
+
+    for shape in args.shapes:
+        for tasks in args.tasks:
+            suite = SHAPES[shape](tasks)
+            simulator = Simulator(suite, durations=60)
+
+            profile = cProfile.Profile() if args.profile else None
+            if profile is not None:
+                profile.enable()
+            start = time.perf_counter()
+            report = simulator.run()
+            elapsed = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+
+            runs = sum(h["runs"] for h in report.hosts.values())
+            print(
+                "{:<16} {:>8} {:10.3f} s {:>10} runs {:10.0f} runs/s".format(
+                    shape,
+                    tasks,
+                    elapsed,
+                    runs,
+                    runs / elapsed,
+                )
+            )
+            if profile is not None:
+                pstats.Stats(profile).sort_stats("tottime").print_stats(15)
+
+
+if __name__ == "__main__":
+    main()
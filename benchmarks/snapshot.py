@@ -0,0 +1,116 @@
+"""
+Benchmark of reloading a built suite from a snapshot with `load_snapshot`, compared to building it again from
+Python code, reporting times and the size of the snapshot.
+
+Usage::
+
+    python benchmarks/snapshot.py --families 1000 --tasks 100
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import time
+
+import pyflow
+
+
+def build(families, tasks):
+    """
+    Builds a suite of families of tasks, each with variables, labels, events, meters, a script and triggers on
+    earlier tasks.
+    """
+
+    with pyflow.Suite("s", host=pyflow.LocalHost()) as s:
+        limit = pyflow.Limit("l", 10)
+        previous = None
+        for i in range(families):
+            with pyflow.Family("f{}".format(i), inlimits=limit) as f:
+                pyflow.RepeatDate("YMD", 20200101, 20201231)
+                for j in range(tasks):
+                    t = pyflow.Task(
+                        "t{}".format(j),
+                        PARAM="value {} {}".format(i, j),
+                        labels={"info": "task {} of family {}".format(j, i)},
+                        events=["done"],
+                        meters={"progress": (0, 100)},
+                        script="echo {} {}".format(i, j),
+                    )
+                    if j:
+                        t.triggers = (
+                            f["t{}".format(j - 1)].complete
+                            | f["t{}".format(j // 2)].done
+                        )
+                    if previous is not None:
+                        t.triggers &= previous["t{}".format(j)].complete
+            previous = f
+    return s
+
+
+class Timer:
+    """
+    Measures the time taken by a block, and the part of it spent in garbage collections.
+    """
+
+    def __init__(self):
+        self.elapsed = 0.0
+        self.collecting = 0.0
+
+    def _callback(self, phase, info):
+        if phase == "start":
+            self._collection = time.perf_counter()
+        else:
+            self.collecting += time.perf_counter() - self._collection
+
+    def __enter__(self):
+        gc.callbacks.append(self._callback)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.elapsed = time.perf_counter() - self._start
+        gc.callbacks.remove(self._callback)
+
+    def __str__(self):
+        return "{:6.2f} s ({:.2f} s collecting garbage)".format(
+            self.elapsed, self.collecting
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--families", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=100)
+    args = parser.parse_args()
+
+    with Timer() as built:
+        suite = build(args.families, args.tasks)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "suite.snapshot")
+        with Timer() as saved:
+            pyflow.save_snapshot(suite, path)
+        size = os.path.getsize(path)
+
+        # Collect the built suite, so that its collection is not counted in the loading time
+        del suite
+        gc.collect()
+
+        with Timer() as loaded:
+            suite = pyflow.load_snapshot(path)
+
+    print("{} tasks, {:.1f} MB snapshot".format(len(suite.all_tasks), size / 1e6))
+    print("built in  {}".format(built))
+    print("saved in  {}".format(saved))
+    print("loaded in {}".format(loaded))
+    print(
+        "loading is {:.0f}x faster than building, {:.0f}x without garbage collections".format(
+            built.elapsed / loaded.elapsed,
+            (built.elapsed - built.collecting) / (loaded.elapsed - loaded.collecting),
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark of `diff_suites`, comparing two builds of a large suite after changing a few variables, triggers and
+scripts, and adding and removing a few tasks.
+
+Usage::
+
+    python benchmarks/suite_diff.py --families 1500 --tasks 100
+"""
+
+import argparse
+import time
+
+import pyflow
+
+
+def build(families, tasks):
+    """
+    Builds a suite of families of tasks, each with variables, labels, events, a script and triggers.
+    """
+
+    with pyflow.Suite("s", host=pyflow.LocalHost()) as s:
+        for i in range(families):
+            with pyflow.Family("f{}".format(i), FAMILY_PARAM=i) as f:
+                for j in range(tasks):
+                    t = pyflow.Task(
+                        "t{}".format(j),
+                        PARAM="value {} {}".format(i, j),
+                        labels={"info": "task {} of family {}".format(j, i)},
+                        events=["done"],
+                        script="echo $PARAM {}".format(j),
+                    )
+                    if j:
+                        t.triggers = f["t{}".format(j - 1)].complete
+    return s
+
+
+def timed(label, function):
+    start = time.perf_counter()
+    result = function()
+    print("{:<40} {:10.3f} ms".format(label, (time.perf_counter() - start) * 1000))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--families", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=100)
+    args = parser.parse_args()
+
+    old = build(args.families, args.tasks)
+    new = build(args.families, args.tasks)
+    print("{} tasks".format(len(new.all_tasks)))
+
+    timed("hashing the first build", lambda: old.content_hash)
+    timed("diffing the unchanged builds", lambda: pyflow.diff_suites(old, new))
+
+    for i in sorted(set([0, args.families // 2, args.families - 1])):
+        f = new["f{}".format(i)]
+        f.FAMILY_PARAM = "changed"
+        f["t0"].script = "echo changed"
+        if args.tasks > 1:
+            f["t1"].triggers = f["t0"].aborted
+        f.remove_node(f["t{}".format(args.tasks - 1)])
+        with f:
+            pyflow.Task("extra")
+    diff = timed("diffing the changed builds", lambda: pyflow.diff_suites(old, new))
+    print("{} changes, {} operations".format(len(diff.changes), len(diff.operations)))
+    for operation in diff.operations:
+        print("    ecflow_client {}".format(operation))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Size and server load of synthetic suites of various shapes and sizes: numbers of nodes and attributes, depths and
+fan-outs, trigger and complete expressions and their references, duplicated variables, and the estimated size of
+the definition, with the time taken to compute them.
+
+Usage::
+
+    python benchmarks/suite_metrics.py --shapes ensemble trigger-dense --tasks 150000
+    python benchmarks/suite_metrics.py --json metrics.json
+"""
+
+import argparse
+import json
+import time
+
+from suite_phases import SHAPES
+
+import pyflow
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--shapes", nargs="+", choices=sorted(SHAPES), default=sorted(SHAPES)
+    )
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", help="save the summaries to a JSON file")
+    args = parser.parse_args()
+
+    summaries = {}
+    for shape in args.shapes:
+        suite = SHAPES[shape](args.tasks)
+        start = time.perf_counter()
+        metrics = pyflow.SuiteMetrics(suite)
+        elapsed = time.perf_counter() - start
+        print("{} suite of {} tasks".format(shape, args.tasks))
+        print(metrics)
+        print("Computed in {:.3f} s\n".format(elapsed))
+        summaries[shape] = dict(metrics.summary(args.top), seconds=elapsed)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summaries, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Benchmark of the phases of building and deploying suites of various shapes and sizes: tree construction,
+`generate_node`, `str` of the definition, `check_definition`, `Task.generate_script`, `deploy_suite` to a temporary
+directory and `draw_graph`, reporting the time and (with --memory) the peak memory allocated by each phase.
+
+The results can be saved as JSON and compared with an earlier run, failing when a phase got slower than allowed.
+
+Usage::
+
+    python benchmarks/suite_phases.py --shapes wide deep --tasks 1000 10000 100000
+    python benchmarks/suite_phases.py --memory --json results.json
+    python benchmarks/suite_phases.py --baseline results.json --tolerance 0.2
+"""
+
+import argparse
+import gc
+import json
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pyflow
+
+
+def _suite():
+    return pyflow.Suite(
+        "s",
+        host=pyflow.LocalHost(),
+        ECF_FILES="/benchmark/files",
+        ECF_HOME="/benchmark",
+    )
+
+
+def wide(tasks):
+    """
+    A single family of tasks.
+    """
+
+    with _suite() as s:
+        with pyflow.Family("f"):
+            for i in range(tasks):
+                pyflow.Task("t{}".format(i), script="echo {}".format(i))
+    return s
+
+
+def deep(tasks, depth=20):
+    """
+    Branches of nested families, `depth` deep, with a task at each level.
+    """
+
+    with _suite() as s:
+        for b in range(max(1, tasks // depth)):
+            parents = []
+            for level in range(depth):
+                f = pyflow.Family("f{}".format(b if level == 0 else level))
+                f.__enter__()
+                parents.append(f)
+                pyflow.Task("t{}_{}".format(b, level), script="echo {}".format(level))
+            for f in reversed(parents):
+                f.__exit__(None, None, None)
+    return s
+
+
+def trigger_dense(tasks, width=100, fan_in=5):
+    """
+    Families of tasks each triggered by the completion or an event of the previous `fan_in` tasks.
+    """
+
+    with _suite() as s:
+        for i in range(max(1, tasks // width)):
+            with pyflow.Family("f{}".format(i)):
+                previous = []
+                for j in range(width):
+                    t = pyflow.Task("t{}".format(j), events=["ready"], script="echo")
+                    if previous:
+                        t.triggers = pyflow.all_complete(previous[-fan_in:]) | (
+                            previous[-1].ready
+                        )
+                    previous.append(t)
+    return s
+
+
+def variable_heavy(tasks, width=100, variables=20):
+    """
+    Families of tasks each with `variables` variables, some of them shadowing the family's.
+    """
+
+    with _suite() as s:
+        for i in range(max(1, tasks // width)):
+            family = dict(("FAMILY_{}".format(k), k) for k in range(variables))
+            with pyflow.Family("f{}".format(i), **family):
+                for j in range(width):
+                    values = dict(
+                        ("VAR_{}".format(k), "{}-{}".format(j, k))
+                        for k in range(variables)
+                    )
+                    values["FAMILY_0"] = j
+                    pyflow.Task(
+                        "t{}".format(j), script="echo $VAR_0 $FAMILY_0", **values
+                    )
+    return s
+
+
+def ensemble(tasks, steps=24):
+    """
+    Ensemble members, each a family of forecast steps triggered by the previous step and limited by a shared
+    limit, under a repeated family.
+    """
+
+    with _suite() as s:
+        limit = pyflow.Limit("members", 10)
+        with pyflow.Family("main") as main:
+            pyflow.RepeatDate("YMD", 20240101, 20241231)
+            for m in range(max(1, tasks // steps)):
+                with pyflow.Family("member{}".format(m), MEMBER=m) as f:
+                    f.inlimits = limit
+                    previous = None
+                    for step in range(steps):
+                        t = pyflow.Task(
+                            "step{}".format(step),
+                            STEP=step * 6,
+                            labels={"info": ""},
+                            meters=[("progress", 0, 100)],
+                            script="echo $MEMBER $STEP $YMD",
+                        )
+                        if previous is not None:
+                            t.triggers = previous.complete
+                        previous = t
+            main.triggers = main.YMD.julian >= 0
+    return s
+
+
+SHAPES = {
+    "wide": wide,
+    "deep": deep,
+    "trigger-dense": trigger_dense,
+    "variable-heavy": variable_heavy,
+    "ensemble": ensemble,
+}
+
+
+# Returned by phases which cannot run, e.g. for lack of optional dependencies
+SKIPPED = object()
+
+
+def _draw_graph(suite):
+    try:
+        suite.draw_graph()
+    except ImportError:
+        # graphviz is optional
+        return SKIPPED
+
+
+def _deploy(suite):
+    directory = tempfile.mkdtemp(prefix="pyflow-benchmark-")
+    try:
+        suite.deploy_suite(path=directory)
+    finally:
+        shutil.rmtree(directory)
+
+
+PHASES = [
+    ("generate_node", lambda s: s.generate_node()),
+    ("str(defs)", lambda s: str(s.ecflow_definition())),
+    ("check_definition", lambda s: s.check_definition()),
+    ("generate_script", lambda s: [t.generate_script() for t in s.all_tasks]),
+    ("deploy_suite", _deploy),
+    ("draw_graph", _draw_graph),
+]
+
+
+def measure(function, memory):
+    """
+    Runs a function, returning its result, its duration in seconds, and, if `memory`, the peak memory allocated
+    while running it again under tracemalloc, in bytes.
+    """
+
+    gc.collect()
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+
+    peak = None
+    if memory and result is not SKIPPED:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            function()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run(shape, tasks, phases, memory):
+    """
+    Benchmarks the phases for a suite of the given shape and size.
+
+    Returns:
+        *list*: The (shape, tasks, phase, seconds, peak bytes) of the phases run.
+    """
+
+    results = []
+
+    def record(phase, elapsed, peak):
+        results.append(
+            {
+                "shape": shape,
+                "tasks": tasks,
+                "phase": phase,
+                "seconds": elapsed,
+                "peak": peak,
+            }
+        )
+        print(
+            "{:<16} {:>8} {:<18} {:10.3f} s {:>12}".format(
+                shape,
+                tasks,
+                phase,
+                elapsed,
+                "" if peak is None else "{:.1f} MiB".format(peak / 2**20),
+            )
+        )
+
+    suite, elapsed, peak = measure(lambda: SHAPES[shape](tasks), memory)
+    if "construction" in phases:
+        record("construction", elapsed, peak)
+
+    for phase, function in PHASES:
+        if phase in phases:
+            result, elapsed, peak = measure(lambda: function(suite), memory)
+            if result is SKIPPED:
+                print("{:<16} {:>8} {:<18} skipped".format(shape, tasks, phase))
+                continue
+            record(phase, elapsed, peak)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compares results with a baseline, returning the phases slower than the baseline by more than `tolerance`.
+    """
+
+    previous = dict(
+        ((r["shape"], r["tasks"], r["phase"]), r["seconds"]) for r in baseline
+    )
+    slower = []
+    for r in results:
+        before = previous.get((r["shape"], r["tasks"], r["phase"]))
+        if before and r["seconds"] > before * (1 + tolerance):
+            slower.append((r, before))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--shapes", nargs="+", choices=sorted(SHAPES), default=sorted(SHAPES)
+    )
+    parser.add_argument("--tasks", nargs="+", type=int, default=[1000, 10000])
+    parser.add_argument(
+        "--phases",
+        nargs="+",
+        choices=["construction"] + [p for p, _ in PHASES],
+        default=["construction"] + [p for p, _ in PHASES],
+    )
+    parser.add_argument(
+        "--memory", action="store_true", help="measure the peak memory of each phase"
+    )
+    parser.add_argument("--json", help="save the results to a JSON file")
+    parser.add_argument(
+        "--baseline", help="compare with the results saved in a JSON file"
+    )
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = []
+    for shape in args.shapes:
+        for tasks in args.tasks:
+            results += run(shape, tasks, args.phases, args.memory)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = compare(results, json.load(f), args.tolerance)
+        for r, before in slower:
+            print(
+                "SLOWER: {shape} {tasks} {phase}: {seconds:.3f} s".format(**r)
+                + ", was {:.3f} s".format(before)
+            )
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark of the evaluation of the triggers of a large suite against a snapshot of its state, with compiled
+closures and with NumPy.
+
+Usage::
+
+    python benchmarks/trigger_evaluation.py --families 1000 --tasks 1000
+"""
+
+import argparse
+import random
+import time
+
+import pyflow
+from pyflow.evaluation import CompiledTriggers, StateTable
+
+
+def build_suite(families, tasks, seed=0):
+    """
+    Builds a suite of families of tasks, each triggered by the status, event or meter of earlier tasks.
+    """
+
+    rng = random.Random(seed)
+
+    with pyflow.Suite("s") as s:
+        for f in range(families):
+            with pyflow.Family("f{}".format(f)):
+                pyflow.RepeatDate("YMD", 20200101, 20201231)
+                previous = []
+                for t in range(tasks):
+                    task = pyflow.Task("t{}".format(t))
+                    task.add_node(pyflow.Event("e"))
+                    task.add_node(pyflow.Meter("m", 0, 100))
+                    if previous:
+                        a, b = rng.choice(previous), rng.choice(previous)
+                        kind = rng.randrange(4)
+                        if kind == 0:
+                            task.triggers = a.complete
+                        elif kind == 1:
+                            task.triggers = a.e | b.aborted
+                        elif kind == 2:
+                            task.triggers = (a.m >= rng.randint(0, 100)) & b.complete
+                        else:
+                            task.triggers = (a.parent.YMD.julian % 7 == 0) | a.complete
+                    previous.append(task)
+
+    return s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--families", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    suite = build_suite(args.families, args.tasks)
+    table = StateTable(suite)
+    print("{} nodes built in {:.3f} s".format(len(table), time.perf_counter() - start))
+
+    rng = random.Random(1)
+    for i in range(len(table)):
+        table.states[i] = rng.randrange(1, 6)
+    for k in range(len(table.events)):
+        table.events[k] = rng.randrange(2)
+    for k in range(len(table.meters)):
+        table.meters[k] = rng.randrange(101)
+
+    eligible = {}
+    for backend in ("python", "numpy"):
+        start = time.perf_counter()
+        triggers = CompiledTriggers(table, backend=backend)
+        compiled = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            eligible[backend] = triggers.eligible(table)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print(
+            "{:<8} compiled in {:.3f} s, evaluated in {:.3f} s ({} eligible)".format(
+                backend, compiled, elapsed, len(eligible[backend])
+            )
+        )
+
+    assert eligible["python"] == eligible["numpy"]
+
+
+if __name__ == "__main__":
+    main()
@@ -30,14 +30,27 @@ from .attributes import (
     Trigger,
     Variable,
 )
+from .cache import BuildCache, CachedBuild, CacheStats
+from .client import ClientError, ClientSession, ClientStats
 from .configurator import (
     Configuration,
     ConfigurationList,
     Configurator,
     FileConfiguration,
 )
+from .dependencies import CriticalPath, DependencyCycleError, DependencyGraph
 from .deployment import DeployGitRepo, Notebook
-from .expressions import Deferred, all_complete, sequence
+from .diff import Change, Operation, SuiteDiff, diff_suites
+from .evaluation import CompiledTriggers, StateTable
+from .execution import ExecutionReport, JobCreationError, LocalExecutor
+from .expressions import (
+    Deferred,
+    ExpressionParser,
+    ExpressionSyntaxError,
+    all_complete,
+    expression_from_string,
+    sequence,
+)
 from .extern import (
     Extern,
     ExternEvent,
@@ -47,12 +60,27 @@ from .extern import (
     ExternTask,
     ExternYMD,
 )
+from .fake import FakeClient, FakeServer
 from .header import FileHeader, FileTail, Header, InlineCodeHeader
+from .hoisting import hoist_attributes
 from .host import Host, LocalHost, NullHost, PBSHost, SLURMHost, SSHHost, TroikaHost
+from .loader import (
+    DefinitionError,
+    DefinitionLoader,
+    load_definition,
+    load_json,
+    load_json_lines,
+)
+from .memory import MemoryBudgetError, MemoryReport
+from .metrics import SuiteMetrics
+from .monitor import StateChange, StateMonitor
 from .multiple import Events, Families, InLimits, Limits, Tasks
-from .nodes import AnchorFamily, Family, Suite, Task, ecflow_name
+from .nodes import AnchorFamily, Family, Suite, Task, changed_nodes, ecflow_name
+from .profiling import Profiler
 from .resource import DataResource, FileResource, Resources, WebResource
 from .script import FileScript, PythonScript, Script, TemplateFileScript, TemplateScript
+from .simulation import SimulationReport, Simulator, duration_model
+from .snapshot import SnapshotError, load_snapshot, save_snapshot
 
 try:
     # NOTE: the `_version.py` file must not be present in the git repository
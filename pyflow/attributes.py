@@ -22,6 +22,7 @@ from .expressions import (
     Sub,
     expression_from_json,
     make_expression,
+    memoized_relative_path,
 )
 from .importer import ecflow
 from .state import aborted, active, complete, queued, submitted, suspended, unknown
@@ -39,6 +40,7 @@ class Attribute(Base):
     def children(self):
         return []
 
+    @memoized_relative_path
     def relative_path(self, other):
         """
         Returns relative path of the attribute.
@@ -827,6 +829,31 @@ def make_variable(node, name, value):
     raise ValueError("Cannot convert", value, type(value), "into variable or repeat")
 
 
+def find_limit(node, value):
+    # The limit of an inlimit of the node, given as a limit, by name in the node and its parents, or by path
+    if isinstance(value, Limit):
+        return value
+
+    value = str(value)
+    if ":" in value:
+        path, name = value.rsplit(":", 1)
+        try:
+            candidates = [node.suite.find_node(path)]
+        except (AssertionError, AttributeError, KeyError):
+            return None
+    else:
+        name, candidates = value, []
+        while getattr(node, "_nodes", None) is not None:
+            candidates.append(node)
+            node = node.parent
+
+    for candidate in candidates:
+        limit = candidate._nodes.get(name)
+        if isinstance(limit, Limit):
+            return limit
+    return None
+
+
 class _Trigger(Attribute):
     def _build(self, ecflow_parent):
         simplified = make_expression(self.value).simplify()
@@ -958,6 +985,12 @@ class InLimit(Attribute):
     def __init__(self, value):
         super().__init__("_" + str(value), value)
 
+    @property
+    def limit(self):
+        """Limit_: The limit object, looked up by name in the parent nodes or by path in the suite, if not given."""
+
+        return find_limit(self.parent, self.value)
+
     def _build(self, ecflow_parent):
         value = self.value
         if NO_INLIMIT:
@@ -0,0 +1,383 @@
+from __future__ import absolute_import
+
+import hashlib
+import json
+import os
+import sys
+
+from .deployment import Deployment
+from .nodes import Suite
+from .script import FileScript, Script
+
+# Bumped whenever the layout of the cache entries changes
+_FORMAT = 1
+
+
+def _digest(path):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _script_files(script, files):
+    if isinstance(script, FileScript):
+        files.add(os.path.abspath(script._filename))
+    if isinstance(script, Script):
+        for value in script._values:
+            _script_files(value, files)
+    elif isinstance(script, (list, tuple)):
+        for value in script:
+            _script_files(value, files)
+
+
+def configuration_files(configurator):
+    """
+    Returns the configuration files imported to build the configurations of a `Configurator`.
+
+    Parameters:
+        configurator(Configurator): The configurator, built from the command line arguments.
+
+    Returns:
+        *list*: The paths of the configuration files, sorted.
+    """
+
+    files = set()
+    for name, _ in configurator.configurations():
+        configurations = getattr(configurator, name)
+        if not isinstance(configurations, list):
+            configurations = [configurations]
+        for configuration in configurations:
+            filename = getattr(configuration, "configuration_file", None)
+            if filename is not None:
+                files.add(os.path.abspath(filename))
+    return sorted(files)
+
+
+class _Recorder(Deployment):
+    """
+    A deployment target keeping the deployed files in memory, along with the files they were copied from.
+    """
+
+    def __init__(self, suite, **options):
+        super().__init__(suite, **options)
+        self.scripts = {}
+        self.sources = set()
+
+    def copy(self, source, target):
+        super().copy(source, target)
+        self.sources.add(os.path.abspath(source))
+        with open(source, "r") as f:
+            self.scripts[target] = f.read()
+
+    def save(self, source, target):
+        super().save(source, target)
+        if isinstance(source, list):
+            source = "\n".join(source)
+        if isinstance(source, bytes):
+            source = source.decode("utf-8")
+        self.scripts[target] = source
+
+
+class CacheStats:
+    """
+    Statistics of the lookups in a `BuildCache`.
+
+    Attributes:
+        hits(int): The lookups served from the cache.
+        misses(int): The lookups without an entry for their fingerprint.
+        stale(int): The lookups with an entry for their fingerprint, discarded as the source of a script changed.
+        stores(int): The builds stored in the cache.
+        evictions(int): The entries evicted to keep the cache within its bounds.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @property
+    def lookups(self):
+        """*int*: The number of lookups."""
+        return self.hits + self.misses + self.stale
+
+    @property
+    def hit_ratio(self):
+        """*float*: The fraction of the lookups served from the cache."""
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def __repr__(self):
+        return "CacheStats(hits=%d, misses=%d, stale=%d, stores=%d, evictions=%d)" % (
+            self.hits,
+            self.misses,
+            self.stale,
+            self.stores,
+            self.evictions,
+        )
+
+
+class CachedBuild:
+    """
+    A generated suite, as stored in a `BuildCache`.
+
+    Attributes:
+        definition(str): The **ecFlow** definition of the suite.
+        scripts(dict): The content of the deployed files (scripts, manuals and headers) by target path.
+        files(str): The ECF_FILES path of the suite, that the deployed scripts are relative to.
+        suite(Suite_): The suite, if it was built rather than found in the cache, otherwise `None`.
+    """
+
+    def __init__(self, definition, scripts, files, suite=None):
+        self.definition = definition
+        self.scripts = scripts
+        self.files = files
+        self.suite = suite
+
+    @property
+    def cached(self):
+        """*bool*: Whether the build was found in the cache."""
+        return self.suite is None
+
+    def deploy(self, path=None):
+        """
+        Writes the deployed files, skipping the ones that are already up to date.
+
+        Parameters:
+            path(str): The target directory (by default ECF_FILES), as for `FileSystem` deployments.
+
+        Returns:
+            *list*: The paths of the files written.
+        """
+
+        written = []
+        for target, content in sorted(self.scripts.items()):
+            if path:
+                target = os.path.join(path, os.path.relpath(target, self.files))
+            try:
+                with open(target, "r") as f:
+                    if f.read() == content:
+                        continue
+            except OSError:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "w") as f:
+                f.write(content)
+            written.append(target)
+        return written
+
+
+class BuildCache:
+    """
+    A cache of generated suites, reusing the **ecFlow** definition and the deployed scripts of a suite when none of
+    the inputs it is built from changed.
+
+    The inputs are summarised by a fingerprint computed before building the suite: the configuration files selected
+    by a `Configurator`, the Python modules building the suite, any other files and values, and the version of
+    pyflow. The files read while generating the suite (sources of `FileScript` and `TemplateFileScript`, file headers)
+    are recorded with each entry, which is discarded if any of them changed.
+
+    The least recently used entries are evicted when the cache grows beyond `max_size` bytes or `max_entries`
+    entries.
+
+    Parameters:
+        directory(str): The directory of the cache, created if needed.
+        max_size(int): The maximum size of the cache in bytes.
+        max_entries(int): The maximum number of entries, unbounded by default.
+
+    Example::
+
+        cache = pyflow.BuildCache('.pyflow-cache')
+        key = cache.fingerprint(configurator=config, modules=[sys.modules[__name__]])
+        build = cache.build(key, lambda: MySuite(config))
+        build.deploy()
+        print(cache.stats)
+    """
+
+    def __init__(self, directory, max_size=256 * 1024 * 1024, max_entries=None):
+        self.directory = directory
+        self.max_size = max_size
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        os.makedirs(directory, exist_ok=True)
+
+    def fingerprint(self, configurator=None, modules=(), files=(), **values):
+        """
+        Computes the fingerprint of the inputs of a build.
+
+        Parameters:
+            configurator(Configurator): The configurator of the suite, whose configuration files are fingerprinted.
+            modules(list): The Python modules (or their paths) building the suite.
+            files(list): Any other files the suite depends on.
+            **values(dict): Any other values the suite depends on, e.g. command line arguments, by their `repr`.
+
+        Returns:
+            *str*: The fingerprint.
+        """
+
+        from . import __version__
+
+        paths = list(files)
+        if configurator is not None:
+            paths += configuration_files(configurator)
+        for module in modules:
+            paths.append(getattr(module, "__file__", module))
+
+        h = hashlib.sha256()
+        h.update(repr((_FORMAT, __version__, sys.version_info[:2])).encode("utf-8"))
+        for path in paths:
+            h.update(repr((os.path.abspath(path), _digest(path))).encode("utf-8"))
+        for name, value in sorted(values.items()):
+            h.update(repr((name, value)).encode("utf-8"))
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, key):
+        """
+        Looks up a build in the cache.
+
+        Parameters:
+            key(str): The fingerprint of the build.
+
+        Returns:
+            *CachedBuild*: The build, or `None` if it is not in the cache or a file it was generated from changed.
+        """
+
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.stats.misses += 1
+            return None
+
+        if any(_digest(p) != d for p, d in entry["sources"].items()):
+            self.stats.stale += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        self.stats.hits += 1
+        # Marks the entry as recently used
+        os.utime(path)
+        return CachedBuild(entry["definition"], entry["scripts"], entry["files"])
+
+    def put(self, key, suite, **options):
+        """
+        Generates and deploys a suite in memory, and stores the result in the cache.
+
+        Parameters:
+            key(str): The fingerprint of the build.
+            suite(Suite_): The suite.
+            **options(dict): Accept extra keyword arguments as deployment options.
+
+        Returns:
+            *CachedBuild*: The build.
+        """
+
+        definition = str(suite.ecflow_definition())
+        recorder = suite.deploy_suite(target=_Recorder, **options)
+        sources = set(recorder.sources)
+        for task in suite.all_tasks:
+            _script_files(task.script, sources)
+
+        build = CachedBuild(
+            definition, recorder.scripts, recorder.files_install_path(), suite
+        )
+        entry = {
+            "definition": build.definition,
+            "scripts": build.scripts,
+            "files": build.files,
+            "sources": {p: _digest(p) for p in sorted(sources)},
+        }
+
+        path = self._path(key)
+        temporary = "%s.%d.tmp" % (path, os.getpid())
+        with open(temporary, "w") as f:
+            json.dump(entry, f)
+        os.replace(temporary, path)
+        self.stats.stores += 1
+
+        self.evict(keep=key)
+        return build
+
+    def build(self, key, builder, **options):
+        """
+        Returns a build from the cache, or builds the suite and stores it if it is not cached.
+
+        Parameters:
+            key(str): The fingerprint of the build, see `fingerprint`.
+            builder(callable): Called without arguments to build the suite if needed.
+            **options(dict): Accept extra keyword arguments as deployment options.
+
+        Returns:
+            *CachedBuild*: The build.
+        """
+
+        build = self.get(key)
+        if build is None:
+            suite = builder()
+            assert isinstance(suite, Suite), "The builder must return a suite"
+            build = self.put(key, suite, **options)
+        return build
+
+    def entries(self):
+        """
+        Returns the entries of the cache, least recently used first.
+
+        Returns:
+            *list*: The (fingerprint, size in bytes, last use time) of the entries.
+        """
+
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                try:
+                    s = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((name[: -len(".json")], s.st_size, s.st_mtime))
+        return sorted(entries, key=lambda e: e[2])
+
+    @property
+    def size(self):
+        """*int*: The size of the cache in bytes."""
+        return sum(e[1] for e in self.entries())
+
+    def evict(self, keep=None):
+        """
+        Evicts the least recently used entries until the cache is within its bounds.
+
+        Parameters:
+            keep(str): The fingerprint of an entry never to evict, e.g. the one just stored.
+        """
+
+        entries = self.entries()
+        size = sum(e[1] for e in entries)
+        count = len(entries)
+
+        for key, entry_size, _ in entries:
+            if size <= self.max_size and (
+                self.max_entries is None or count <= self.max_entries
+            ):
+                break
+            if key == keep:
+                continue
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                continue
+            size -= entry_size
+            count -= 1
+            self.stats.evictions += 1
+
+    def clear(self):
+        """Removes all the entries of the cache."""
+
+        for key, _, _ in self.entries():
+            os.remove(self._path(key))
@@ -0,0 +1,340 @@
+from __future__ import absolute_import
+
+import time
+
+from .diff import Operation
+from .importer import ecflow
+from .nodes import Node
+
+# Commands taking a list of paths in a single call to the server
+_LISTS = ("delete", "alter", "suspend", "resume", "requeue")
+
+
+class ClientError(RuntimeError):
+    """
+    Raised when an operation still fails on the server after all the retries.
+
+    Attributes:
+        command(str): The command that failed.
+        paths(list): The paths of the nodes it was applied to.
+    """
+
+    def __init__(self, message, command, paths):
+        super().__init__(message)
+        self.command = command
+        self.paths = paths
+
+
+class ClientStats:
+    """
+    Statistics of the calls made by a `ClientSession`.
+
+    Attributes:
+        calls(int): The calls made to the server, successful or not, including retries.
+        operations(int): The operations carried out, each on a single node.
+        retries(int): The calls retried after an error.
+        failures(int): The batches abandoned after all the retries.
+        latencies(dict): The durations of the successful calls, in seconds, by command.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.operations = 0
+        self.retries = 0
+        self.failures = 0
+        self.latencies = {}
+
+    def total(self, command=None):
+        """
+        Returns the time spent in successful calls.
+
+        Parameters:
+            command(str): The command, by default all of them.
+
+        Returns:
+            *float*: The duration in seconds.
+        """
+
+        if command is not None:
+            return sum(self.latencies.get(command, []))
+        return sum(sum(v) for v in self.latencies.values())
+
+    def mean(self, command):
+        """
+        Returns the mean duration of the successful calls of a command.
+
+        Parameters:
+            command(str): The command.
+
+        Returns:
+            *float*: The duration in seconds, or 0 if the command was not called.
+        """
+
+        latencies = self.latencies.get(command, [])
+        return sum(latencies) / len(latencies) if latencies else 0.0
+
+    def __repr__(self):
+        return (
+            "ClientStats(calls=%d, operations=%d, retries=%d, failures=%d, seconds=%.3f)"
+            % (
+                self.calls,
+                self.operations,
+                self.retries,
+                self.failures,
+                self.total(),
+            )
+        )
+
+
+def _path(node):
+    if isinstance(node, Node):
+        return node.fullname
+    return node
+
+
+class ClientSession:
+    """
+    A connection to an **ecFlow** server applying batches of operations, reusing one client for all of them.
+
+    Operations are queued, then run by `flush` (or on leaving the session as a context manager). Consecutive
+    operations with the same command and arguments on different nodes are sent in a single call, e.g. suspending
+    or altering a variable of many families. Replacements of nodes whose ancestor was just replaced are skipped,
+    and the definition of each suite is generated once per flush.
+
+    Failed calls are retried, waiting `retry_delay` seconds and then twice as long after each attempt, until
+    `retries` retries or `timeout` seconds have elapsed.
+
+    Parameters:
+        host(str): Target host, possibly with the port, e.g. `localhost:3141`.
+        port(str): Port number of the target host.
+        retries(int): The number of retries of a failed call.
+        retry_delay(float): The delay before the first retry, in seconds.
+        timeout(float): The maximum time spent retrying a call, in seconds, unbounded by default.
+        client(ecflow.Client): The client to use, by default a client of the host created on first use.
+
+    Attributes:
+        stats(ClientStats): The statistics of the calls made by the session.
+
+    Example::
+
+        with pyflow.ClientSession('localhost:3141', retries=3) as session:
+            session.suspend(*families)
+            session.alter(families, 'change', 'variable', 'YMD', '20240101')
+            session.replace(suite.main)
+            session.resume(*families)
+        print(session.stats)
+    """
+
+    def __init__(
+        self, host, port=None, retries=2, retry_delay=0.5, timeout=None, client=None
+    ):
+        if "@" in host:
+            h = host.split("@")
+        else:
+            h = host.split(":")
+        if len(h) == 1:
+            h.append(port or "3141")
+
+        self.host, self.port = h
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        self.stats = ClientStats()
+        self._client = client
+        self._queue = []
+
+    @property
+    def client(self):
+        """*ecflow.Client*: The client of the server."""
+        if self._client is None:
+            self._client = ecflow.Client(self.host, self.port)
+        return self._client
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        return False
+
+    @property
+    def pending(self):
+        """*list*: The queued operations, not run yet."""
+        return [operation for operation, _ in self._queue]
+
+    def add(self, operations, node=None):
+        """
+        Queues operations, e.g. the plan of a `SuiteDiff`.
+
+        Parameters:
+            operations(list): The `Operation` list.
+            node(*Node*): The tree whose definition the replacements use.
+        """
+
+        for operation in operations:
+            if operation.command == "replace" and node is None:
+                raise ValueError(
+                    "Replacing {} requires a definition".format(operation.path)
+                )
+            self._queue.append((operation, node))
+
+    def replace(self, *nodes):
+        """
+        Queues the replacement of nodes on the server by their current definition.
+
+        Parameters:
+            *nodes(*Node*): The nodes.
+        """
+
+        for node in nodes:
+            # N.B. Important safety check. Do not remove. Extern nodes must never be played or generated.
+            assert (
+                not node._extern
+            ), "Attempting to play extern nodes to the server is not permitted"
+            self._queue.append((Operation("replace", node.fullname), node))
+
+    def delete(self, *nodes):
+        """
+        Queues the deletion of nodes from the server.
+
+        Parameters:
+            *nodes(*Node*,str): The nodes or their paths.
+        """
+
+        self._queue += [(Operation("delete", _path(n)), None) for n in nodes]
+
+    def alter(self, nodes, alter_type, attribute, name="", value=""):
+        """
+        Queues the alteration of an attribute of nodes, as `ecflow_client --alter`.
+
+        Parameters:
+            nodes(list): The nodes or their paths.
+            alter_type(str): `"add"`, `"change"` or `"delete"`.
+            attribute(str): The type of attribute, e.g. `"variable"`.
+            name(str): The name of the attribute.
+            value(str): The value of the attribute.
+        """
+
+        self._queue += [
+            (Operation("alter", _path(n), alter_type, attribute, name, value), None)
+            for n in nodes
+        ]
+
+    def suspend(self, *nodes):
+        """
+        Queues the suspension of nodes.
+
+        Parameters:
+            *nodes(*Node*,str): The nodes or their paths.
+        """
+
+        self._queue += [(Operation("suspend", _path(n)), None) for n in nodes]
+
+    def resume(self, *nodes):
+        """
+        Queues the resumption of nodes.
+
+        Parameters:
+            *nodes(*Node*,str): The nodes or their paths.
+        """
+
+        self._queue += [(Operation("resume", _path(n)), None) for n in nodes]
+
+    def requeue(self, *nodes, option=""):
+        """
+        Queues the requeueing of nodes.
+
+        Parameters:
+            *nodes(*Node*,str): The nodes or their paths.
+            option(str): `""`, `"abort"` (only aborted tasks) or `"force"`.
+        """
+
+        self._queue += [(Operation("requeue", _path(n), option), None) for n in nodes]
+
+    def _batches(self):
+        """
+        Groups the queued operations into calls, as (command, paths, arguments, node, number of operations).
+        """
+
+        batches = []
+        # The nodes replaced by the current run of consecutive replacements
+        replaced = []
+        for operation, node in self._queue:
+            command, path, args = operation.command, operation.path, operation.args
+            if command == "replace":
+                if any(path == r or path.startswith(r + "/") for r in replaced):
+                    batches[-1][4] += 1
+                    continue
+                replaced.append(path)
+                node = node.suite
+            else:
+                replaced = []
+            if batches and command != "replace":
+                last = batches[-1]
+                if command in _LISTS and (command, args) == (last[0], last[2]):
+                    last[1].append(path)
+                    last[4] += 1
+                    continue
+            batches.append([command, [path], args, node, 1])
+        return batches
+
+    def _call(self, command, paths, args, definition):
+        Operation(command, paths[0], *args).apply(self.client, definition, paths)
+
+    def _run(self, command, paths, args, definition):
+        start = time.perf_counter()
+        delay = self.retry_delay
+        attempt = 0
+        while True:
+            self.stats.calls += 1
+            t = time.perf_counter()
+            try:
+                self._call(command, paths, args, definition)
+            except RuntimeError as e:
+                elapsed = time.perf_counter() - start
+                if attempt >= self.retries or (
+                    self.timeout is not None and elapsed + delay > self.timeout
+                ):
+                    self.stats.failures += 1
+                    raise ClientError(
+                        "Failed to {} {} on {}:{}: {}".format(
+                            command, ", ".join(paths), self.host, self.port, e
+                        ),
+                        command,
+                        paths,
+                    ) from e
+                attempt += 1
+                self.stats.retries += 1
+                time.sleep(delay)
+                delay *= 2
+            else:
+                latency = time.perf_counter() - t
+                self.stats.latencies.setdefault(command, []).append(latency)
+                return
+
+    def flush(self):
+        """
+        Runs the queued operations, in order. If a call fails after all the retries, the operations from that call
+        onwards stay queued.
+
+        Returns:
+            *int*: The number of successful calls made to the server.
+
+        Raises:
+            ClientError: A call failed after all the retries.
+        """
+
+        definitions = {}
+        calls = 0
+        for command, paths, args, node, count in self._batches():
+            definition = None
+            if command == "replace":
+                if id(node) not in definitions:
+                    definitions[id(node)] = node.ecflow_definition()
+                definition = definitions[id(node)]
+            self._run(command, paths, args, definition)
+            del self._queue[:count]
+            self.stats.operations += count
+            calls += 1
+        return calls
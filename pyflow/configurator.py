@@ -125,6 +125,9 @@ class FileConfiguration(Configuration):
         if not hasattr(cfg, "configuration_name") or cfg.configuration_name is None:
             cfg.configuration_name = choice
 
+        # Keep track of the file, e.g. to fingerprint the inputs of a build
+        cfg.configuration_file = filename
+
         return cfg
 
 
@@ -0,0 +1,778 @@
+from __future__ import absolute_import
+
+from array import array
+from collections.abc import Mapping
+
+from .attributes import Complete, Defstatus, Follow, InLimit, Trigger
+from .expressions import (
+    And,
+    Constant,
+    Eq,
+    NodeName,
+    NodeStatus,
+    make_expression,
+    node_names,
+)
+from .nodes import Node, Task
+
+#: Kinds of the edges of the dependency graph, by attribute.
+KINDS = ("trigger", "complete", "follow")
+
+_TRIGGER, _COMPLETE, _FOLLOW = range(len(KINDS))
+
+
+class DependencyCycleError(RuntimeError):
+    """
+    Raised when the triggers of a suite can never be satisfied.
+
+    Parameters:
+        cycles(list): The cycles, each as a list of (*Node*, *str*) events, where the event is either ``"start"`` or
+            ``"complete"``.
+    """
+
+    def __init__(self, cycles):
+        self.cycles = cycles
+        lines = ["Trigger cycles found, the following nodes will never run:"]
+        for cycle in cycles:
+            events = ["%s(%s)" % (event, node.fullname) for node, event in cycle]
+            lines.append("    " + " -> ".join(events + events[:1]))
+        super().__init__("\n".join(lines))
+
+
+def _holder(item):
+    # Events, meters, repeats and variables are referenced through the node holding them
+    while not isinstance(item, Node):
+        item = item.parent
+    return item
+
+
+def _completed_node(term):
+    # The node for a "<node> eq complete" term, None for any other condition
+    if not isinstance(term, Eq):
+        return None
+    for name, status in ((term._left, term._right), (term._right, term._left)):
+        if (
+            isinstance(name, NodeName)
+            and isinstance(name._node, Node)
+            and isinstance(status, (NodeStatus, Constant))
+            and status.generate_expression() == "complete"
+        ):
+            return name._node
+    return None
+
+
+def _conjuncts(value):
+    simplified = make_expression(value).simplify()
+    if isinstance(simplified, And):
+        return simplified._operands
+    return (simplified,)
+
+
+def _completes_without_running(node):
+    # Such nodes may complete without their triggers ever being satisfied
+    for attribute in node.children:
+        if isinstance(attribute, Complete):
+            return True
+        if isinstance(attribute, Defstatus) and str(attribute.value) == "complete":
+            return True
+    return False
+
+
+class CriticalPath:
+    """
+    The earliest and latest start times of the nodes of a suite, for estimated task run times.
+
+    Times are in seconds since the suite begins, assuming that all tasks run as soon as their triggers allow.
+
+    Attributes:
+        makespan(float): The length of the critical path, the shortest possible run time of the suite.
+        lower_bound(float): The makespan, or the time needed to run the tasks of the most loaded limit with its
+            tokens if longer.
+        limits(dict): For each limit, by path, the run time of its tasks divided by its number of tokens.
+        path(list): The paths of the tasks on the critical path, in order.
+        earliest_start(dict): The earliest start time of each node, by path.
+        latest_start(dict): The latest start time of each node which does not delay the suite, by path.
+        slack(dict): The difference between latest and earliest start times, by path, null on the critical path.
+    """
+
+    def __init__(self, makespan, limits, path, earliest_start, latest_start):
+        self.makespan = makespan
+        self.lower_bound = max([makespan] + list(limits.values()))
+        self.limits = limits
+        self.path = path
+        self.earliest_start = earliest_start
+        self.latest_start = latest_start
+        self.slack = dict(
+            (name, latest_start[name] - start) for name, start in earliest_start.items()
+        )
+
+
+class DependencyGraph:
+    """
+    The dependency graph of the tasks and families of a suite, as defined by their triggers, completes and follows.
+
+    Each node is given an integer id, and each edge links the node referenced in an expression to the node holding
+    the expression. References to events, meters, repeats or variables are edges from the node holding them.
+
+    For cycle detection and trigger reduction, each node is further split in two events, its start and its
+    completion, linked by the hard ordering constraints of **ecFlow**:
+
+    * a node completes after it starts, unless it has a complete expression or a complete default status,
+    * a family starts before its children, which inherit its triggers, and completes after all of them, unless it
+      has a complete expression or a complete default status,
+    * a node starts after each node it waits for with a trigger term ``node eq complete`` and-ed at the top level.
+
+    Any other condition (e.g. or-ed terms, aborted nodes, events or meters) may be satisfied in more than one way,
+    and only appears as an edge of the graph.
+
+    Parameters:
+        root(*Node*): The suite or family to analyse.
+
+    Example::
+
+        graph = pyflow.DependencyGraph(suite)
+        graph.check()
+        graph.reduce_triggers()
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._build()
+
+    def _build(self):
+        #: *list*: The nodes of the graph, indexed by id.
+        self.nodes = []
+        self._ids = {}
+        self._parents = array("l")
+
+        self._sources = array("l")
+        self._targets = array("l")
+        self._kinds = array("b")
+
+        # The start and completion events of node i are 2 * i + 1 and 2 * i
+        self._successors = []
+        self._predecessors = []
+
+        # The nodes waited for by the top level trigger terms, by node id
+        self._waits = {}
+
+        # The nodes referencing events, meters, repeats or variables, by attribute id
+        self._attributes = {}
+
+        # The adjacency lists of the closure queries, built on first use
+        self._closures = None
+
+        # The terms of the expressions, by id
+        self._terms = {}
+
+        root = self._id(self.root)
+        stack = [root]
+        while stack:
+            i = stack.pop()
+            node = self.nodes[i]
+
+            runs = not _completes_without_running(node)
+            if runs:
+                self._order(2 * i + 1, 2 * i)
+
+            for attribute in node.children:
+                if isinstance(attribute, Trigger):
+                    self._add_expression(i, attribute.value, _TRIGGER)
+                elif isinstance(attribute, Follow):
+                    self._add_expression(i, attribute.value, _FOLLOW)
+                elif isinstance(attribute, Complete):
+                    self._add_expression(i, attribute.value, _COMPLETE)
+
+            for child in node.executable_children:
+                c = self._id(child)
+                self._parents[c] = i
+                self._order(2 * i + 1, 2 * c + 1)
+                if runs:
+                    self._order(2 * c, 2 * i)
+                stack.append(c)
+        self._terms = {}
+
+    def _id(self, node):
+        try:
+            return self._ids[id(node)]
+        except KeyError:
+            pass
+        i = len(self.nodes)
+        self._ids[id(node)] = i
+        self.nodes.append(node)
+        self._parents.append(-1)
+        self._successors += ([], [])
+        self._predecessors += ([], [])
+        return i
+
+    def _order(self, before, after):
+        self._successors[before].append(after)
+        self._predecessors[after].append(before)
+
+    def _term(self, term):
+        # The node waited for by a term, the ids of the nodes it references and the attributes it references, shared
+        # by all the expressions using the term
+        waited = _completed_node(term)
+        holders = []
+        attributes = []
+        for name in node_names(term):
+            holders.append(self._id(_holder(name._node)))
+            if not isinstance(name._node, Node):
+                attributes.append(name._node)
+        # The term is kept, so that its identity is not reused
+        result = (
+            None if waited is None else self._id(waited),
+            holders,
+            attributes,
+            term,
+        )
+        self._terms[id(term)] = result
+        return result
+
+    def _add_expression(self, i, value, kind):
+        referenced = set()
+        waits = self._waits.setdefault(i, []) if kind == _TRIGGER else None
+        terms = self._terms
+        for term in _conjuncts(value):
+            waited, holders, attributes, _ = terms.get(id(term)) or self._term(term)
+            if waited is not None and waits is not None:
+                if waited not in referenced or waited not in waits:
+                    waits.append(waited)
+                    self._order(2 * waited, 2 * i + 1)
+                referenced.add(waited)
+                continue
+            referenced.update(holders)
+            for attribute in attributes:
+                self._attributes.setdefault(id(attribute), (attribute, set()))[1].add(i)
+
+        count = len(referenced)
+        self._sources.extend(sorted(referenced))
+        self._targets.extend([i] * count)
+        self._kinds.extend([kind] * count)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def edges(self, kind=None):
+        """
+        Iterates over the edges of the graph.
+
+        Parameters:
+            kind(str): Only returns edges from this kind of attribute, one of ``"trigger"``, ``"complete"`` or
+                ``"follow"``.
+
+        Returns:
+            *generator*: (*Node*, *Node*, *str*) tuples, from the referenced node to the node holding the expression.
+        """
+
+        wanted = None if kind is None else KINDS.index(kind)
+        for source, target, k in zip(self._sources, self._targets, self._kinds):
+            if wanted is None or k == wanted:
+                yield self.nodes[source], self.nodes[target], KINDS[k]
+
+    def _adjacency(self, sources, targets):
+        # Compressed sparse rows of the targets, by source
+        offsets = array("l", [0]) * (len(self.nodes) + 1)
+        for v in sources:
+            offsets[v + 1] += 1
+        for v in range(len(self.nodes)):
+            offsets[v + 1] += offsets[v]
+        rows = array("l", [0]) * len(targets)
+        free = array("l", offsets)
+        for v, w in zip(sources, targets):
+            rows[free[v]] = w
+            free[v] += 1
+        return offsets, rows
+
+    def _closure(self, items, upstream):
+        if self._closures is None:
+            children = [(p, c) for c, p in enumerate(self._parents) if p >= 0]
+            self._closures = (
+                self._adjacency(self._sources, self._targets),
+                self._adjacency(self._targets, self._sources),
+                self._adjacency([p for p, _ in children], [c for _, c in children]),
+            )
+        dependents, dependencies, children = self._closures
+        offsets, rows = dependencies if upstream else dependents
+
+        count = len(self.nodes)
+        reached = bytearray(count)
+        expanded = bytearray(count)
+        descended = bytearray(count)
+        queue = []
+
+        for item in items:
+            if isinstance(item, Node) or upstream:
+                try:
+                    queue.append(self._ids[id(_holder(item))])
+                except KeyError:
+                    raise ValueError("%r is not part of the dependency graph" % (item,))
+            elif id(item) in self._attributes:
+                for i in self._attributes[id(item)][1]:
+                    if not reached[i]:
+                        reached[i] = 1
+                        queue.append(i)
+
+        # A node depends on the expressions of its ancestors, which it inherits, and of its descendants, which it
+        # waits for to complete. Each node is expanded once, and each subtree is descended once.
+        for i in queue:
+            related = []
+            p = i
+            while p >= 0 and not expanded[p]:
+                related.append(p)
+                p = self._parents[p]
+            stack = [i]
+            while stack:
+                v = stack.pop()
+                if descended[v]:
+                    continue
+                descended[v] = 1
+                if v != i:
+                    related.append(v)
+                stack.extend(children[1][children[0][v] : children[0][v + 1]])
+
+            for v in related:
+                if expanded[v]:
+                    continue
+                expanded[v] = 1
+                for w in rows[offsets[v] : offsets[v + 1]]:
+                    if not reached[w]:
+                        reached[w] = 1
+                        queue.append(w)
+
+        # Requeuing or waiting for a family covers all of its descendants
+        paths = []
+        for i in queue:
+            if reached[i] == 1:
+                reached[i] = 2
+                p = self._parents[i]
+                while p >= 0 and not reached[p]:
+                    p = self._parents[p]
+                if p < 0:
+                    paths.append(self.nodes[i].fullname)
+        return sorted(paths)
+
+    def downstream(self, *items):
+        """
+        Finds the nodes impacted by rerunning nodes, or by changing their events, meters, repeats or variables.
+
+        A node is impacted when one of its triggers, completes or follows references an item, a node impacted by
+        an item, or any of their ancestors or descendants.
+
+        Parameters:
+            *items(tuple): The nodes or attributes being changed.
+
+        Returns:
+            *list*: The sorted paths of the impacted nodes, without the descendants of impacted families, e.g. to
+            requeue them all at once.
+
+        Example::
+
+            client.requeue(graph.downstream(suite.f.t1))
+        """
+
+        return self._closure(items, upstream=False)
+
+    def upstream(self, *items):
+        """
+        Finds the nodes referenced by the triggers, completes and follows of nodes, of their ancestors and of their
+        descendants, recursively.
+
+        Parameters:
+            *items(tuple): The nodes or attributes to start from.
+
+        Returns:
+            *list*: The sorted paths of the nodes, without the descendants of listed families.
+        """
+
+        return self._closure(items, upstream=True)
+
+    def _topological_order(self):
+        # Kahn's algorithm over the start and completion events, None if there is a cycle
+        degrees = array("l", (len(p) for p in self._predecessors))
+        order = [v for v, d in enumerate(degrees) if d == 0]
+        for v in order:
+            for w in self._successors[v]:
+                degrees[w] -= 1
+                if degrees[w] == 0:
+                    order.append(w)
+        if len(order) < len(degrees):
+            return None
+        return order
+
+    def cycles(self):
+        """
+        Finds the cycles between triggers, which would leave nodes waiting forever.
+
+        Returns:
+            *list*: One cycle per set of mutually dependent nodes, as a list of (*Node*, *str*) events, where the event
+            is either ``"start"`` or ``"complete"``.
+        """
+
+        if self._topological_order() is not None:
+            return []
+
+        cycles = []
+        for component in self._components():
+            if len(component) > 1:
+                cycles.append(
+                    [
+                        (self.nodes[v // 2], "start" if v % 2 else "complete")
+                        for v in self._cycle(component)
+                    ]
+                )
+        return cycles
+
+    def _components(self):
+        # Tarjan's strongly connected components, without recursion
+        count = len(self._successors)
+        index = array("l", [-1]) * count
+        low = array("l", [0]) * count
+        on_stack = bytearray(count)
+        stack = []
+        components = []
+        counter = 0
+
+        for root in range(count):
+            if index[root] >= 0:
+                continue
+            work = [(root, 0)]
+            while work:
+                v, k = work.pop()
+                if k == 0:
+                    index[v] = low[v] = counter
+                    counter += 1
+                    stack.append(v)
+                    on_stack[v] = 1
+                successors = self._successors[v]
+                while k < len(successors):
+                    w = successors[k]
+                    k += 1
+                    if index[w] < 0:
+                        work.append((v, k))
+                        work.append((w, 0))
+                        break
+                    if on_stack[w]:
+                        low[v] = min(low[v], index[w])
+                else:
+                    if low[v] == index[v]:
+                        component = []
+                        while True:
+                            w = stack.pop()
+                            on_stack[w] = 0
+                            component.append(w)
+                            if w == v:
+                                break
+                        components.append(component)
+                    if work:
+                        u = work[-1][0]
+                        low[u] = min(low[u], low[v])
+        return components
+
+    def _cycle(self, component):
+        # The shortest cycle through the first event of a strongly connected component
+        members = set(component)
+        start = component[-1]
+        previous = {start: None}
+        queue = [start]
+        for v in queue:
+            for w in self._successors[v]:
+                if w == start:
+                    cycle = [v]
+                    while previous[cycle[-1]] is not None:
+                        cycle.append(previous[cycle[-1]])
+                    return cycle[::-1]
+                if w in members and w not in previous:
+                    previous[w] = v
+                    queue.append(w)
+        raise AssertionError("no cycle in component")
+
+    def check(self):
+        """
+        Checks that the triggers can all be satisfied.
+
+        Raises:
+            DependencyCycleError: If there are cycles between triggers.
+        """
+
+        cycles = self.cycles()
+        if cycles:
+            raise DependencyCycleError(cycles)
+
+    def redundant_triggers(self):
+        """
+        Finds the trigger terms that are implied by the others, or by the triggers of the parent nodes.
+
+        A term ``a eq complete`` is redundant when ``a`` completes before another waited node completes, or before
+        the parent family starts. The remaining terms form the transitive reduction of the triggers.
+
+        Returns:
+            *dict*: Redundant waited nodes, as lists indexed by the node holding the trigger.
+
+        Raises:
+            DependencyCycleError: If there are cycles between triggers.
+        """
+
+        order = self._topological_order()
+        if order is None:
+            raise DependencyCycleError(self.cycles())
+
+        # A waited completion event is redundant when it comes before another one, or before the start of the parent,
+        # which is found by searching backwards from those, only down to the earliest waited event in topological
+        # order, and stopping as soon as all the waited events are found
+        position = array("l", [0]) * len(order)
+        for k, v in enumerate(order):
+            position[v] = k
+
+        predecessors = self._predecessors
+        redundant = {}
+        for i, waits in self._waits.items():
+            targets = set(2 * j for j in waits)
+            starts = list(targets)
+            if self._parents[i] >= 0:
+                starts.append(2 * self._parents[i] + 1)
+            if len(starts) < 2:
+                continue
+
+            bound = min(position[v] for v in targets)
+            # The latest events are searched first, as they are the most likely to come after the others, and the
+            # latest of all cannot be found
+            stack = sorted(starts, key=position.__getitem__)
+            remaining = len(targets) - (stack[-1] in targets)
+            expanded = set()
+            reached = set()
+            while stack and remaining:
+                v = stack.pop()
+                if v in expanded:
+                    continue
+                expanded.add(v)
+                for u in predecessors[v]:
+                    if position[u] < bound or u in reached:
+                        continue
+                    reached.add(u)
+                    if u in targets:
+                        remaining -= 1
+                    stack.append(u)
+
+            removed = [self.nodes[j] for j in waits if 2 * j in reached]
+            if removed:
+                redundant[self.nodes[i]] = removed
+
+        return redundant
+
+    def reduce_triggers(self):
+        """
+        Removes the redundant trigger terms, in place, without changing when any node may run.
+
+        Returns:
+            *dict*: The removed waited nodes, as lists indexed by the node holding the trigger.
+
+        Raises:
+            DependencyCycleError: If there are cycles between triggers.
+        """
+
+        redundant = self.redundant_triggers()
+        for node, removed in redundant.items():
+            removed = set(id(n) for n in removed)
+            terms = []
+            for trigger in node.triggers:
+                terms += [
+                    term
+                    for term in _conjuncts(trigger.value)
+                    if id(_completed_node(term)) not in removed
+                ]
+            if not terms:
+                node.clear_type(Trigger)
+            else:
+                node.triggers = terms[0] if len(terms) == 1 else And(*terms)
+
+        if redundant:
+            self._build()
+        return redundant
+
+    def _run_times(self, durations, variable):
+        if callable(durations):
+            model = durations
+        elif isinstance(durations, Mapping):
+
+            def model(task):
+                return durations.get(task.fullname, 0)
+
+        else:
+
+            def model(task):
+                return durations
+
+        run_times = array("d", [0.0]) * len(self.nodes)
+        for i, node in enumerate(self.nodes):
+            # Nodes outside of the tree never run
+            if isinstance(node, Task) and self._parents[i] >= 0:
+                value = None
+                if variable is not None:
+                    try:
+                        value = node.lookup_variable(variable)
+                    except AttributeError:
+                        pass
+                run_times[i] = float(model(node) if value is None else value)
+        return run_times
+
+    def critical_path(self, durations=0, variable=None):
+        """
+        Computes the critical path of the suite, and the earliest and latest start times of its nodes, in linear time.
+
+        Only the and-ed trigger terms and the completion of families constrain the start times, as in
+        `redundant_triggers`, so that the makespan is a lower bound. Limits give another lower bound, with the
+        assumption that their tokens are never left unused.
+
+        Parameters:
+            durations(float,dict,function): The estimated run time of the tasks in seconds. Either the same value
+                for all tasks, a dictionary of values indexed by task path (missing tasks take no time), or a
+                function of the task.
+            variable(str): The name of a variable holding the estimated run time of the tasks. Takes precedence
+                over `durations` where set on the task or its parents.
+
+        Returns:
+            CriticalPath: The makespan, critical path, start times and slacks.
+
+        Raises:
+            DependencyCycleError: If there are cycles between triggers.
+
+        Example::
+
+            critical = graph.critical_path({'/s/f/t1': 3600}, variable='ESTIMATED_RUN_TIME')
+            print(critical.makespan, critical.path)
+        """
+
+        order = self._topological_order()
+        if order is None:
+            raise DependencyCycleError(self.cycles())
+
+        run_times = self._run_times(durations, variable)
+
+        def weight(v, w):
+            # Only the edge from the start to the completion of a node takes time
+            return run_times[v // 2] if v % 2 and w == v - 1 else 0.0
+
+        earliest = array("d", [0.0]) * len(order)
+        for v in order:
+            for w in self._successors[v]:
+                t = earliest[v] + weight(v, w)
+                if t > earliest[w]:
+                    earliest[w] = t
+
+        makespan = max(earliest) if len(earliest) else 0.0
+        latest = array("d", [makespan]) * len(order)
+        for v in reversed(order):
+            for w in self._successors[v]:
+                t = latest[w] - weight(v, w)
+                if t < latest[v]:
+                    latest[v] = t
+
+        # Walks back along the tight constraints from the last event
+        path = []
+        v = max(range(len(earliest)), key=earliest.__getitem__) if len(earliest) else -1
+        while v >= 0:
+            for u in self._predecessors[v]:
+                if earliest[u] + weight(u, v) == earliest[v]:
+                    if weight(u, v):
+                        path.append(self.nodes[u // 2].fullname)
+                    break
+            else:
+                u = -1
+            v = u
+        path.reverse()
+
+        # The tasks of a family count against its limits
+        loads = {}
+        inherited = [{}] * len(self.nodes)
+        for i, node in enumerate(self.nodes):
+            p = self._parents[i]
+            if p < 0 and i > 0:
+                continue
+            own = [a.limit for a in node.children if isinstance(a, InLimit)]
+            if any(limit is not None for limit in own):
+                inherited[i] = dict(inherited[p]) if p >= 0 else {}
+                inherited[i].update((id(x), x) for x in own if x is not None)
+            elif p >= 0:
+                inherited[i] = inherited[p]
+            for key, limit in inherited[i].items():
+                loads[key] = (limit, loads.get(key, (limit, 0.0))[1] + run_times[i])
+        limits = dict(
+            (limit.fullname, load / limit.value)
+            for limit, load in loads.values()
+            if limit.value
+        )
+
+        earliest_start = {}
+        latest_start = {}
+        for i, node in enumerate(self.nodes):
+            if i == 0 or self._parents[i] >= 0:
+                earliest_start[node.fullname] = earliest[2 * i + 1]
+                latest_start[node.fullname] = latest[2 * i + 1]
+
+        return CriticalPath(makespan, limits, path, earliest_start, latest_start)
+
+    def reorder_children(self, durations=0, variable=None, priority=None):
+        """
+        Reorders, in place, the tasks and families of each node so that the most urgent are generated first.
+
+        The **ecFlow** server submits the tasks that may run in tree order, so that when a limit is saturated the
+        order of the siblings decides which task starts first. Siblings are sorted by decreasing priority, then by
+        increasing latest start time, that is starting with the longest remaining chain of dependencies. Ties keep
+        their order, attributes keep their positions and the triggers are unchanged, so that only the order of
+        submission may change.
+
+        Parameters:
+            durations(float,dict,function): The estimated run time of the tasks, as in `critical_path`.
+            variable(str): The name of a variable holding the estimated run time of the tasks, as in `critical_path`.
+            priority(dict,function): The priority of the tasks and families, either as a dictionary indexed by path
+                (missing nodes have priority 0) or as a function of the node.
+
+        Returns:
+            CriticalPath: The critical path analysis used to order the siblings.
+
+        Raises:
+            DependencyCycleError: If there are cycles between triggers.
+
+        Example::
+
+            graph.reorder_children(variable='ESTIMATED_RUN_TIME')
+            defs = suite.ecflow_definition()
+        """
+
+        critical = self.critical_path(durations, variable)
+        latest_start = critical.latest_start
+
+        if callable(priority):
+            rank = priority
+        else:
+            priorities = priority or {}
+
+            def rank(node):
+                return priorities.get(node.fullname, 0)
+
+        for i, node in enumerate(self.nodes):
+            if i > 0 and self._parents[i] < 0:
+                continue
+            children = node.executable_children
+            if len(children) < 2:
+                continue
+            ordered = sorted(
+                children,
+                key=lambda child: (-rank(child), latest_start[child.fullname]),
+            )
+            if all(a is b for a, b in zip(children, ordered)):
+                continue
+
+            # The ordered nodes take the places of the original ones among the attributes
+            ordered = iter(ordered)
+            slots = set(id(child) for child in children)
+            names = [
+                next(ordered).name if id(item) in slots else key
+                for key, item in list(node._nodes.items())
+            ]
+            for name in names:
+                node._nodes.move_to_end(name)
+            node._changed()
+
+        return critical
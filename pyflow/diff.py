@@ -0,0 +1,351 @@
+from __future__ import absolute_import
+
+from collections import namedtuple
+
+from .attributes import (
+    Complete,
+    Date,
+    Day,
+    Defstatus,
+    Event,
+    Label,
+    Limit,
+    Meter,
+    Time,
+    Today,
+    Trigger,
+    Variable,
+)
+from .expressions import generation_cache, make_expression
+from .nodes import Node, _changed_pairs
+
+# Attributes changed with `ecflow_client --alter`, by (exact) type. Anything else requires replacing the node.
+_NAMED = {Variable: "variable", Label: "label", Limit: "limit"}
+_EXPRESSIONS = {Trigger: "trigger", Complete: "complete"}
+_DELETABLE = {Event: "event", Meter: "meter"}
+_TIMES = (Time, Today, Date, Day)
+
+
+class Change(namedtuple("Change", ["path", "kind", "attribute", "old", "new"])):
+    """
+    A difference between two versions of a tree.
+
+    Attributes:
+        path(str): The path of the node.
+        kind(str): `"added"`, `"removed"` or `"modified"`; `"script"` if only the script or headers of a task changed,
+            `"reordered"` if the children of the node are in a different order.
+        attribute(str): The name of the attribute for changes of attributes, otherwise `None`.
+        old(str): The previous definition of the attribute, if any.
+        new(str): The new definition of the attribute, if any.
+    """
+
+    def __str__(self):
+        if self.attribute is None:
+            return "%s %s" % (self.kind, self.path)
+        return "%s %s:%s (%s -> %s)" % (
+            self.kind,
+            self.path,
+            self.attribute,
+            self.old,
+            self.new,
+        )
+
+
+class Operation:
+    """
+    An operation on an **ecFlow** server.
+
+    Attributes:
+        command(str): `"replace"`, `"delete"`, `"alter"`, `"order"`, `"suspend"`, `"resume"` or `"requeue"`.
+        path(str): The path of the node.
+        args(tuple): For alterations, the type of alteration (`"add"`, `"change"` or `"delete"`), the type of
+            attribute, its name and its value; for orders, the new position of the node among its siblings (e.g.
+            `"bottom"`); for requeues, the option (`""`, `"abort"` or `"force"`).
+    """
+
+    def __init__(self, command, path, *args):
+        self.command = command
+        self.path = path
+        self.args = args
+
+    def __eq__(self, other):
+        return isinstance(other, Operation) and (
+            self.command,
+            self.path,
+            self.args,
+        ) == (
+            other.command,
+            other.path,
+            other.args,
+        )
+
+    def __repr__(self):
+        return "Operation(%s)" % ", ".join(
+            repr(a) for a in (self.command, self.path) + self.args
+        )
+
+    def __str__(self):
+        """The equivalent `ecflow_client` arguments."""
+        if self.command == "replace":
+            return "--replace=%s definition.def parent force" % (self.path,)
+        if self.command == "delete":
+            return "--delete=force yes %s" % (self.path,)
+        if self.command == "order":
+            return "--order=%s %s" % (self.path, self.args[0])
+        if self.command == "alter":
+            return "--alter=%s %s" % (
+                " ".join(str(a) for a in self.args if a != ""),
+                self.path,
+            )
+        return "--%s=%s" % (
+            self.command,
+            " ".join([str(a) for a in self.args if a != ""] + [self.path]),
+        )
+
+    def apply(self, client, definition, paths=None):
+        """
+        Runs the operation.
+
+        Parameters:
+            client(ecflow.Client): The client of the server.
+            definition(ecflow.Defs): The new definition, used by replacements.
+            paths(list): The paths of the nodes to run the operation on in a single call, instead of its own path,
+                for the commands other than replacements.
+        """
+
+        if paths is None:
+            target = self.path
+        else:
+            target = paths[0] if len(paths) == 1 else list(paths)
+
+        if self.command == "replace":
+            client.replace(target, definition, True, True)
+        elif self.command == "delete":
+            client.delete(target, True)
+        else:
+            getattr(client, self.command)(target, *self.args)
+
+
+def _definitions(node):
+    """
+    The generated definition of each attribute of a node, by name.
+    """
+
+    empty = str(node.ecflow_object()).splitlines()
+    result = {}
+    for name, attribute in node._nodes.items():
+        if isinstance(attribute, Node):
+            continue
+        o = node.ecflow_object()
+        attribute._build(o)
+        lines = [line.strip() for line in str(o).splitlines() if line not in empty]
+        if lines:
+            result[name] = (attribute, "\n".join(lines))
+    return result
+
+
+def _alterations(path, old, new):
+    """
+    The alterations turning the old attribute into the new one, either of them possibly `None`, or `None` if the
+    node must be replaced.
+    """
+
+    attribute = new if new is not None else old
+    old_text = old[1] if old is not None else None
+    new_text = new[1] if new is not None else None
+    attribute = attribute[0]
+    cls = type(attribute)
+
+    if cls in _NAMED:
+        kind = _NAMED[cls]
+        if new is None:
+            return [Operation("alter", path, "delete", kind, attribute.name, "")]
+        value = str(attribute.value)
+        if old is None:
+            return [Operation("alter", path, "add", kind, attribute.name, value)]
+        if kind == "limit":
+            kind = "limit_max"
+        return [Operation("alter", path, "change", kind, attribute.name, value)]
+
+    if cls in _EXPRESSIONS:
+        kind = _EXPRESSIONS[cls]
+        if new is None:
+            return [Operation("alter", path, "delete", kind, "", "")]
+        if old is None:
+            return None
+        expression = make_expression(attribute.value).simplify()
+        value = expression.generate_expression(attribute.parent)
+        return [Operation("alter", path, "change", kind, "", value)]
+
+    if cls is Defstatus:
+        value = str(attribute.value) if new is not None else "queued"
+        return [Operation("alter", path, "change", "defstatus", value, "")]
+
+    if cls in _DELETABLE and new is None:
+        return [Operation("alter", path, "delete", _DELETABLE[cls], attribute.name, "")]
+
+    if cls in _TIMES:
+        operations = []
+        if old_text is not None:
+            kind, value = old_text.split(None, 1)
+            operations.append(Operation("alter", path, "delete", kind, value, ""))
+        if new_text is not None:
+            kind, value = new_text.split(None, 1)
+            operations.append(Operation("alter", path, "add", kind, value, ""))
+        return operations
+
+    return None
+
+
+class SuiteDiff:
+    """
+    The differences between two versions of a tree (usually two builds of a suite), and the operations updating an
+    **ecFlow** server running the old version to the new one without replacing the whole suite.
+
+    Only the subtrees whose content hashes differ are compared. Attributes that can be altered on the server
+    (variables, labels, limits, triggers, complete expressions, default statuses, time dependencies, and the removal
+    of events and meters) are altered; nodes with other changes are replaced, along with their descendants. Children
+    in a different order are moved into place. Changes to scripts and headers need no operation, the tasks pick them
+    up once they are deployed.
+
+    Parameters:
+        old(*Node*): The version running on the server.
+        new(*Node*): The new version, at the same path.
+
+    Attributes:
+        changes(list): The `Change` list, in tree order.
+        operations(list): The `Operation` list, in order.
+
+    Example::
+
+        diff = pyflow.SuiteDiff(previous, suite)
+        print(diff)
+        suite.deploy_suite()
+        diff.apply_to_server('localhost:3141')
+    """
+
+    def __init__(self, old, new):
+        if old.fullname != new.fullname:
+            raise ValueError(
+                "Cannot compare {} with {}".format(old.fullname, new.fullname)
+            )
+
+        self.new = new
+        self.changes = []
+        self.operations = []
+
+        replaced = []
+        with generation_cache():
+            for a, b, kind in _changed_pairs(old, new):
+                path = (a if b is None else b).fullname
+                if any(path.startswith(p + "/") for p in replaced):
+                    continue
+                if kind == "added":
+                    self.changes.append(Change(path, kind, None, None, None))
+                    self.operations.append(Operation("replace", path))
+                elif kind == "removed":
+                    self.changes.append(Change(path, kind, None, None, None))
+                    self.operations.append(Operation("delete", path))
+                elif kind == "reordered":
+                    if path in replaced:
+                        continue
+                    # Moving the kept children to the bottom one after the other puts them in the new order
+                    self.changes.append(Change(path, kind, None, None, None))
+                    self.operations += [
+                        Operation("order", n.fullname, "bottom")
+                        for n in b.children
+                        if isinstance(n, Node)
+                        and isinstance(a._nodes.get(n.name), Node)
+                    ]
+                elif self._compare(a, b):
+                    replaced.append(path)
+
+    def _compare(self, old, new):
+        path = new.fullname
+        if type(old) is not type(new):
+            self.changes.append(Change(path, "modified", None, None, None))
+            self.operations.append(Operation("replace", path))
+            return True
+
+        before = _definitions(old)
+        after = _definitions(new)
+        changes = []
+        operations = []
+        for name in list(after) + [n for n in before if n not in after]:
+            a, b = before.get(name), after.get(name)
+            if a is not None and b is not None and a[1] == b[1]:
+                continue
+            kind = "added" if a is None else "removed" if b is None else "modified"
+            changes.append(Change(path, kind, name, a and a[1], b and b[1]))
+            if operations is not None:
+                alterations = _alterations(path, a, b)
+                operations = None if alterations is None else operations + alterations
+
+        if not changes:
+            self.changes.append(Change(path, "script", None, None, None))
+            return False
+
+        self.changes += changes
+        if operations is None:
+            self.operations.append(Operation("replace", path))
+            return True
+        self.operations += operations
+        return False
+
+    def __bool__(self):
+        return bool(self.changes)
+
+    def __str__(self):
+        lines = [str(c) for c in self.changes]
+        lines += ["ecflow_client %s" % (o,) for o in self.operations]
+        return "\n".join(lines)
+
+    def apply(self, client):
+        """
+        Runs the operations on a server.
+
+        Parameters:
+            client(ecflow.Client): The client of the server.
+        """
+
+        definition = None
+        for operation in self.operations:
+            if operation.command == "replace" and definition is None:
+                definition = self.new.ecflow_definition()
+            operation.apply(client, definition)
+
+    def apply_to_server(self, host, port=None, **options):
+        """
+        Runs the operations on a server, as `replace_on_server` does for whole nodes, batching them with a
+        `ClientSession`.
+
+        Parameters:
+            host(str): Target host, possibly with the port, e.g. `localhost:3141`.
+            port(str): Port number of the target host.
+            **options(dict): Accept extra keyword arguments as options of the `ClientSession`.
+
+        Returns:
+            *ClientSession*: The session, with the statistics of the calls.
+        """
+
+        from .client import ClientSession
+
+        session = ClientSession(host, port, **options)
+        session.add(self.operations, self.new)
+        session.flush()
+        return session
+
+
+def diff_suites(old, new):
+    """
+    Compares two versions of a tree, see `SuiteDiff`.
+
+    Parameters:
+        old(*Node*): The version running on the server.
+        new(*Node*): The new version.
+
+    Returns:
+        *SuiteDiff*: The differences and the operations realising them.
+    """
+
+    return SuiteDiff(old, new)
@@ -0,0 +1,559 @@
+from __future__ import absolute_import
+
+from array import array
+
+from .attributes import Defstatus, Event, Follow, Label, Meter, Trigger, Variable
+from .expressions import (
+    Add,
+    And,
+    BinOp,
+    Constant,
+    Deferred,
+    Div,
+    Eq,
+    Function,
+    Ge,
+    Gt,
+    Le,
+    Lt,
+    Mod,
+    Ne,
+    NodeName,
+    NodeStatus,
+    Not,
+    Or,
+    Sub,
+    make_expression,
+)
+from .nodes import Node
+from .values import OPERATORS, REPEATS, repeat_values, resolve
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+#: The statuses of nodes, whose positions are the codes of the status in a StateTable.
+STATUSES = (
+    "unknown",
+    "complete",
+    "queued",
+    "aborted",
+    "submitted",
+    "active",
+    "suspended",
+)
+
+_CODES = dict((status, float(code)) for code, status in enumerate(STATUSES))
+_CODES.update({"set": 1.0, "clear": 0.0})
+
+_NUMPY_OPERATORS = {
+    Eq: "equal",
+    Ne: "not_equal",
+    Lt: "less",
+    Le: "less_equal",
+    Gt: "greater",
+    Ge: "greater_equal",
+    Add: "add",
+    Sub: "subtract",
+    Mod: "mod",
+    Div: "floor_divide",
+}
+
+
+def _julian(ymd):
+    # The julian day number of yyyymmdd dates, for numbers and arrays alike
+    year, month, day = ymd // 10000, ymd // 100 % 100, ymd % 100
+    a = (14 - month) // 12
+    y = year + 4800 - a
+    m = month + 12 * a - 3
+    return day + (153 * m + 2) // 5 + 365 * y + y // 4 - y // 100 + y // 400 - 32045
+
+
+class StateTable:
+    """
+    A snapshot of the state of a suite as seen by trigger expressions: the statuses of its nodes, and the values
+    of their events, meters and repeats.
+
+    The table starts with all nodes queued, or in their default status, all events clear, all meters at their
+    minimum and all repeats at their first value. Statuses are stored as their position in `STATUSES`.
+
+    Parameters:
+        suite(Suite_): The suite, or any node, whose subtree is described.
+
+    Example::
+
+        table = pyflow.StateTable(suite)
+        table[suite.f.t1] = 'complete'
+        table[suite.f.t2.progress] = 50
+    """
+
+    def __init__(self, suite):
+        self.suite = suite
+        self.nodes = []
+        self.parents = array("l")
+        self._ids = {}
+        stack = [(suite, -1)]
+        while stack:
+            node, parent = stack.pop()
+            self._ids[id(node)] = len(self.nodes)
+            self.nodes.append(node)
+            self.parents.append(parent)
+            stack.extend(
+                (child, len(self.nodes) - 1)
+                for child in reversed(node.executable_children)
+            )
+
+        self.states = array("d", [_CODES["queued"]]) * len(self.nodes)
+        self.events = array("d")
+        self.meters = array("d")
+        self.repeats = array("d")
+        self._columns = {}
+        # Other strings compared by expressions, e.g. labels, are given codes of their own, shared by the copies
+        self._symbols = {}
+        self._repeat_values = []
+        for i, node in enumerate(self.nodes):
+            for a in node.children:
+                if isinstance(a, Event):
+                    self._columns[id(a)] = ("events", len(self.events))
+                    self.events.append(0.0)
+                elif isinstance(a, Meter):
+                    self._columns[id(a)] = ("meters", len(self.meters))
+                    self.meters.append(float(resolve(a._min, a)))
+                elif isinstance(a, REPEATS):
+                    values = repeat_values(a)
+                    self._columns[id(a)] = ("repeats", len(self.repeats))
+                    self._repeat_values.append(values)
+                    self.repeats.append(float(values[0]))
+                elif isinstance(a, Defstatus) and str(a.value) in _CODES:
+                    self.states[i] = _CODES[str(a.value)]
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _column(self, item):
+        if isinstance(item, Node):
+            i = self._ids.get(id(item))
+            return None if i is None else ("states", i)
+        return self._columns.get(id(item))
+
+    def __getitem__(self, item):
+        column = self._column(item)
+        if column is None:
+            raise KeyError("%r is not part of the table" % (item,))
+        name, k = column
+        value = getattr(self, name)[k]
+        return STATUSES[int(value)] if name == "states" else value
+
+    def __setitem__(self, item, value):
+        """
+        Sets the status of a node, or the value of an event, meter or repeat.
+
+        Parameters:
+            item(Task_,Event_,Meter_): The node or attribute to change.
+            value(str,int): The status of a node, as in `STATUSES`, whether an event is set, or the value of a
+                meter or repeat, as seen by expressions.
+        """
+
+        column = self._column(item)
+        if column is None:
+            raise KeyError("%r is not part of the table" % (item,))
+        name, k = column
+        if name == "states" and str(value) not in STATUSES:
+            raise ValueError("Unknown node status %s" % (value,))
+        getattr(self, name)[k] = self._code(value)
+
+    def copy(self):
+        """
+        Returns:
+            StateTable: An independent copy of the table.
+        """
+
+        table = object.__new__(StateTable)
+        table.__dict__.update(self.__dict__)
+        for name in ("states", "events", "meters", "repeats"):
+            setattr(table, name, array("d", getattr(self, name)))
+        return table
+
+    def _code(self, value):
+        if isinstance(value, bool):
+            return float(value)
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            pass
+        value = str(value)
+        if value in _CODES:
+            return _CODES[value]
+        return self._symbols.setdefault(value, float(1000 + len(self._symbols)))
+
+    def _leaf(self, item):
+        # The column and position of a referenced node or attribute, or its constant value if outside the table
+        holder = item
+        while not isinstance(holder, Node):
+            holder = holder.parent
+        if id(holder) not in self._ids:
+            # Outside of the suite, e.g. externs, considered complete
+            if isinstance(item, Node):
+                return None, _CODES["complete"]
+            return None, 1.0 if isinstance(item, Event) else 0.0
+
+        column = self._column(item)
+        if column is not None:
+            return column
+        if isinstance(item, (Variable, Label)):
+            return None, self._code(item.value)
+        raise ValueError("Cannot evaluate references to %r" % (item,))
+
+
+def _lower(e):
+    # Expands deferred expressions, as in the simulation
+    e = make_expression(e).simplify()
+    while isinstance(e, Deferred):
+        e = make_expression(e._func(*e._args)).simplify()
+    return e
+
+
+def compile_expression(expression, table):
+    """
+    Compiles an expression into a closure evaluating it against state tables of the same suite.
+
+    Parameters:
+        expression(Expression): The expression, e.g. the value of a trigger.
+        table(StateTable): A state table of the suite, which defines the layout of the snapshots.
+
+    Returns:
+        *function*: The value of the expression, given a `StateTable`. Node statuses evaluate to their code in
+        `STATUSES` and truth values to 0 or 1.
+
+    Raises:
+        ValueError: If the expression uses functions or references which cannot be evaluated.
+
+    Example::
+
+        holds = pyflow.evaluation.compile_expression(t3.triggers.value, table)
+        if holds(table):
+            ...
+    """
+
+    e = _lower(expression)
+
+    if isinstance(e, (And, Or)):
+        operands = [compile_expression(o, table) for o in e._operands]
+        combine = all if isinstance(e, And) else any
+        if len(operands) == 2:
+            first, second = operands
+            if isinstance(e, And):
+                return lambda t: bool(first(t) and second(t))
+            return lambda t: bool(first(t) or second(t))
+        return lambda t: combine(o(t) for o in operands)
+
+    if isinstance(e, BinOp):
+        op = OPERATORS[type(e)]
+        left = compile_expression(e._left, table)
+        right = compile_expression(e._right, table)
+        return lambda t: op(left(t), right(t))
+
+    if isinstance(e, Not):
+        param = compile_expression(e._param, table)
+        return lambda t: not param(t)
+
+    if isinstance(e, Function):
+        param = compile_expression(e._param, table)
+        if e._name == "cal::date_to_julian":
+            return lambda t: _julian(param(t))
+        raise ValueError("Cannot evaluate function %s" % (e._name,))
+
+    if isinstance(e, NodeStatus):
+        value = table._code(e._status)
+        return lambda t: value
+
+    if isinstance(e, Constant):
+        value = table._code(e._value)
+        return lambda t: value
+
+    if isinstance(e, NodeName):
+        column, value = table._leaf(e._node)
+        if column is None:
+            return lambda t: value
+        if column == "states":
+            return lambda t: t.states[value]
+        if column == "events":
+            return lambda t: t.events[value]
+        if column == "meters":
+            return lambda t: t.meters[value]
+        return lambda t: t.repeats[value]
+
+    raise ValueError("Cannot evaluate expression %r" % (e,))
+
+
+class _Program:
+    """
+    The expressions of a suite, evaluated level by level with NumPy: every operation of a given kind and depth is
+    computed at once, over all expressions.
+    """
+
+    def __init__(self, table):
+        self._table = table
+        self._operations = []
+        self._levels = []
+        self._memo = {}
+
+    def add(self, expression):
+        # Returns the operation computing the expression, expanding it iteratively
+        operations = []
+        stack = [(_lower(expression), None)]
+        while stack:
+            e, children = stack.pop()
+            if children is None:
+                children = self._children(e)
+                if children:
+                    stack.append((e, children))
+                    stack.extend((c, None) for c in reversed(children))
+                    continue
+            operands = operations[len(operations) - len(children) :]
+            del operations[len(operations) - len(children) :]
+            operations.append(self._operation(e, operands))
+        return operations[0]
+
+    def _children(self, e):
+        if isinstance(e, (And, Or)):
+            return [_lower(o) for o in e._operands]
+        if isinstance(e, BinOp):
+            return [_lower(e._left), _lower(e._right)]
+        if isinstance(e, (Not, Function)):
+            return [_lower(e._param)]
+        return []
+
+    def _operation(self, e, children):
+        if isinstance(e, (And, Or)):
+            kind, parameter = ("and" if isinstance(e, And) else "or"), None
+        elif isinstance(e, BinOp):
+            kind, parameter = _NUMPY_OPERATORS[type(e)], None
+        elif isinstance(e, Not):
+            kind, parameter = "not", None
+        elif isinstance(e, Function):
+            if e._name != "cal::date_to_julian":
+                raise ValueError("Cannot evaluate function %s" % (e._name,))
+            kind, parameter = "julian", None
+        elif isinstance(e, NodeStatus):
+            kind, parameter = "constant", self._table._code(e._status)
+        elif isinstance(e, Constant):
+            kind, parameter = "constant", self._table._code(e._value)
+        elif isinstance(e, NodeName):
+            kind, parameter = self._table._leaf(e._node)
+            kind = kind or "constant"
+        else:
+            raise ValueError("Cannot evaluate expression %r" % (e,))
+
+        if not children:
+            # Leaves are shared by all the expressions
+            key = (kind, parameter)
+            if key not in self._memo:
+                self._memo[key] = len(self._operations)
+                self._operations.append((kind, parameter, ()))
+                self._levels.append(0)
+            return self._memo[key]
+
+        self._operations.append((kind, parameter, tuple(children)))
+        self._levels.append(1 + max(self._levels[c] for c in children))
+        return len(self._operations) - 1
+
+    def build(self):
+        # Orders the operations by level and kind, so that each group fills a contiguous slice of values
+        order = sorted(
+            range(len(self._operations)),
+            key=lambda k: (self._levels[k], self._operations[k][0]),
+        )
+        self.slots = numpy.empty(len(order), dtype=numpy.int64)
+        self.slots[order] = numpy.arange(len(order))
+        self.groups = []
+        start = 0
+        while start < len(order):
+            kind = self._operations[order[start]][0]
+            level = self._levels[order[start]]
+            end = start
+            while (
+                end < len(order)
+                and self._levels[order[end]] == level
+                and self._operations[order[end]][0] == kind
+            ):
+                end += 1
+            operations = [self._operations[k] for k in order[start:end]]
+            self.groups.append((kind, start, end, self._arguments(kind, operations)))
+            start = end
+        self.size = len(order)
+
+    def _arguments(self, kind, operations):
+        if kind in ("states", "events", "meters", "repeats"):
+            return numpy.array([p for _, p, _ in operations], dtype=numpy.int64)
+        if kind == "constant":
+            return numpy.array([p for _, p, _ in operations], dtype=numpy.float64)
+        if kind in ("and", "or"):
+            counts = numpy.array([len(c) for _, _, c in operations], dtype=numpy.int64)
+            offsets = numpy.zeros(len(operations), dtype=numpy.int64)
+            numpy.cumsum(counts[:-1], out=offsets[1:])
+            children = numpy.fromiter(
+                (self.slots[c] for _, _, cs in operations for c in cs),
+                dtype=numpy.int64,
+                count=int(counts.sum()),
+            )
+            return children, offsets
+        return tuple(
+            self.slots[numpy.array([c[k] for _, _, c in operations], dtype=numpy.int64)]
+            for k in range(len(operations[0][2]))
+        )
+
+    def evaluate(self, table):
+        values = numpy.empty(self.size)
+        columns = dict(
+            (name, numpy.frombuffer(getattr(table, name), dtype=numpy.float64))
+            for name in ("states", "events", "meters", "repeats")
+        )
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            for kind, start, end, arguments in self.groups:
+                out = values[start:end]
+                if kind in columns:
+                    numpy.take(columns[kind], arguments, out=out)
+                elif kind == "constant":
+                    out[:] = arguments
+                elif kind in ("and", "or"):
+                    children, offsets = arguments
+                    reduce = numpy.logical_and if kind == "and" else numpy.logical_or
+                    out[:] = reduce.reduceat(values[children] != 0, offsets)
+                elif kind == "not":
+                    out[:] = values[arguments[0]] == 0
+                elif kind == "julian":
+                    out[:] = _julian(numpy.floor(values[arguments[0]]))
+                elif kind in ("mod", "floor_divide"):
+                    # ecFlow evaluates a division or a modulo by zero as 0
+                    left, right = values[arguments[0]], values[arguments[1]]
+                    getattr(numpy, kind)(left, right, out=out)
+                    out[right == 0] = 0
+                else:
+                    getattr(numpy, kind)(
+                        values[arguments[0]], values[arguments[1]], out=out
+                    )
+        return values
+
+
+class CompiledTriggers:
+    """
+    The triggers of all the nodes of a suite, compiled for fast evaluation against state tables.
+
+    The triggers, and follow dependencies, of each node are evaluated either by compiled closures, or all at once by
+    NumPy if available, which evaluates millions of triggers in a fraction of a second.
+
+    Parameters:
+        table(StateTable): A state table of the suite, which defines the layout of the snapshots.
+        backend(str): Either ``"numpy"`` or ``"python"``, by default NumPy if it is installed.
+
+    Raises:
+        ValueError: If an expression uses functions or references which cannot be evaluated.
+
+    Example::
+
+        table = pyflow.StateTable(suite)
+        triggers = pyflow.CompiledTriggers(table)
+        table[suite.f.t1] = 'complete'
+        print(triggers.eligible(table))
+    """
+
+    def __init__(self, table, backend=None):
+        if backend is None:
+            backend = "python" if numpy is None else "numpy"
+        if backend not in ("numpy", "python"):
+            raise ValueError("Unknown backend %s" % (backend,))
+        if backend == "numpy" and numpy is None:
+            raise ImportError("The numpy backend requires numpy")
+        self.backend = backend
+        self._size = len(table)
+        self._parents = table.parents
+
+        expressions = {}
+        for i, node in enumerate(table.nodes):
+            terms = [a.value for a in node.children if isinstance(a, (Trigger, Follow))]
+            if terms:
+                expressions[i] = terms[0] if len(terms) == 1 else And(*terms)
+        self._holders = sorted(expressions)
+
+        if backend == "python":
+            self._closures = [
+                compile_expression(expressions[i], table) for i in self._holders
+            ]
+            return
+
+        program = _Program(table)
+        roots = [program.add(expressions[i]) for i in self._holders]
+        program.build()
+        self._program = program
+        self._roots = program.slots[numpy.array(roots, dtype=numpy.int64)]
+        self._holder_array = numpy.array(self._holders, dtype=numpy.int64)
+        # Nodes by depth, to combine the triggers of their ancestors
+        depths = [0] * self._size
+        for i in range(1, self._size):
+            depths[i] = depths[self._parents[i]] + 1
+        by_depth = {}
+        for i, d in enumerate(depths):
+            if d:
+                by_depth.setdefault(d, []).append(i)
+        self._depths = [
+            numpy.array(nodes, dtype=numpy.int64)
+            for _, nodes in sorted(by_depth.items())
+        ]
+        self._parent_array = numpy.frombuffer(
+            self._parents, dtype=self._parents.typecode
+        )
+
+    def evaluate(self, table):
+        """
+        Evaluates the triggers of all nodes.
+
+        Parameters:
+            table(StateTable): The state of the suite.
+
+        Returns:
+            *list*: Whether the triggers of each node hold, in the order of `StateTable.nodes`. Nodes without triggers
+            are true.
+        """
+
+        if self.backend == "python":
+            holds = [True] * self._size
+            for i, closure in zip(self._holders, self._closures):
+                holds[i] = bool(closure(table))
+            return holds
+
+        holds = numpy.ones(self._size, dtype=bool)
+        if self._holders:
+            values = self._program.evaluate(table)
+            holds[self._holder_array] = values[self._roots] != 0
+        return holds
+
+    def eligible(self, table):
+        """
+        Finds the nodes which may run, that is queued nodes whose triggers and the triggers of all their ancestors
+        hold.
+
+        Parameters:
+            table(StateTable): The state of the suite.
+
+        Returns:
+            *list*: The eligible nodes, in tree order.
+        """
+
+        holds = self.evaluate(table)
+        queued = _CODES["queued"]
+        if self.backend == "python":
+            for i in range(1, self._size):
+                holds[i] = holds[i] and holds[self._parents[i]]
+            return [
+                table.nodes[i]
+                for i in range(self._size)
+                if holds[i] and table.states[i] == queued
+            ]
+
+        parents = self._parent_array
+        for nodes in self._depths:
+            holds[nodes] &= holds[parents[nodes]]
+        states = numpy.frombuffer(table.states, dtype=numpy.float64)
+        return [table.nodes[i] for i in numpy.flatnonzero(holds & (states == queued))]
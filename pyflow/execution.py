@@ -0,0 +1,617 @@
+from __future__ import absolute_import
+
+import datetime
+import heapq
+import json
+import os
+import queue
+import signal
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .attributes import (
+    GeneratedVariable,
+    RepeatDateTime,
+    RepeatEnumerated,
+    RepeatString,
+)
+from .nodes import Family
+from .simulation import ACTIVE, NEVER, SimulationReport, Simulator
+from .values import REPEATS
+
+ABORTED = "aborted"
+
+# The limit of the number of jobs run at once, which holds all the tasks
+_PROCESSES = -1
+
+#: The stand-in for ``ecflow_client`` put on the path of the jobs, which forwards its command to the executor.
+CLIENT = """#!{python} -S
+import json
+import os
+import socket
+import sys
+
+request = {{"name": os.environ.get("ECF_NAME"), "password": os.environ.get("ECF_PASS"), "args": sys.argv[1:]}}
+with socket.create_connection((os.environ["ECF_HOST"], int(os.environ["ECF_PORT"]))) as connection:
+    connection.sendall((json.dumps(request) + "\\n").encode())
+    reply = json.loads(connection.makefile().readline() or '{{"error": "No reply from the executor"}}')
+if reply["error"]:
+    sys.stderr.write("ecflow_client: %s\\n" % (reply["error"],))
+    sys.exit(1)
+"""
+
+# The arguments expected by each command, after the command itself
+_COMMANDS = {
+    "init": (0, 1),
+    "complete": (0, 0),
+    "abort": (0, 1),
+    "event": (1, 2),
+    "meter": (2, 2),
+    "label": (1, None),
+}
+
+
+class JobCreationError(RuntimeError):
+    """
+    Raised when the job of a task cannot be created from its script, e.g. for undefined variables or missing
+    include files.
+    """
+
+    pass
+
+
+class _Includes:
+    # A deployment target collecting the content of the headers of a script, by include name
+
+    def __init__(self):
+        self.files = {}
+
+    def save(self, source, target):
+        self.files[os.path.basename(target)] = list(source)
+
+    def copy(self, source, target):
+        with open(source, "r") as f:
+            self.files[os.path.basename(target)] = f.read().split("\n")
+
+
+def preprocess(lines, variables, includes=None, include_path=()):
+    """
+    Creates a job from a task script, as the **ecFlow** server does.
+
+    Handles the ``%include``, ``%includenopp``, ``%includeonce``, ``%nopp``, ``%manual``, ``%comment``, ``%end`` and
+    ``%ecfmicro`` directives, and substitutes the ``%VARIABLE%`` and ``%VARIABLE:default%`` references, including
+    the references in the values of the variables.
+
+    Parameters:
+        lines(list): The lines of the script.
+        variables(dict): The values of the variables, by name.
+        includes(dict): The lines of the included files, by name. Other files are looked up in `include_path`.
+        include_path(list): The directories holding the included files.
+
+    Returns:
+        *list*: The lines of the job.
+
+    Raises:
+        JobCreationError: If a variable is undefined, a micro character is unmatched or an include file is
+            missing.
+
+    Example::
+
+        script, includes = task.generate_script()
+        job = pyflow.execution.preprocess(script, {'ECF_NAME': task.fullname}, includes={'head.h': ['set -e']})
+    """
+
+    includes = includes or {}
+    job = []
+    included = set()
+
+    def read(name):
+        if name in includes:
+            return includes[name]
+        for directory in include_path:
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                with open(path, "r") as f:
+                    return f.read().split("\n")
+        raise JobCreationError("Include file %s not found" % (name,))
+
+    def expand(lines, micro, depth):
+        if depth > 50:
+            raise JobCreationError("Too many nested includes")
+        skipping = verbatim = False
+        for line in lines:
+            if line.startswith(micro):
+                directive, _, argument = line[len(micro) :].partition(" ")
+                argument = argument.strip()
+                if directive == "end":
+                    skipping = verbatim = False
+                    continue
+                if skipping:
+                    continue
+                if verbatim:
+                    job.append(line)
+                    continue
+                if directive in ("manual", "comment"):
+                    skipping = True
+                    continue
+                if directive == "nopp":
+                    verbatim = True
+                    continue
+                if directive == "ecfmicro":
+                    micro = argument[:1] or micro
+                    continue
+                if directive in ("include", "includenopp", "includeonce"):
+                    name = os.path.basename(
+                        _substitute(argument.strip('<>"'), variables, micro)
+                    )
+                    if directive == "includeonce":
+                        if name in included:
+                            continue
+                        included.add(name)
+                    if directive == "includenopp":
+                        job.extend(read(name))
+                    else:
+                        micro = expand(read(name), micro, depth + 1)
+                    continue
+            if skipping:
+                continue
+            if verbatim:
+                job.append(line)
+                continue
+            job.append(_substitute(line, variables, micro))
+        return micro
+
+    expand(lines, "%", 0)
+    return job
+
+
+def _substitute(line, variables, micro, depth=0):
+    parts = line.split(micro)
+    if len(parts) == 1:
+        return line
+    if len(parts) % 2 == 0:
+        raise JobCreationError("Unmatched %s in line: %s" % (micro, line))
+    if depth > 10:
+        raise JobCreationError("Recursive variable in line: %s" % (line,))
+
+    for k in range(1, len(parts), 2):
+        name, found, default = parts[k].partition(":")
+        if not name:
+            parts[k] = micro
+        elif name in variables:
+            parts[k] = _substitute(str(variables[name]), variables, micro, depth + 1)
+        elif found:
+            parts[k] = default
+        else:
+            raise JobCreationError("Variable %s is not defined" % (name,))
+    return "".join(parts)
+
+
+class ExecutionReport(SimulationReport):
+    """
+    The outcome of the local execution of a suite.
+
+    All times are in seconds since the start of the execution.
+
+    Attributes:
+        makespan(float): The time when the last task completed or aborted.
+        tasks(dict): The (ready, start, end) times of each run, by task path.
+        not_run(list): The paths of the tasks that never ran, e.g. held by triggers or aborted tasks.
+        aborted(dict): The reason why each aborted task failed, by task path.
+        labels(dict): The last values of the labels set by the jobs, as dictionaries indexed by task path.
+        limits(dict): The usage of each limit, by path, as in `SimulationReport`.
+        hosts(dict): The usage of each host, by name, as in `SimulationReport`.
+        directory(str): The directory holding the jobs and their outputs.
+    """
+
+    def __init__(
+        self, makespan, tasks, not_run, aborted, labels, limits, hosts, directory
+    ):
+        super().__init__(makespan, tasks, not_run, limits, hosts)
+        self.aborted = aborted
+        self.labels = labels
+        self.directory = directory
+
+    def __str__(self):
+        lines = [super().__str__()]
+        if self.aborted:
+            lines.append("Aborted:")
+            for name, reason in sorted(self.aborted.items()):
+                lines.append("    %s: %s" % (name, reason))
+        return "\n".join(lines)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            error = self.server.executor._request(
+                request["name"], request["password"], request["args"]
+            )
+        except (ValueError, KeyError, TypeError) as e:
+            error = "Invalid request: %s" % (e,)
+        self.wfile.write((json.dumps({"error": error}) + "\n").encode())
+
+
+class LocalExecutor(Simulator):
+    """
+    Runs a suite on the local machine without an **ecFlow** server, for end-to-end testing.
+
+    The tasks are scheduled in the same way as by the `Simulator`, in tree order, honouring triggers, complete
+    expressions, limits, default statuses, repeats and time dependencies, the latter in real time. The job of each
+    task is created from `Task.generate_script`, with the variables of the task and the variables otherwise generated
+    by the server, and run by `bash`, with at most `processes` jobs running at once.
+
+    The calls of the jobs to ``ecflow_client`` are handled by a stand-in, which takes precedence over the
+    ``ecflow_client`` of the host of the tasks, and supports the ``--init``, ``--complete``, ``--abort``, ``--event``,
+    ``--meter`` and ``--label`` commands. As for `LocalHost`, a job which exits without notifying its completion
+    completes if its exit code is zero and aborts otherwise. Aborted tasks are not retried, and their ancestors abort.
+
+    Parameters:
+        suite(Suite_): The suite to run.
+        processes(int): The number of jobs running at once, the number of processors by default.
+        directory(str): The directory of the jobs and of their outputs, a temporary directory by default.
+        until(float): Stops the execution after this many seconds, killing the running jobs.
+
+    Example::
+
+        with pyflow.Suite('s', host=pyflow.LocalHost()) as s:
+            pyflow.Task('t', script='echo hello')
+
+        report = pyflow.LocalExecutor(s, processes=8).run()
+        assert not report.aborted
+    """
+
+    def __init__(self, suite, processes=None, directory=None, until=None):
+        super().__init__(suite, until=until)
+        self._processes = processes or os.cpu_count() or 1
+        self._directory = directory
+
+    ###############################################################################
+
+    def _index(self):
+        super()._index()
+        self._paths = dict((n.fullname, i) for i, n in enumerate(self._nodes))
+        # Every task takes one of the worker processes
+        self._limits[_PROCESSES] = {
+            "name": None,
+            "capacity": self._processes,
+            "used": 0,
+            "peak": 0,
+            "waits": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0,
+        }
+        for i, task in enumerate(self._tasks):
+            if task:
+                self._inlimits[i] = self._inlimits[i] + (_PROCESSES,)
+
+    def run(self):
+        """
+        Runs the suite, until no task runs and no task can start.
+
+        Returns:
+            ExecutionReport: The run times, aborted tasks, queue waits and host utilisation.
+        """
+
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix="pyflow-")
+        os.makedirs(self._directory, exist_ok=True)
+
+        self._start = datetime.datetime.now()
+        self._offset = (
+            self._start - datetime.datetime.combine(self._start.date(), datetime.time())
+        ).total_seconds()
+        self._clock = time.monotonic()
+        self._messages = queue.Queue()
+        self._passwords = {}
+        self._jobs = {}
+        self._aborted = {}
+        self._labels = {}
+        self._makespan = 0.0
+        self._reset()
+
+        server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _Handler)
+        server.daemon_threads = True
+        server.executor = self
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self._address = server.server_address
+        self._environment = self._job_environment()
+        self._pool = ThreadPoolExecutor(max_workers=self._processes)
+
+        try:
+            self._loop()
+        finally:
+            self._kill()
+            self._pool.shutdown(wait=True)
+            server.shutdown()
+            server.server_close()
+
+        del self._limits[_PROCESSES]
+        report = self._report(self._makespan)
+        return ExecutionReport(
+            report.makespan,
+            report.tasks,
+            report.not_run,
+            self._aborted,
+            self._labels,
+            report.limits,
+            report.hosts,
+            self._directory,
+        )
+
+    def _loop(self):
+        while True:
+            self._settle()
+            self._dispatch()
+            wake = self._queue[0][0] if self._queue else NEVER
+            if not self._jobs and (wake == NEVER or wake > self._until):
+                return
+
+            timeout = min(wake, self._until) - self._elapsed()
+            messages = []
+            try:
+                messages.append(
+                    self._messages.get(
+                        timeout=None if timeout == NEVER else max(timeout, 0)
+                    )
+                )
+                while True:
+                    messages.append(self._messages.get_nowait())
+            except queue.Empty:
+                pass
+
+            self._now = self._elapsed()
+            for message in messages:
+                self._receive(*message)
+            if self._now >= self._until:
+                self._kill()
+                for i, password in list(self._passwords.items()):
+                    if password is not None:
+                        self._finish(i, "killed after %ss" % (self._until,))
+                return
+            while self._queue and self._queue[0][0] <= self._now:
+                t, _, _, i = heapq.heappop(self._queue)
+                if self._wakes[i] == t:
+                    self._wakes[i] = None
+                    self._add_subtree(i)
+
+    def _elapsed(self):
+        return time.monotonic() - self._clock
+
+    ###############################################################################
+
+    def _job_environment(self):
+        directory = os.path.join(self._directory, "bin")
+        os.makedirs(directory, exist_ok=True)
+        client = os.path.join(directory, "ecflow_client")
+        with open(client, "w") as f:
+            f.write(CLIENT.format(python=sys.executable))
+        os.chmod(client, 0o755)
+
+        environment = dict(os.environ)
+        environment["PATH"] = directory + os.pathsep + environment.get("PATH", "")
+        # Bash functions take precedence over the ecflow_client put on the path by the job preambles
+        environment["BASH_FUNC_ecflow_client%%"] = '() {  "%s" "$@"\n}' % (client,)
+        environment["ECF_HOST"], environment["ECF_PORT"] = (
+            str(x) for x in self._address
+        )
+        return environment
+
+    def _variables(self, i, password, job, output):
+        task = self._nodes[i]
+        variables = {}
+        for name, exportable in task.all_exportables.items():
+            if isinstance(exportable, GeneratedVariable):
+                continue
+            if isinstance(exportable, REPEATS):
+                _, j, _ = self._attributes[id(exportable)]
+                values, index = self._repeats[j]
+                if isinstance(exportable, (RepeatString, RepeatEnumerated)):
+                    variables[name] = exportable.values[index]
+                elif isinstance(exportable, RepeatDateTime):
+                    variables[name] = (
+                        datetime.datetime(1970, 1, 1)
+                        + datetime.timedelta(seconds=values[index])
+                    ).strftime("%Y%m%dT%H%M%S")
+                else:
+                    variables[name] = values[index]
+            else:
+                variables[name] = exportable.value
+
+        # The variables generated by the server, unless set on the nodes
+        now = datetime.datetime.now()
+        generated = {
+            "SUITE": self._suite.name,
+            "ECF_HOME": self._directory,
+            "ECF_DATE": now.strftime("%Y%m%d"),
+            "YYYY": now.strftime("%Y"),
+            "ECF_MM": now.strftime("%m"),
+            "DD": now.strftime("%d"),
+            "DATE": now.strftime("%d.%m.%Y"),
+            "DAY": now.strftime("%A").lower(),
+            "DOW": now.strftime("%w"),
+            "DOY": str(now.timetuple().tm_yday),
+            "ECF_MONTH": now.strftime("%B").lower(),
+            "ECF_JULIAN": str(now.toordinal() + 1721425),
+            "TIME": now.strftime("%H%M"),
+            "ECF_TIME": now.strftime("%H:%M"),
+            "ECF_CLOCK": "%s:%d:%s:%d"
+            % (
+                now.strftime("%A").lower(),
+                now.month,
+                now.strftime("%w"),
+                now.timetuple().tm_yday,
+            ),
+        }
+        if isinstance(task.parent, Family):
+            generated["FAMILY"] = task.parent.fullname[len(self._suite.fullname) + 1 :]
+            generated["FAMILY1"] = task.parent.name
+        for name, value in generated.items():
+            variables.setdefault(name, value)
+
+        # The variables of the job, and where to reach the executor
+        variables.update(
+            {
+                "TASK": task.name,
+                "ECF_NAME": task.fullname,
+                "ECF_PASS": password,
+                "ECF_TRYNO": 1,
+                "ECF_RID": "",
+                "ECF_JOB": job,
+                "ECF_JOBOUT": output,
+                "ECF_SCRIPT": task.deploy_path or job,
+                "ECF_HOST": self._address[0],
+                "ECF_PORT": self._address[1],
+            }
+        )
+        return variables
+
+    def _create_job(self, i, password):
+        task = self._nodes[i]
+        path = os.path.join(self._directory, task.fullname.lstrip("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        job, output = path + ".job1", path + ".1"
+
+        variables = self._variables(i, password, job, output)
+        try:
+            script, headers = task.generate_script()
+        except RuntimeError as e:
+            raise JobCreationError(str(e.__cause__ or e))
+        includes = _Includes()
+        for header in headers:
+            header.install(includes)
+        include_path = [
+            _substitute(str(d), variables, "%")
+            for d in str(variables.get("ECF_INCLUDE", "")).split(":")
+            if d
+        ] + [str(variables["ECF_HOME"])]
+
+        lines = preprocess(script, variables, includes.files, include_path)
+        with open(job, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return job, output
+
+    def _launch(self, i):
+        password = "%08x" % (len(self._runs) + 1,)
+        self._runs[i] = (self._ready_times[i], self._now, None)
+        self._passwords[i] = password
+        try:
+            job, output = self._create_job(i, password)
+        except (JobCreationError, OSError) as e:
+            self._finish(i, "job creation failed: %s" % (e,))
+            return
+        self._jobs[password] = None
+        self._pool.submit(self._execute, i, password, job, output)
+
+    def _execute(self, i, password, job, output):
+        # Runs in a worker thread
+        try:
+            with open(output, "w") as out:
+                process = subprocess.Popen(
+                    ["bash", job],
+                    stdin=subprocess.DEVNULL,
+                    stdout=out,
+                    stderr=subprocess.STDOUT,
+                    cwd=self._directory,
+                    env=self._environment,
+                    start_new_session=True,
+                )
+                self._jobs[password] = process
+                code = process.wait()
+        except OSError as e:
+            code = str(e)
+        self._messages.put((i, password, "exit", [code]))
+
+    def _kill(self):
+        for process in list(self._jobs.values()):
+            if process is not None and process.poll() is None:
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except OSError:
+                    pass
+
+    ###############################################################################
+
+    def _request(self, name, password, args):
+        # Checks a call to ecflow_client, in a server thread, and queues it
+        i = self._paths.get(name)
+        if i is None or not self._tasks[i]:
+            return "Task %s does not exist" % (name,)
+        if not args or not args[0].startswith("--"):
+            return "Expected a command, got %s" % (" ".join(args),)
+
+        command, equals, value = args[0][2:].partition("=")
+        values = ([value] if equals else []) + list(args[1:])
+        if command not in _COMMANDS:
+            return "Command --%s is not supported by the local executor" % (command,)
+        low, high = _COMMANDS[command]
+        if len(values) < low or (high is not None and len(values) > high):
+            return "Wrong number of arguments for --%s: %s" % (command, values)
+
+        if command == "event":
+            if values[0] not in (self._events[i] or {}):
+                return "Event %s does not exist on %s" % (values[0], name)
+            if values[1:] not in ([], ["set"], ["clear"]):
+                return "Expected set or clear, got %s" % (values[1],)
+        if command == "meter":
+            if values[0] not in (self._meters[i] or {}):
+                return "Meter %s does not exist on %s" % (values[0], name)
+            try:
+                int(values[1])
+            except ValueError:
+                return "Expected an integer meter value, got %s" % (values[1],)
+
+        self._messages.put((i, password, command, values))
+        return None
+
+    def _receive(self, i, password, command, values):
+        # Handles a call to ecflow_client or the end of a job, ignoring the ones from former runs
+        if command == "exit":
+            del self._jobs[password]
+        if self._passwords.get(i) != password or self._state[i] != ACTIVE:
+            return
+
+        if command == "event":
+            self._events[i][values[0]] = 0 if values[1:] == ["clear"] else 1
+            self._changed(i)
+        elif command == "meter":
+            self._meters[i][values[0]][0] = int(values[1])
+            self._changed(i)
+        elif command == "label":
+            self._labels.setdefault(self._nodes[i].fullname, {})[values[0]] = " ".join(
+                values[1:]
+            )
+        elif command == "complete":
+            self._finish(i)
+        elif command == "abort":
+            self._finish(i, (values[0] if values else "") or "aborted")
+        elif command == "exit":
+            code = values[0]
+            self._finish(i, None if code == 0 else "exit code %s" % (code,))
+
+    def _finish(self, i, reason=None):
+        # Task i completed, or aborted for the given reason
+        self._release(i)
+        self._passwords[i] = None
+        ready, start, _ = self._runs[i]
+        self._runs[i] = (ready, start, self._now)
+        self._makespan = max(self._makespan, self._now)
+        if self._task_hosts[i] is not None:
+            self._hosts[self._task_hosts[i].name]["busy"] += self._now - start
+
+        if reason is None:
+            self._completed(i)
+            return
+
+        self._aborted[self._nodes[i].fullname] = reason
+        while i >= 0 and self._state[i] != ABORTED:
+            self._state[i] = ABORTED
+            self._changed(i)
+            i = self._parents[i]
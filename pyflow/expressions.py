@@ -2,6 +2,9 @@ from __future__ import absolute_import
 
 import functools
 import operator
+import re
+import weakref
+from contextlib import contextmanager
 
 
 class Overloaded:
@@ -186,20 +189,131 @@ class Overloaded:
 
 UNDEFINED = object()
 
+# Interned expressions, keyed by their structure. Children of an interned expression are
+# interned themselves, so the identity of the children is enough to describe the structure.
+_INTERNED = weakref.WeakValueDictionary()
 
-class Expression(Overloaded):
+# Memo of generated expressions and relative paths, only set while a suite is being generated.
+_GENERATED = None
+
+
+class Interned(type):
+    """
+    Metaclass sharing structurally identical expressions, so that a given subexpression is only
+    ever built, simplified and generated once.
+    """
+
+    def __call__(cls, *args, **kwargs):
+        obj = super().__call__(*args, **kwargs)
+        key = obj._structural_key()
+        if key is None:
+            return obj
+        try:
+            return _INTERNED[key]
+        except KeyError:
+            _INTERNED[key] = obj
+            return obj
+
+
+class GenerationCache:
+    """
+    Memoized results for the duration of a suite generation, keyed by object identities. The
+    objects used as keys are kept alive with the results, so that their identities cannot be
+    reused by other objects (e.g. the transient nodes built by MultipleNode).
+    """
+
+    def __init__(self):
+        self.expressions = {}
+        self.paths = {}
+        self.ancestors = {}
+        self.exportables = {}
+
+
+def current_generation_cache():
+    """Returns the active GenerationCache, or `None` outside of a suite generation."""
+    return _GENERATED
+
+
+@contextmanager
+def generation_cache():
+    """
+    Memoizes generated expressions and relative paths for the duration of a suite generation.
+    Nested uses share the outermost cache, which is discarded on exit as the tree may change
+    between generations.
+    """
+    global _GENERATED
+
+    if _GENERATED is not None:
+        yield _GENERATED
+        return
+
+    _GENERATED = GenerationCache()
+    try:
+        yield _GENERATED
+    finally:
+        _GENERATED = None
+
+
+def memoized_relative_path(func):
+    """
+    Memoizes `relative_path(self, node)` during generation. The path only depends on the parent
+    of the context node, so that sibling tasks referring to the same node share the result.
+    """
+
+    @functools.wraps(func)
+    def wrapped(self, node):
+        context = getattr(node, "parent", None)
+        # Contexts without a parent node (e.g. a suite) cannot be shared
+        if _GENERATED is None or not isinstance(context, Overloaded):
+            return func(self, node)
+
+        key = (id(self), id(context))
+        try:
+            return _GENERATED.paths[key][0]
+        except KeyError:
+            path = func(self, node)
+            _GENERATED.paths[key] = (path, self, context)
+            return path
+
+    return wrapped
+
+
+class Expression(Overloaded, metaclass=Interned):
     def make_expression(self):
         return self
 
+    def _structural_key(self):
+        return None
+
     def simplify(self):
-        return self._simplify()
+        try:
+            return self._simplified
+        except AttributeError:
+            pass
+        self._simplified = self._simplify()
+        return self._simplified
 
     def _simplify(self):
         return self
 
+    def _subexpressions(self):
+        return ()
+
     def evaluate(self):
         return UNDEFINED
 
+    def generate_expression(self, parent=None):
+        if _GENERATED is None:
+            return self._generate_expression(parent)
+
+        key = (id(self), id(parent))
+        try:
+            return _GENERATED.expressions[key][0]
+        except KeyError:
+            result = self._generate_expression(parent)
+            _GENERATED.expressions[key] = (result, self, parent)
+            return result
+
 
 class Deferred(Expression):
     """
@@ -233,6 +347,9 @@ class Deferred(Expression):
         """
         return self._func(*self._args).generate_expression(parent)
 
+    def _subexpressions(self):
+        return (make_expression(self._func(*self._args)),)
+
 
 class BinOp(Expression):
     def __init__(self, op, left, right, priority):
@@ -241,7 +358,17 @@ class BinOp(Expression):
         self._right = make_expression(right)
         self._priority = priority
 
-    def generate_expression(self, parent=None):
+    def _structural_key(self):
+        return (type(self), self._op, id(self._left), id(self._right))
+
+    def __reduce__(self):
+        # Unpickled through the interning, so that loaded expressions are shared with the ones built later
+        return type(self), (self._left, self._right)
+
+    def _subexpressions(self):
+        return (self._left, self._right)
+
+    def _generate_expression(self, parent=None):
         expr1 = self._left.generate_expression(parent)
         if self._priority >= self._left._priority:
             expr1 = "(%s)" % expr1
@@ -260,9 +387,21 @@ class BinOp(Expression):
         self._right._graph(dot, parent)
 
     def simplify(self):
-        self._left = self._left.simplify()
-        self._right = self._right.simplify()
-        return self._simplify()
+        try:
+            return self._simplified
+        except AttributeError:
+            pass
+
+        # Expressions are shared, so they must never be modified in place
+        left = self._left.simplify()
+        right = self._right.simplify()
+        if left is self._left and right is self._right:
+            node = self
+        else:
+            node = type(self)(left, right)
+
+        self._simplified = node._simplify()
+        return self._simplified
 
 
 class Ne(BinOp):
@@ -295,58 +434,156 @@ class Eq(BinOp):
         super().__init__("eq", left, right, 1)
 
 
-class Or(BinOp):
-    def __init__(self, left, right):
-        super().__init__("or", left, right, 0)
+class BoolOp(Expression):
+    """
+    An n-ary conjunction or disjunction.
 
-    def _simplify(self):
-        (l, r) = (self._left.evaluate(), self._right.evaluate())
+    Operators build these two operands at a time, the simplifier then flattens nested operators of
+    the same kind, removes duplicated operands and applies absorption. Deep operator chains (e.g.
+    thousands of and-ed nodes) are simplified and generated iteratively, without recursion.
+    """
 
-        if l is not UNDEFINED and r is not UNDEFINED:
-            return self._left.value or self._right.value
+    _priority = 0
 
-        if l is not UNDEFINED:
-            if l is False:
-                return self._right
+    def __init__(self, op, *operands):
+        self._op = op
+        self._operands = tuple(make_expression(o) for o in operands)
+
+    def _structural_key(self):
+        return (type(self), tuple(id(o) for o in self._operands))
+
+    def __reduce__(self):
+        return type(self), self._operands
+
+    def _subexpressions(self):
+        return self._operands
+
+    def _walk(self):
+        # Post-order over the nested boolean operators, without recursion
+        order = []
+        seen = set()
+        stack = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                order.append(node)
+                continue
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            stack.append((node, True))
+            for o in node._operands:
+                if isinstance(o, BoolOp):
+                    stack.append((o, False))
+        return order
+
+    def _render(self, leaf):
+        # Flattens the nested operators into a list of tokens, without recursion
+        out = []
+        stack = [self]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                out.append(item)
+                continue
+            if not isinstance(item, BoolOp):
+                out.append(leaf(item))
+                continue
+            tokens = []
+            for o in item._operands:
+                if tokens:
+                    tokens.append(" %s " % item._op)
+                if item._priority >= o._priority:
+                    tokens += ["(", o, ")"]
+                else:
+                    tokens.append(o)
+            stack.extend(reversed(tokens))
+        return "".join(out)
+
+    def _generate_expression(self, parent=None):
+        return self._render(lambda o: o.generate_expression(parent))
 
-            if l is True:
-                return Constant(True)
+    def __repr__(self):
+        return "(%s)" % self._render(repr)
 
-        if r is not UNDEFINED:
-            if r is False:
-                return self._left
+    def _graph(self, dot, parent):
+        for node in self._walk():
+            for o in node._operands:
+                if not isinstance(o, BoolOp):
+                    o._graph(dot, parent)
+
+    def _terms(self):
+        # Operands of the chain of nested operators of the same kind, in order, without recursion
+        cls = type(self)
+        terms = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node is self or (
+                isinstance(node, cls) and "_simplified" not in node.__dict__
+            ):
+                stack.extend(reversed(node._operands))
+            else:
+                terms.append(node)
+        return terms
 
-            if r is True:
-                return Constant(True)
+    def simplify(self):
+        try:
+            return self._simplified
+        except AttributeError:
+            pass
 
-        return self
+        self._simplified = self._combine([t.simplify() for t in self._terms()])
+        return self._simplified
 
+    def _combine(self, operands):
+        cls = type(self)
+        identity, absorbing = cls._identity, not cls._identity
 
-class And(BinOp):
-    def __init__(self, left, right):
-        super().__init__("and", left, right, 0)
+        flat = []
+        seen = set()
+        for o in operands:
+            for term in o._operands if isinstance(o, cls) else (o,):
+                value = term.evaluate()
+                if value is identity:
+                    continue
+                if value is absorbing:
+                    return Constant(absorbing)
+                if id(term) not in seen:
+                    seen.add(id(term))
+                    flat.append(term)
 
-    def _simplify(self):
-        (l, r) = (self._left.evaluate(), self._right.evaluate())
+        # Absorption: a and (a or b) -> a, a or (a and b) -> a
+        flat = [
+            o
+            for o in flat
+            if not (
+                isinstance(o, BoolOp) and any(id(term) in seen for term in o._operands)
+            )
+        ]
 
-        if l is not UNDEFINED and r is not UNDEFINED:
-            return self._left.value and self._right.value
+        if not flat:
+            return Constant(identity)
+        if len(flat) == 1:
+            return flat[0]
 
-        if l is not UNDEFINED:
-            if l is True:
-                return self._right
+        result = cls(*flat)
+        result._simplified = result
+        return result
 
-            if l is False:
-                return Constant(False)
 
-        if r is not UNDEFINED:
-            if r is True:
-                return self._left
+class Or(BoolOp):
+    _identity = False
 
-            if r is False:
-                return Constant(False)
+    def __init__(self, *operands):
+        super().__init__("or", *operands)
 
-        return self
+
+class And(BoolOp):
+    _identity = True
+
+    def __init__(self, *operands):
+        super().__init__("and", *operands)
 
 
 class Sub(BinOp):
@@ -377,7 +614,14 @@ class NodeStatus(Atom):
     def __init__(self, status):
         self._status = status
 
-    def generate_expression(self, parent=None):
+    def _structural_key(self):
+        return (NodeStatus, str(self._status))
+
+    def __reduce__(self):
+        # Unpickled through the interning, like the other uses of the status
+        return NodeStatus, (self._status,)
+
+    def _generate_expression(self, parent=None):
         return str(self._status)
 
     def __repr__(self):
@@ -394,7 +638,13 @@ class NodeName(Atom):
     def make_expression(self):
         return self
 
-    def generate_expression(self, parent=None):
+    def _structural_key(self):
+        return (NodeName, id(self._node))
+
+    def __reduce__(self):
+        return NodeName, (self._node,)
+
+    def _generate_expression(self, parent=None):
         return self._node.relative_path(parent)
 
     def __repr__(self):
@@ -408,7 +658,17 @@ class Constant(Atom):
     def __init__(self, value):
         self._value = value
 
-    def generate_expression(self, parent=None):
+    def _structural_key(self):
+        try:
+            hash(self._value)
+        except TypeError:
+            return None
+        return (Constant, type(self._value), self._value)
+
+    def __reduce__(self):
+        return Constant, (self._value,)
+
+    def _generate_expression(self, parent=None):
         return str(self._value)
 
     def __repr__(self):
@@ -426,7 +686,16 @@ class Function(Atom):
         self._name = name
         self._param = make_expression(param)
 
-    def generate_expression(self, parent=None):
+    def _structural_key(self):
+        return (Function, self._name, id(self._param))
+
+    def __reduce__(self):
+        return Function, (self._name, self._param)
+
+    def _subexpressions(self):
+        return (self._param,)
+
+    def _generate_expression(self, parent=None):
         return "%s(%s)" % (self._name, self._param.generate_expression(parent))
 
     def _graph(self, dot, parent):
@@ -440,7 +709,16 @@ class Not(Atom):
     def __init__(self, param):
         self._param = make_expression(param)
 
-    def generate_expression(self, parent=None):
+    def _structural_key(self):
+        return (Not, id(self._param))
+
+    def __reduce__(self):
+        return Not, (self._param,)
+
+    def _subexpressions(self):
+        return (self._param,)
+
+    def _generate_expression(self, parent=None):
         return "not (%s)" % (self._param.generate_expression(parent),)
 
     def _graph(self, dot, parent):
@@ -523,6 +801,392 @@ def expression_from_json(e):
         return JSON_FACTORIES[op](op, args)
 
 
+class ExpressionSyntaxError(ValueError):
+    """
+    Exception raised when an ecFlow expression cannot be parsed, or refers to unknown nodes.
+
+    Parameters:
+        text(str): The expression.
+        position(int): The offset of the error in the expression.
+        message(str): The description of the error.
+    """
+
+    def __init__(self, text, position, message):
+        super().__init__("{} at offset {} of '{}'".format(message, position, text))
+        self.text = text
+        self.position = position
+
+
+_TOKENS = re.compile(
+    r"\s*(?:"
+    r"(?P<number>\d+(?![\w.:/]))"
+    r"|(?P<function>\w+::\w+)"
+    r"|(?P<name>(?:[\w.]|/(?=[\w.]))+(?::\w+)?)"
+    r"|(?P<operator>==|!=|<=|>=|&&|\|\||[<>!~()+\-*/%])"
+    r"|(?P<invalid>\S)"
+    r")"
+)
+
+_OPERATORS = {
+    "==": "eq",
+    "!=": "ne",
+    "<=": "le",
+    ">=": "ge",
+    "<": "lt",
+    ">": "gt",
+    "&&": "and",
+    "||": "or",
+    "!": "not",
+    "~": "not",
+}
+
+_KEYWORDS = {
+    "and": "and",
+    "AND": "and",
+    "or": "or",
+    "OR": "or",
+    "not": "not",
+    "NOT": "not",
+    "eq": "eq",
+    "ne": "ne",
+    "lt": "lt",
+    "le": "le",
+    "gt": "gt",
+    "ge": "ge",
+}
+
+_COMPARISONS = {"eq": Eq, "ne": Ne, "lt": Lt, "le": Le, "gt": Gt, "ge": Ge}
+
+_ARITHMETIC = {"+": Add, "-": Sub, "/": Div, "%": Mod}
+
+_STATUS_WORDS = frozenset(
+    (
+        "unknown",
+        "complete",
+        "queued",
+        "aborted",
+        "submitted",
+        "active",
+        "suspended",
+        "set",
+        "clear",
+    )
+)
+
+
+class _Unresolved:
+    # An attribute of an extern node, whose kind depends on how it is used
+    def __init__(self, path):
+        self.path = path
+
+
+class ExpressionParser:
+    """
+    Parses ecFlow trigger and complete expressions, e.g. ``(../a == complete and /s/f/t:ev) or x:YMD ge 20240101``,
+    into expressions on the nodes of a pyflow tree.
+
+    Relative paths are resolved from the parent of the node holding the expression, as ecFlow does. The parser
+    memoizes resolved paths, so that a single parser should be used for all the expressions of a tree.
+
+    Parameters:
+        externs(bool): Whether references to nodes outside of the suite are mapped to extern nodes, rather than
+            rejected.
+        suites(list): Other suites in which absolute paths are resolved, besides the suite of the node.
+
+    Example::
+
+        parser = pyflow.ExpressionParser()
+        t3.triggers = parser.parse('../f1/t1 == complete and t2:ev', t3)
+    """
+
+    def __init__(self, externs=False, suites=()):
+        from .nodes import Node
+
+        self._node_class = Node
+        self._externs = externs
+        self._suites = dict((suite.name, suite) for suite in suites)
+        self._paths = {}
+        self._extern_nodes = {}
+
+    def parse(self, text, node):
+        """
+        Parses an expression.
+
+        Parameters:
+            text(str): The ecFlow expression.
+            node(*Node*): The node holding the expression, from which relative paths are resolved.
+
+        Returns:
+            *expression*: The expression.
+
+        Raises:
+            ExpressionSyntaxError: If the expression is invalid or refers to unknown nodes.
+        """
+
+        self._text = text
+        self._node = node
+        self._tokens = self._tokenize(text)
+        self._operators = [v if k == "operator" else "" for k, v, _ in self._tokens]
+        self._operators.append(None)
+        self._index = 0
+        result = self._condition(self._or())
+        if self._peek() is not None:
+            self._error("Unexpected '{}'".format(self._tokens[self._index][1]))
+        return result
+
+    def _tokenize(self, text):
+        tokens = []
+        for match in _TOKENS.finditer(text):
+            kind = match.lastgroup
+            if kind is None:
+                continue
+            value = match.group(kind)
+            position = match.start(kind)
+            if kind == "operator":
+                value = _OPERATORS.get(value, value)
+            elif kind == "name" and value in _KEYWORDS:
+                kind, value = "operator", _KEYWORDS[value]
+            elif kind == "invalid":
+                raise ExpressionSyntaxError(
+                    text, position, "Unexpected character '{}'".format(value)
+                )
+            tokens.append((kind, value, position))
+        return tokens
+
+    def _error(self, message):
+        if self._index < len(self._tokens):
+            position = self._tokens[self._index][2]
+        else:
+            position = len(self._text)
+        raise ExpressionSyntaxError(self._text, position, message)
+
+    def _peek(self):
+        # The next operator, or an empty string for operands, or None at the end
+        return self._operators[self._index]
+
+    def _expect(self, value):
+        if self._peek() != value:
+            self._error("Expected '{}'".format(value))
+        self._index += 1
+
+    def _or(self):
+        operands = [self._and()]
+        while self._peek() == "or":
+            self._index += 1
+            operands.append(self._and())
+        if len(operands) == 1:
+            return operands[0]
+        return Or(*(self._condition(o) for o in operands))
+
+    def _and(self):
+        operands = [self._not()]
+        while self._peek() == "and":
+            self._index += 1
+            operands.append(self._not())
+        if len(operands) == 1:
+            return operands[0]
+        return And(*(self._condition(o) for o in operands))
+
+    def _not(self):
+        if self._peek() == "not":
+            self._index += 1
+            return Not(self._condition(self._not()))
+        return self._comparison()
+
+    def _comparison(self):
+        left = self._sum()
+        op = self._peek()
+        if op not in _COMPARISONS:
+            return left
+        self._index += 1
+        return _COMPARISONS[op](self._value(left), self._value(self._sum()))
+
+    def _sum(self):
+        left = self._product()
+        while self._peek() in ("+", "-"):
+            op = _ARITHMETIC[self._tokens[self._index][1]]
+            self._index += 1
+            left = op(self._value(left), self._value(self._product()))
+        return left
+
+    def _product(self):
+        left = self._atom()
+        while self._peek() in ("/", "%", "*"):
+            if self._peek() == "*":
+                self._error("Multiplication is not supported")
+            op = _ARITHMETIC[self._tokens[self._index][1]]
+            self._index += 1
+            left = op(self._value(left), self._value(self._atom()))
+        return left
+
+    def _atom(self):
+        if self._index == len(self._tokens):
+            self._error("Unexpected end of expression")
+        kind, value, _ = self._tokens[self._index]
+
+        if kind == "number":
+            self._index += 1
+            return Constant(int(value))
+
+        if kind == "function":
+            self._index += 1
+            self._expect("(")
+            param = self._value(self._or())
+            self._expect(")")
+            return Function(value, param)
+
+        if kind == "operator":
+            if value != "(":
+                self._error("Unexpected '{}'".format(value))
+            self._index += 1
+            result = self._or()
+            self._expect(")")
+            return result
+
+        if value in _STATUS_WORDS:
+            self._index += 1
+            return NodeStatus(value)
+
+        result = self._resolve(value)
+        self._index += 1
+        return result
+
+    def _resolve(self, path):
+        # Paths are resolved relative to the parent of the holding node, except for suites
+        node = self._node
+        context = node.parent if isinstance(node.parent, self._node_class) else node
+        key = (id(context), path)
+        try:
+            return self._paths[key][0]
+        except KeyError:
+            pass
+
+        node_path, _, attribute = path.partition(":")
+        if node_path.startswith("/"):
+            target = self._absolute(node_path)
+        else:
+            target = self._relative(context, node_path)
+
+        if target is None:
+            result = self._extern(path, node_path, attribute)
+        elif attribute:
+            if attribute not in target._nodes:
+                self._error(
+                    "Unknown attribute {} of {}".format(attribute, target.fullname)
+                )
+            result = NodeName(target._nodes[attribute])
+        else:
+            result = NodeName(target)
+
+        # The context is kept alive along with the result, so that its identity is not reused
+        self._paths[key] = (result, context)
+        return result
+
+    def _absolute(self, path):
+        names = path.strip("/").split("/")
+        suite = self._node.suite
+        if names[0] != suite.name:
+            suite = self._suites.get(names[0])
+            if suite is None:
+                return None
+        return self._relative(suite, "/".join(names[1:]))
+
+    def _relative(self, context, path):
+        node = context
+        for name in path.split("/"):
+            if name in ("", "."):
+                continue
+            if name == "..":
+                node = node.parent
+                if not isinstance(node, self._node_class):
+                    self._error("Path {} goes above the suite".format(path))
+                continue
+            child = node._nodes.get(name)
+            if not isinstance(child, self._node_class):
+                self._error("Unknown node {} in {}".format(name, node.fullname))
+            node = child
+        return node
+
+    def _extern(self, path, node_path, attribute):
+        if not self._externs:
+            self._error("Unknown suite in {}".format(path))
+        if attribute:
+            return _Unresolved(path)
+        if node_path not in self._extern_nodes:
+            from .extern import ExternNode
+
+            self._extern_nodes[node_path] = NodeName(ExternNode(node_path))
+        return self._extern_nodes[node_path]
+
+    def _extern_attribute(self, unresolved, cls):
+        from .extern import ExternEvent, ExternMeter
+
+        factory = ExternEvent if cls == "event" else ExternMeter
+        key = (cls, unresolved.path)
+        if key not in self._extern_nodes:
+            self._extern_nodes[key] = NodeName(factory(unresolved.path))
+        return self._extern_nodes[key]
+
+    def _value(self, e):
+        # Extern attributes compared to values are taken to be meters
+        if isinstance(e, _Unresolved):
+            return self._extern_attribute(e, "meter")
+        return e
+
+    def _condition(self, e):
+        # Extern attributes used as conditions are taken to be events
+        if isinstance(e, _Unresolved):
+            return self._extern_attribute(e, "event")
+        return e
+
+
+def expression_from_string(text, node, externs=False):
+    """
+    Parses an ecFlow trigger or complete expression into an expression on the nodes of a pyflow tree.
+
+    Parameters:
+        text(str): The ecFlow expression, e.g. ``../a == complete and /s/f/t:ev``.
+        node(*Node*): The node holding the expression, from which relative paths are resolved.
+        externs(bool): Whether references to nodes outside of the suite are mapped to extern nodes.
+
+    Returns:
+        *expression*: The expression.
+
+    Raises:
+        ExpressionSyntaxError: If the expression is invalid or refers to unknown nodes.
+
+    Example::
+
+        t3.triggers = pyflow.expression_from_string('t1 == complete or t2:YMD ge 20240101', t3)
+    """
+
+    return ExpressionParser(externs=externs).parse(text, node)
+
+
+def node_names(expression):
+    """
+    Yields the node and attribute references of an expression, without recursion.
+
+    Parameters:
+        expression(expression): The expression to walk.
+
+    Returns:
+        *generator*: The NodeName atoms of the expression, in order of appearance.
+    """
+
+    seen = set()
+    stack = [make_expression(expression)]
+    while stack:
+        e = stack.pop()
+        if id(e) in seen:
+            continue
+        seen.add(id(e))
+        if isinstance(e, NodeName):
+            yield e
+        else:
+            stack.extend(reversed(e._subexpressions()))
+
+
 def all_complete(nodes):
     """
     Returns a trigger expression for all of the supplied nodes being complete.
@@ -538,10 +1202,14 @@ def all_complete(nodes):
         trigger = pyflow.all_complete(pyflow.Task('task-{}'.format(i)) for i in range(10))
     """
 
+    nodes = list(nodes)
     if not nodes:
         raise ValueError("cannot wait on an empty list of nodes")
 
-    return functools.reduce(operator.and_, nodes)
+    if len(nodes) == 1:
+        return nodes[0]
+
+    return And(*nodes)
 
 
 def sequence(nodes):
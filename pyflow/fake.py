@@ -0,0 +1,515 @@
+from __future__ import absolute_import
+
+import random
+import time
+import weakref
+from contextlib import contextmanager
+
+from .importer import ecflow
+
+# The status of a family or suite is the first of its children's statuses in this order
+_PRECEDENCE = ("aborted", "active", "submitted", "queued", "complete", "unknown")
+
+
+class FakeAttribute:
+    """
+    An event, meter, label, variable or repeat of a `FakeNode`, with the accessors of the **ecFlow** attributes.
+    """
+
+    def __init__(self, name, value, default=None):
+        self._name = name
+        self._value = value
+        self._default = value if default is None else default
+
+    def name(self):
+        return self._name
+
+    def number(self):
+        return 0
+
+    def value(self):
+        return self._value
+
+    def new_value(self):
+        return self._value
+
+    def min(self):
+        return self._default
+
+    def empty(self):
+        return self._value is None
+
+    def __repr__(self):
+        return "FakeAttribute(%r, %r)" % (self._name, self._value)
+
+
+class FakeNode:
+    """
+    A node on a `FakeServer`, with the accessors of the **ecFlow** nodes used to read their states.
+
+    Attributes:
+        path(str): The path of the node.
+        kind(str): `"suite"`, `"family"` or `"task"`.
+        state(str): The status of the node, as in `pyflow.evaluation.STATUSES`, without suspension.
+        suspended(bool): Whether the node is suspended.
+        parent(FakeNode): The parent node, `None` for suites.
+    """
+
+    def __init__(self, path, kind, parent=None):
+        self.path = path
+        self.kind = kind
+        self.parent = parent
+        self.state = "queued"
+        self.defstatus = "queued"
+        self.suspended = False
+        self.nodes = []
+        self.events = []
+        self.meters = []
+        self.labels = []
+        self.variables = []
+        self.repeat = FakeAttribute(None, None)
+
+    def name(self):
+        return self.path.rsplit("/", 1)[-1]
+
+    def get_abs_node_path(self):
+        return self.path
+
+    def get_state(self):
+        return self.state
+
+    def get_dstate(self):
+        return "suspended" if self.suspended else self.state
+
+    def get_repeat(self):
+        return self.repeat
+
+    def get_all_nodes(self):
+        nodes = []
+        stack = list(reversed(self.nodes))
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            stack.extend(reversed(node.nodes))
+        return nodes
+
+    def attribute(self, kind, name):
+        """
+        Returns an attribute of the node.
+
+        Parameters:
+            kind(str): `"event"`, `"meter"`, `"label"` or `"variable"`.
+            name(str): The name of the attribute.
+
+        Returns:
+            *FakeAttribute*: The attribute, or `None` if the node has no such attribute.
+        """
+
+        for a in getattr(self, kind + "s"):
+            if a.name() == name:
+                return a
+        return None
+
+    def __repr__(self):
+        return "FakeNode(%s, %s)" % (self.path, self.get_dstate())
+
+
+def _state(node):
+    # The status of a family or suite, from the statuses of its children
+    states = set(n.state for n in node.nodes)
+    return next((s for s in _PRECEDENCE if s in states), node.state)
+
+
+def _read(ecflow_node, parent, subtree=True):
+    # Copies an ecflow node and its subtree, or only the node itself
+    if parent is None:
+        path = "/" + ecflow_node.name()
+        kind = "suite"
+    else:
+        path = parent.path + "/" + ecflow_node.name()
+        kind = "task" if isinstance(ecflow_node, ecflow.Task) else "family"
+
+    node = FakeNode(path, kind, parent)
+    node.events = [
+        FakeAttribute(e.name() or str(e.number()), False) for e in ecflow_node.events
+    ]
+    node.meters = [FakeAttribute(m.name(), m.min()) for m in ecflow_node.meters]
+    node.labels = [FakeAttribute(a.name(), a.value()) for a in ecflow_node.labels]
+    node.variables = [FakeAttribute(v.name(), v.value()) for v in ecflow_node.variables]
+    repeat = ecflow_node.get_repeat()
+    if not repeat.empty():
+        node.repeat = FakeAttribute(repeat.name(), repeat.value())
+
+    defstatus = str(ecflow_node.get_defstatus())
+    if defstatus in _PRECEDENCE:
+        node.defstatus = node.state = defstatus
+    elif defstatus == "suspended":
+        node.suspended = True
+    if kind != "task" and subtree:
+        node.nodes = [_read(n, node) for n in ecflow_node.nodes]
+    return node
+
+
+class FakeServer:
+    """
+    An in-process stand-in for an **ecFlow** server, for testing and benchmarking the code talking to servers
+    without running one. It stores the definitions it receives, records the calls made by its clients, and models
+    the statuses of the nodes and the values of their events, meters, labels, variables and repeats.
+
+    Statuses only change when requested by clients (suspend, resume, requeue) or by `set_state`, the statuses of
+    families and suites being computed from their children as **ecFlow** does. Alterations of variables, labels and
+    default statuses and changes of the order of the nodes are applied; other alterations are only recorded.
+
+    Each call waits for `latency` seconds, and fails with a *RuntimeError* as injected by `fail`, or at random with
+    probability `failure_rate`.
+
+    Parameters:
+        latency(float,dict): The duration of each call in seconds, or a dictionary of durations by command.
+        failure_rate(float): The probability of a call failing.
+        seed(int): The seed of the random generator for failures.
+
+    Attributes:
+        calls(list): The calls made by the clients, as tuples of the command and its arguments.
+        definitions(list): The definitions received, as `ecflow.Defs`.
+        suites(list): The suites on the server, as `FakeNode`.
+
+    Example::
+
+        server = pyflow.FakeServer(latency=0.001)
+        with server.patch():
+            suite.replace_on_server('localhost:3141')
+        server.set_state('/s/f/t', 'complete')
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = []
+        self.definitions = []
+        self.suites = []
+        self._nodes = {}
+        self._failures = []
+        self._random = random.Random(seed)
+        # The paths of the nodes changed since the last `sync_local` of each client, "/" when nodes are added or
+        # removed, so that only the changes not yet reported are kept
+        self._changes = weakref.WeakKeyDictionary()
+
+    def _record(self, path):
+        for changes in self._changes.values():
+            changes[path] = None
+
+    def client(self, host="localhost", port="3141"):
+        """
+        Returns a client of the server.
+
+        Returns:
+            *FakeClient*: The client.
+        """
+
+        return FakeClient(self, host, port)
+
+    @contextmanager
+    def patch(self):
+        """
+        Makes `ecflow.Client` create clients of this server for the duration of the context, e.g. for
+        `replace_on_server`, `ClientSession` and `StateMonitor`.
+        """
+
+        original = ecflow.Client
+        ecflow.Client = self.client
+        try:
+            yield self
+        finally:
+            ecflow.Client = original
+
+    def fail(self, command=None, times=1, message="Connection refused"):
+        """
+        Makes the next calls of a command fail.
+
+        Parameters:
+            command(str): The command, by default any.
+            times(int): The number of calls to fail.
+            message(str): The error message.
+        """
+
+        self._failures += [(command, message)] * times
+
+    def _call(self, command, *args):
+        self.calls.append((command,) + args)
+        latency = self.latency
+        if isinstance(latency, dict):
+            latency = latency.get(command, 0.0)
+        if latency:
+            time.sleep(latency)
+
+        for i, (c, message) in enumerate(self._failures):
+            if c is None or c == command:
+                del self._failures[i]
+                raise RuntimeError(message)
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            raise RuntimeError("Connection reset by peer")
+
+    def find_abs_node(self, path):
+        """
+        Returns a node of the server.
+
+        Parameters:
+            path(str): The path of the node.
+
+        Returns:
+            *FakeNode*: The node, or `None` if there is no such node.
+        """
+
+        return self._nodes.get(path)
+
+    def _node(self, path):
+        node = self._nodes.get(path)
+        if node is None:
+            raise RuntimeError("Could not find node {}".format(path))
+        return node
+
+    def __getitem__(self, path):
+        return self._node(path)
+
+    def _index(self, node):
+        self._nodes[node.path] = node
+        for n in node.get_all_nodes():
+            self._nodes[n.path] = n
+
+    def _unindex(self, node):
+        del self._nodes[node.path]
+        for n in node.get_all_nodes():
+            del self._nodes[n.path]
+
+    def _insert(self, node):
+        # Adds a node to the server, in place of the node with the same path if any
+        siblings = self.suites if node.parent is None else node.parent.nodes
+        existing = self._nodes.get(node.path)
+        if existing is not None:
+            siblings[siblings.index(existing)] = node
+            self._unindex(existing)
+        else:
+            siblings.append(node)
+        self._index(node)
+        return node
+
+    def _changed(self, node):
+        self._record(node.path)
+        while node.parent is not None:
+            node = node.parent
+            state = _state(node)
+            if state == node.state:
+                break
+            node.state = state
+            self._record(node.path)
+
+    def load(self, defs, force=False):
+        self.definitions.append(defs)
+        for suite in defs.suites:
+            node = _read(suite, None)
+            existing = self._nodes.get(node.path)
+            if existing is not None:
+                if not force:
+                    raise RuntimeError("Suite {} already exists".format(node.path))
+                self.suites.remove(existing)
+                self._unindex(existing)
+            self.suites.append(node)
+            self._index(node)
+        self._record("/")
+
+    def replace(self, path, defs, parent=True, force=False):
+        self.definitions.append(defs)
+        # The nodes of the definition down to the replaced one, only reading the subtree to add to the server
+        chain = []
+        nodes = defs.suites
+        for name in path.strip("/").split("/"):
+            node = next((n for n in nodes if n.name() == name), None)
+            if node is None:
+                raise RuntimeError("Node {} is not in the definition".format(path))
+            chain.append(node)
+            nodes = [] if isinstance(node, ecflow.Task) else node.nodes
+
+        # Creates the missing ancestors from the definition, without their other children, as with the parent
+        # option of ecflow_client
+        paths = [
+            "/" + "/".join(n.name() for n in chain[: i + 1]) for i in range(len(chain))
+        ]
+        i = next(
+            (i for i, p in enumerate(paths) if p not in self._nodes), len(chain) - 1
+        )
+        if i < len(chain) - 1 and not parent:
+            raise RuntimeError("Parent of {} does not exist on the server".format(path))
+        target = self._nodes[paths[i - 1]] if i else None
+        for j in range(i, len(chain)):
+            target = self._insert(_read(chain[j], target, j == len(chain) - 1))
+        self._changed(target)
+        self._record("/")
+
+    def delete(self, paths, force=False):
+        for path in [paths] if isinstance(paths, str) else paths:
+            node = self._node(path)
+            if node.parent is None:
+                self.suites.remove(node)
+            else:
+                node.parent.nodes.remove(node)
+            self._unindex(node)
+            if node.parent is not None:
+                node.parent.state = _state(node.parent)
+                self._changed(node.parent)
+        self._record("/")
+
+    def alter(self, paths, alter_type, attribute, name="", value=""):
+        for path in [paths] if isinstance(paths, str) else paths:
+            node = self._node(path)
+            if attribute in ("variable", "label"):
+                existing = node.attribute(attribute, name)
+                attributes = getattr(node, attribute + "s")
+                if alter_type == "delete":
+                    if existing is not None:
+                        attributes.remove(existing)
+                elif existing is not None:
+                    existing._value = value
+                else:
+                    attributes.append(FakeAttribute(name, value))
+            elif attribute == "defstatus":
+                node.defstatus = name
+            self._record(path)
+
+    def order(self, path, order_type):
+        node = self._node(path)
+        siblings = self.suites if node.parent is None else node.parent.nodes
+        i = siblings.index(node)
+        del siblings[i]
+        positions = {
+            "top": 0,
+            "bottom": len(siblings),
+            "up": max(i - 1, 0),
+            "down": i + 1,
+        }
+        if order_type not in positions:
+            raise RuntimeError("Unsupported order {}".format(order_type))
+        siblings.insert(positions[order_type], node)
+        self._record("/")
+
+    def suspend(self, paths):
+        for path in [paths] if isinstance(paths, str) else paths:
+            self._node(path).suspended = True
+            self._record(path)
+
+    def resume(self, paths):
+        for path in [paths] if isinstance(paths, str) else paths:
+            self._node(path).suspended = False
+            self._record(path)
+
+    def requeue(self, paths, option=""):
+        for path in [paths] if isinstance(paths, str) else paths:
+            root = self._node(path)
+            for node in [root] + root.get_all_nodes():
+                if option == "abort" and node.state != "aborted":
+                    continue
+                node.state = (
+                    node.defstatus if node.defstatus in _PRECEDENCE else "queued"
+                )
+                for a in node.events + node.meters:
+                    a._value = a._default
+                for a in node.labels:
+                    a._value = a._default
+                self._record(node.path)
+            self._changed(root)
+
+    def set_state(self, path, state):
+        """
+        Sets the status of a task, as if it was run, updating the statuses of its ancestors.
+
+        Parameters:
+            path(str): The path of the task.
+            state(str): The status, as in `pyflow.evaluation.STATUSES`.
+        """
+
+        node = self._node(path)
+        node.state = state
+        self._changed(node)
+
+    def set_attribute(self, path, kind, name, value):
+        """
+        Sets the value of an event, meter or label, as if it was set by a running task.
+
+        Parameters:
+            path(str): The path of the node.
+            kind(str): `"event"`, `"meter"` or `"label"`.
+            name(str): The name of the attribute.
+            value: The value.
+        """
+
+        attribute = self._node(path).attribute(kind, name)
+        if attribute is None:
+            raise RuntimeError("Node {} has no {} {}".format(path, kind, name))
+        attribute._value = value
+        self._record(path)
+
+
+class FakeClient:
+    """
+    A client of a `FakeServer`, with the interface of `ecflow.Client`. Calls wait for the latency of the server and
+    may fail as configured on the server.
+
+    The definition returned by `get_defs` is the live view of the server, and `changed_node_paths` lists the nodes
+    changed since the previous `sync_local`, or nothing after a full synchronisation.
+    """
+
+    def __init__(self, server, host="localhost", port="3141"):
+        self.server = server
+        self.host = host
+        self.port = str(port)
+        self.changed_node_paths = []
+
+    def ping(self):
+        self.server._call("ping")
+
+    def load(self, defs, force=False):
+        self.server._call("load", defs, force)
+        self.server.load(defs, force)
+
+    def begin_suite(self, name, force=False):
+        self.server._call("begin_suite", name, force)
+        self.server._node("/" + name)
+
+    def begin_all_suites(self, force=False):
+        self.server._call("begin_all_suites", force)
+
+    def replace(self, path, defs, parent=True, force=False):
+        self.server._call("replace", path, defs, parent, force)
+        self.server.replace(path, defs, parent, force)
+
+    def delete(self, paths, force=False):
+        self.server._call("delete", paths, force)
+        self.server.delete(paths, force)
+
+    def alter(self, paths, alter_type, attribute, name="", value=""):
+        self.server._call("alter", paths, alter_type, attribute, name, value)
+        self.server.alter(paths, alter_type, attribute, name, value)
+
+    def order(self, path, order_type):
+        self.server._call("order", path, order_type)
+        self.server.order(path, order_type)
+
+    def suspend(self, paths):
+        self.server._call("suspend", paths)
+        self.server.suspend(paths)
+
+    def resume(self, paths):
+        self.server._call("resume", paths)
+        self.server.resume(paths)
+
+    def requeue(self, paths, option=""):
+        self.server._call("requeue", paths, option)
+        self.server.requeue(paths, option)
+
+    def sync_local(self):
+        self.server._call("sync_local")
+        # Nothing is reported by the first, full, synchronisation
+        self.changed_node_paths = list(self.server._changes.get(self, ()))
+        self.server._changes[self] = {}
+
+    def get_defs(self):
+        return self.server
@@ -0,0 +1,234 @@
+from __future__ import absolute_import
+
+from .attributes import (
+    Attribute,
+    Complete,
+    Exportable,
+    InLimit,
+    RepeatDate,
+    RepeatDateList,
+    RepeatDateTime,
+    Variable,
+    _Trigger,
+    find_limit,
+)
+from .expressions import make_expression, node_names
+from .nodes import Node, Task
+
+# Repeats generating variables for the parts of their dates
+_DATES = (RepeatDate, RepeatDateList, RepeatDateTime)
+
+
+def _referenced(node):
+    # The attributes referenced by the expressions of the whole tree, which must stay where they are
+    while isinstance(node.parent, Node):
+        node = node.parent
+
+    referenced = set()
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        for child in n._nodes.values():
+            if isinstance(child, Node):
+                stack.append(child)
+            elif isinstance(child, (_Trigger, Complete)):
+                for name in node_names(make_expression(child.value)):
+                    if isinstance(name._node, Attribute):
+                        referenced.add(id(name._node))
+    return referenced
+
+
+def _signature(attribute, node):
+    # What an attribute defines, for the attributes that can be hoisted or removed, otherwise None
+    if type(attribute) is Variable:
+        if callable(attribute._value):
+            return None
+        return ("variable", str(attribute.value), attribute.export)
+    if isinstance(attribute, InLimit):
+        limit = find_limit(node, attribute.value)
+        if limit is None:
+            return None
+        return ("inlimit", id(limit))
+    return None
+
+
+class _Hoister:
+    def __init__(self, node):
+        self.referenced = _referenced(node)
+        # The removed attributes, by identity of the node they were defined on
+        self.removed = {}
+        self._shadows = {}
+
+    def shadows(self, node):
+        # The variables generated on a node, which the variables inherited by the node do not override, as names and
+        # prefixes, e.g. "YMD_" for the YMD_YYYY, YMD_MM, YMD_DD, YMD_DOW and YMD_JULIAN of a date repeat
+        try:
+            return self._shadows[id(node)]
+        except KeyError:
+            pass
+
+        names = set()
+        prefixes = []
+        for a in node._nodes.values():
+            if isinstance(a, Exportable) and type(a) is not Variable:
+                names.add(a.name)
+                if isinstance(a, _DATES):
+                    prefixes.append(a.name + "_")
+        self._shadows[id(node)] = result = (names, tuple(prefixes))
+        return result
+
+    def candidates(self, node):
+        # The attributes of a node which could be hoisted or removed, with their signatures, by name
+        result = {}
+        shadows = None
+        for a in node._nodes.values():
+            if isinstance(a, Node) or id(a) in self.referenced:
+                continue
+            signature = _signature(a, node)
+            if signature is None:
+                continue
+            if shadows is None:
+                shadows = self.shadows(node)
+            if a.name not in shadows[0] and not a.name.startswith(shadows[1]):
+                result[a.name] = (a, signature)
+        return result
+
+    def remove(self, node, attribute):
+        node.remove_node(attribute)
+        self.removed.setdefault(id(node), (node, []))[1].append(attribute)
+
+    def hoist(self, family):
+        children = [c for c in family._nodes.values() if isinstance(c, Node)]
+        if not children:
+            return
+
+        common = None
+        definitions = []
+        for child in children:
+            attributes = self.candidates(child)
+            definitions.append(attributes)
+            if common is None:
+                common = dict((k, s) for k, (_, s) in attributes.items())
+            else:
+                common = dict(
+                    (k, s)
+                    for k, s in common.items()
+                    if k in attributes and attributes[k][1] == s
+                )
+            if not common:
+                return
+
+        for name, signature in common.items():
+            first = definitions[0][name][0]
+            existing = family._nodes.get(name)
+            if existing is not None:
+                # The children redefine the value of the family, or cannot inherit it
+                if (
+                    isinstance(existing, Node)
+                    or _signature(existing, family) != signature
+                ):
+                    continue
+            elif isinstance(first, InLimit) and find_limit(
+                family, first.value
+            ) is not find_limit(children[0], first.value):
+                # An inlimit given by name would find another limit from the family
+                continue
+
+            for child, attributes in zip(children, definitions):
+                self.remove(child, attributes[name][0])
+
+            if existing is None:
+                with family:
+                    if isinstance(first, Variable):
+                        Variable(first.name, first._value).export = first.export
+                    else:
+                        type(first)(first._value)
+
+    def inherit(self, node, inherited):
+        # The variables and inlimits inherited by the children of a node
+        inherited = dict(inherited)
+        names, prefixes = self.shadows(node)
+        for name in names:
+            inherited[("variable", name)] = None
+        if prefixes:
+            for key in [k for k in inherited if k[1].startswith(prefixes)]:
+                inherited[key] = None
+        for a in node._nodes.values():
+            if not isinstance(a, Node):
+                signature = _signature(a, node)
+                if signature is not None:
+                    inherited[(signature[0], a.name)] = signature
+        return inherited
+
+    def remove_redundant(self, node):
+        ancestors = []
+        parent = node.parent
+        while isinstance(parent, Node):
+            ancestors.append(parent)
+            parent = parent.parent
+
+        inherited = {}
+        for a in reversed(ancestors):
+            inherited = self.inherit(a, inherited)
+
+        stack = [(node, inherited)]
+        while stack:
+            n, inherited = stack.pop()
+            for name, (a, signature) in self.candidates(n).items():
+                if inherited.get((signature[0], name)) == signature:
+                    self.remove(n, a)
+
+            if not isinstance(n, Task):
+                inherited = self.inherit(n, inherited)
+                stack.extend(
+                    (c, inherited) for c in n._nodes.values() if isinstance(c, Node)
+                )
+
+
+def hoist_attributes(node):
+    """
+    Moves the variables and inlimits shared by all the children of a family to the family, and removes those
+    redefined with the value they inherit, in place, reducing the size of the definition and the memory used by the
+    server, without changing the effective variables or limits of any task.
+
+    The variables set by hosts on each node where they are used (e.g. `ECF_JOB_CMD`), the inlimits added to each
+    task by `Host.add_to_limits`, and the variables set on many sibling tasks are thus defined once on their common
+    ancestors. The families are processed bottom up, so that attributes move as far up as they are shared.
+
+    Variables with values computed by functions, variables overriding those generated on their node (e.g. by a
+    repeat), and the attributes referenced by trigger or complete expressions are left in place.
+
+    Note:
+        This is an optional pass, to run once the suite is built and before it is generated: the hoisted attributes
+        are no longer accessible from the nodes they were defined on, e.g. as `task.ECF_JOB_CMD`.
+
+    Parameters:
+        node(*Node*): The root of the tree, usually a suite.
+
+    Returns:
+        *dict*: The removed attributes, as lists indexed by the node they were defined on, either hoisted to its
+        parent or redundant.
+
+    Example::
+
+        removed = pyflow.hoist_attributes(suite)
+        print(sum(len(a) for a in removed.values()), 'attributes removed')
+    """
+
+    hoister = _Hoister(node)
+
+    nodes = []
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        nodes.append(n)
+        if not isinstance(n, Task):
+            stack.extend(c for c in n._nodes.values() if isinstance(c, Node))
+
+    # Children before their parents, so that attributes move up as far as they are shared
+    for n in reversed(nodes):
+        if not isinstance(n, Task) and not n._extern:
+            hoister.hoist(n)
+
+    hoister.remove_redundant(node)
+    return dict(hoister.removed.values())
@@ -0,0 +1,625 @@
+from __future__ import absolute_import
+
+import json
+import re
+from collections import Counter
+
+from .attributes import (
+    Autocancel,
+    Complete,
+    Cron,
+    Date,
+    Day,
+    Defstatus,
+    Event,
+    InLimit,
+    Label,
+    Late,
+    Limit,
+    Meter,
+    RepeatDate,
+    RepeatDateList,
+    RepeatDateTime,
+    RepeatDay,
+    RepeatEnumerated,
+    RepeatInteger,
+    RepeatString,
+    Time,
+    Today,
+    Trigger,
+    Variable,
+)
+from .expressions import And, ExpressionParser, Or
+from .nodes import (
+    Family,
+    Node,
+    Suite,
+    Task,
+    _from_json,
+    _is_json_attribute,
+    _is_json_family,
+    _set_json_attribute,
+)
+from .state import MAP
+
+_QUOTED = re.compile(r'"((?:[^"\\]|\\.)*)"')
+
+_WHITESPACE = re.compile(r"\s*")
+
+_DECODER = json.JSONDecoder()
+
+_NODE_TYPES = {"suite": Suite, "family": Family, "task": Task}
+
+
+class DefinitionError(ValueError):
+    """
+    Exception raised when a line of a definition file cannot be loaded.
+
+    Parameters:
+        number(int): The line number.
+        line(str): The line.
+        reason(str): The description of the error.
+    """
+
+    def __init__(self, number, line, reason):
+        super().__init__("Line {}: {} ({})".format(number, line.strip(), reason))
+        self.number = number
+
+
+def _strip_comment(text):
+    # ecFlow appends the state of attributes as comments
+    return text.split("#", 1)[0].strip()
+
+
+def _quoted(text):
+    # The quoted values of a line, e.g. of string repeats
+    return [v.replace('\\"', '"') for v in _QUOTED.findall(text)]
+
+
+def _integers(text):
+    return [int(v) for v in text.split(",")]
+
+
+class DefinitionLoader:
+    """
+    Loads **ecFlow** definition files into pyflow suites, without building the intermediate **ecFlow** definition.
+
+    The file is read line by line, so that its size only matters through the size of the resulting suites. Nodes
+    and their attributes are created as they are read, while trigger and complete expressions are parsed once all
+    the suites are loaded, as they may refer to nodes defined further down the file.
+
+    Attributes without a pyflow equivalent (e.g. clocks, zombies or verifies) are skipped, and counted in `skipped`,
+    as are the options dropped from the attributes that are loaded: the `-n` and `-s` options and token counts of
+    inlimits (`"inlimit -n"`, `"inlimit -s"`, `"inlimit tokens"`) and the numbers of named events
+    (`"event number"`).
+
+    Parameters:
+        host(Host_): The host of the suites, by default the **ecFlow** default host.
+        externs(bool): Whether references to nodes outside of the loaded suites are mapped to extern nodes, rather
+            than rejected.
+
+    Example::
+
+        loader = pyflow.DefinitionLoader(host=pyflow.LocalHost())
+        suites = loader.load('legacy.def')
+        print(loader.lines, loader.skipped)
+    """
+
+    def __init__(self, host=None, externs=True):
+        self.host = host
+        self.externs = externs
+        #: The number of lines read.
+        self.lines = 0
+        #: The number of lines skipped, by keyword, and of options dropped, by keyword and option.
+        self.skipped = Counter()
+
+        self._attributes = {
+            "autocancel": self._autocancel,
+            "complete": self._complete,
+            "cron": self._cron,
+            "date": self._date,
+            "day": self._day,
+            "defstatus": self._defstatus,
+            "edit": self._edit,
+            "event": self._event,
+            "inlimit": self._inlimit,
+            "label": self._label,
+            "late": self._late,
+            "limit": self._limit,
+            "meter": self._meter,
+            "repeat": self._repeat,
+            "time": self._time,
+            "today": self._today,
+            "trigger": self._trigger,
+        }
+
+    def load(self, source):
+        """
+        Loads the suites of a definition file.
+
+        Parameters:
+            source(str,file): The path of the definition file, or an iterable of its lines, e.g. an open file.
+
+        Returns:
+            *list*: The suites of the file.
+
+        Raises:
+            DefinitionError: If a line cannot be loaded.
+            ExpressionSyntaxError: If a trigger or complete expression is invalid.
+        """
+
+        if isinstance(source, str):
+            with open(source) as f:
+                return self._load(f)
+        return self._load(source)
+
+    def _load(self, lines):
+        suites = []
+        self._stack = []
+        self._expressions = []
+
+        for number, line in enumerate(lines, self.lines + 1):
+            self.lines = number
+            text = line.strip()
+            if not text or text[0] == "#":
+                continue
+            keyword, _, rest = text.partition(" ")
+            try:
+                if keyword in ("suite", "family", "task"):
+                    node = self._node(keyword, _strip_comment(rest))
+                    if keyword == "suite":
+                        suites.append(node)
+                elif keyword in ("endsuite", "endfamily", "endtask"):
+                    self._end(keyword)
+                elif keyword in self._attributes:
+                    if not self._stack:
+                        raise ValueError("attribute outside of a suite")
+                    self._attributes[keyword](self._stack[-1], rest.strip())
+                else:
+                    self.skipped[keyword] += 1
+            except (ValueError, IndexError, KeyError, TypeError) as e:
+                raise DefinitionError(number, line, e) from e
+
+        if self._stack:
+            raise DefinitionError(self.lines, "", "missing endsuite")
+
+        parser = ExpressionParser(externs=self.externs, suites=suites)
+        for node, cls, parts in self._expressions:
+            expression = None
+            for option, text in parts:
+                e = parser.parse(text, node)
+                if expression is None:
+                    expression = e
+                elif option == "-o":
+                    expression = Or(expression, e)
+                else:
+                    expression = And(expression, e)
+            with node:
+                cls(expression)
+
+        return suites
+
+    def _node(self, keyword, name):
+        if keyword == "suite":
+            if self._stack:
+                raise ValueError("nested suite")
+            node = Suite(name, host=self.host)
+        else:
+            if not self._stack:
+                raise ValueError("{} outside of a suite".format(keyword))
+            if isinstance(self._stack[-1], Task):
+                # Tasks are implicitly ended by their next sibling
+                self._stack.pop()
+            if isinstance(self._stack[-1], Task):
+                raise ValueError("{} inside a task".format(keyword))
+            with self._stack[-1]:
+                node = Family(name) if keyword == "family" else Task(name)
+        self._stack.append(node)
+        return node
+
+    def _end(self, keyword):
+        if self._stack and isinstance(self._stack[-1], Task):
+            self._stack.pop()
+        if keyword == "endtask":
+            return
+        expected = Suite if keyword == "endsuite" else Family
+        if not self._stack or type(self._stack[-1]) is not expected:
+            raise ValueError("unexpected {}".format(keyword))
+        self._stack.pop()
+
+    ###############################################################################
+
+    def _replace(self, node, name):
+        # Variables and labels may already be set by the host
+        if name in node._nodes:
+            node.remove_node(node._nodes[name])
+
+    def _edit(self, node, text):
+        name, _, value = text.partition(" ")
+        value = value.strip()
+        if value[:1] in ("'", '"'):
+            value = value[1 : value.rindex(value[0])]
+        self._replace(node, name)
+        with node:
+            Variable(name, value)
+
+    def _label(self, node, text):
+        name, _, value = text.partition(" ")
+        values = _quoted(value)
+        value = values[0] if values else _strip_comment(value)
+        self._replace(node, name)
+        with node:
+            Label(name, value.replace("\\n", "\n"))
+
+    def _limit(self, node, text):
+        name, value = _strip_comment(text).split()[:2]
+        with node:
+            Limit(name, int(value))
+
+    def _inlimit(self, node, text):
+        # Options (-n, -s) and token counts have no pyflow equivalent
+        values = _strip_comment(text).split()
+        for option in values:
+            if option[0] == "-":
+                self.skipped["inlimit " + option] += 1
+        values = [v for v in values if v[0] != "-"]
+        if len(values) > 1 and int(values[1]) != 1:
+            self.skipped["inlimit tokens"] += 1
+        with node:
+            InLimit(values[0])
+
+    def _event(self, node, text):
+        values = _strip_comment(text).split()
+        name = values[1] if len(values) > 1 and values[0].isdigit() else values[0]
+        if name in ("set", "clear"):
+            name = values[0]
+        elif name != values[0]:
+            # Events have either a name or a number
+            self.skipped["event number"] += 1
+        with node:
+            Event(name)
+
+    def _meter(self, node, text):
+        values = _strip_comment(text).split()
+        with node:
+            Meter(values[0], *[int(v) for v in values[1:4]])
+
+    def _repeat(self, node, text):
+        kind, _, text = text.partition(" ")
+        text = text.strip()
+        if kind == "day":
+            with node:
+                RepeatDay(int(_strip_comment(text)))
+            return
+
+        name, _, text = text.partition(" ")
+        with node:
+            if kind in ("integer", "date"):
+                values = [int(v) for v in _strip_comment(text).split()]
+                cls = RepeatInteger if kind == "integer" else RepeatDate
+                cls(name, *values[:3])
+            elif kind == "datetime":
+                RepeatDateTime(name, *_strip_comment(text).split()[:3])
+            elif kind == "string":
+                RepeatString(name, _quoted(text))
+            elif kind == "enumerated":
+                values = _quoted(text) or _strip_comment(text).split()
+                RepeatEnumerated(name, values)
+            elif kind == "datelist":
+                values = _quoted(text) or _strip_comment(text).split()
+                RepeatDateList(name, [int(v) for v in values])
+            else:
+                raise ValueError("unknown repeat kind {}".format(kind))
+
+    def _defstatus(self, node, text):
+        with node:
+            Defstatus(MAP[_strip_comment(text)])
+
+    def _time(self, node, text):
+        with node:
+            Time(_strip_comment(text))
+
+    def _today(self, node, text):
+        with node:
+            Today(_strip_comment(text))
+
+    def _cron(self, node, text):
+        values = _strip_comment(text).split()
+        options = {}
+        while values and values[0] in ("-w", "-d", "-m"):
+            option, value = values[0], values[1]
+            values = values[2:]
+            if option == "-w":
+                days = value.split(",")
+                options["days_of_week"] = [int(d) for d in days if d[-1] != "L"]
+                options["last_week_days_of_the_month"] = [
+                    int(d[:-1]) for d in days if d[-1] == "L"
+                ]
+            elif option == "-d":
+                days = value.split(",")
+                options["days_of_month"] = [int(d) for d in days if d != "L"]
+                options["last_day_of_the_month"] = "L" in days
+            else:
+                options["months"] = _integers(value)
+        with node:
+            Cron(" ".join(values), **options)
+
+    def _date(self, node, text):
+        with node:
+            Date(_strip_comment(text))
+
+    def _day(self, node, text):
+        with node:
+            Day(_strip_comment(text))
+
+    def _late(self, node, text):
+        with node:
+            Late(_strip_comment(text))
+
+    def _autocancel(self, node, text):
+        value = _strip_comment(text)
+        with node:
+            Autocancel(int(value) if value.isdigit() else value)
+
+    def _trigger(self, node, text):
+        self._expression(node, Trigger, text)
+
+    def _complete(self, node, text):
+        self._expression(node, Complete, text)
+
+    def _expression(self, node, cls, text):
+        option = text[:2]
+        if option in ("-a", "-o"):
+            text = text[2:].strip()
+        expressions = self._expressions
+        if expressions and expressions[-1][0] is node and expressions[-1][1] is cls:
+            expressions[-1][2].append((option, text))
+        else:
+            expressions.append((node, cls, [(option, text)]))
+
+
+def load_definition(source, host=None, externs=True):
+    """
+    Loads the suites of an **ecFlow** definition file.
+
+    Parameters:
+        source(str,file): The path of the definition file, or an iterable of its lines, e.g. an open file.
+        host(Host_): The host of the suites, by default the **ecFlow** default host.
+        externs(bool): Whether references to nodes outside of the loaded suites are mapped to extern nodes.
+
+    Returns:
+        *list*: The suites of the file.
+
+    Raises:
+        DefinitionError: If a line cannot be loaded.
+        ExpressionSyntaxError: If a trigger or complete expression is invalid.
+
+    Example::
+
+        suite, = pyflow.load_definition('legacy.def')
+    """
+
+    return DefinitionLoader(host=host, externs=externs).load(source)
+
+
+class _JSONReader:
+    """
+    Reads a JSON document describing a tree of nodes from a file, chunk by chunk. Nodes are created as soon as
+    their kind is known, i.e. at their first child or at their end, and their attributes are decoded one at a time.
+    """
+
+    def __init__(self, f, chunk_size=1 << 16):
+        self._file = f
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        self._offset = 0
+        self._eof = False
+
+    def _error(self, message):
+        raise ValueError(
+            "Invalid JSON at offset {}: {}".format(self._offset + self._pos, message)
+        )
+
+    def _read(self):
+        # Extends the buffer, dropping what has been consumed
+        if self._eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._offset += self._pos
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def _next(self):
+        # The next non-blank character, which is not consumed
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read():
+                self._error("unexpected end of document")
+
+    def _expect(self, character):
+        if self._next() != character:
+            self._error("expected '{}'".format(character))
+        self._pos += 1
+
+    def _decode(self):
+        # Values are decoded by the json module, once the buffer holds them entirely
+        self._next()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                if self._read():
+                    continue
+                self._error(e.msg)
+            # Numbers may continue in the next chunk
+            if end < len(self._buffer) or not self._read():
+                self._pos = end
+                return value
+
+    def _key(self):
+        if self._next() != '"':
+            self._error("expected a key")
+        key = self._decode()
+        self._expect(":")
+        return key
+
+    def load(self, node):
+        self._expect("{")
+        self._object(node, None, None)
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                self._error("extra data")
+            if not self._read():
+                return
+
+    def _object(self, node, parent, name):
+        # Reads the members of a node, whose opening brace has been consumed
+        pending = []
+        if self._next() == "}":
+            self._pos += 1
+        else:
+            while True:
+                key = self._key()
+                if _is_json_attribute(key):
+                    value = self._decode()
+                    if node is None:
+                        pending.append((key, value))
+                    else:
+                        _set_json_attribute(node, key, value)
+                else:
+                    if node is None:
+                        node = self._create(Family, parent, name, pending)
+                    self._expect("{")
+                    self._object(None, node, key)
+
+                separator = self._next()
+                self._pos += 1
+                if separator == "}":
+                    break
+                if separator != ",":
+                    self._pos -= 1
+                    self._error("expected ',' or '}'")
+
+        if node is None:
+            node = self._create(Task, parent, name, pending)
+        return node
+
+    def _create(self, cls, parent, name, attributes):
+        with parent:
+            node = cls(name)
+        for key, value in attributes:
+            _set_json_attribute(node, key, value)
+        return node
+
+
+def load_json(node, source):
+    """
+    Loads a JSON description of the contents of a node, in the format accepted by the `json` argument of nodes,
+    while reading it.
+
+    Unlike `json.load`, the document is never held in memory as a whole, only the attributes of one node at a time.
+
+    Parameters:
+        node(*Node*): The node to fill, e.g. a suite.
+        source(str,file): The path of the JSON document, or an open text file.
+
+    Returns:
+        *Node*: The node.
+
+    Raises:
+        ValueError: If the document is not valid JSON.
+
+    Example::
+
+        with pyflow.Suite('s') as s:
+            pyflow.load_json(s, 'suite.json')
+    """
+
+    if isinstance(source, str):
+        with open(source) as f:
+            _JSONReader(f).load(node)
+    else:
+        _JSONReader(source).load(node)
+    return node
+
+
+def load_json_lines(source, host=None):
+    """
+    Loads suites described by JSON Lines, one node per line, e.g.::
+
+        {"path": "/s", "FOO": 42}
+        {"path": "/s/f/t1", "triggers": {"complete": "t0"}}
+        {"path": "/s/f/g", "type": "family"}
+
+    Each record gives the path of a node and its contents, in the format accepted by the `json` argument of nodes.
+    Missing parents are created as families, while new nodes are tasks unless they have children or their type
+    (``suite``, ``family`` or ``task``) is given. Records of existing nodes add to their contents.
+
+    Parameters:
+        source(str,file): The path of the JSON Lines file, or an iterable of its lines, e.g. an open file.
+        host(Host_): The host of the suites, by default the **ecFlow** default host.
+
+    Returns:
+        *list*: The suites, in order of appearance.
+
+    Raises:
+        DefinitionError: If a line cannot be loaded.
+
+    Example::
+
+        suites = pyflow.load_json_lines('suite.jsonl')
+    """
+
+    if isinstance(source, str):
+        with open(source) as f:
+            return load_json_lines(f, host)
+
+    suites = {}
+    for number, line in enumerate(source, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            path = record.pop("path")
+            cls = _NODE_TYPES[record.pop("type")] if "type" in record else None
+            names = path.strip("/").split("/")
+
+            node = suites.get(names[0])
+            if node is None:
+                if cls not in (None, Suite) and len(names) == 1:
+                    raise ValueError("top level nodes must be suites")
+                node = suites[names[0]] = Suite(names[0], host=host)
+            for depth, name in enumerate(names[1:], 2):
+                if isinstance(node, Task):
+                    raise ValueError("tasks cannot have children")
+                child = node._nodes.get(name)
+                if child is None:
+                    if depth < len(names):
+                        child_cls = Family
+                    elif cls is not None:
+                        child_cls = cls
+                    else:
+                        child_cls = Family if _is_json_family(record) else Task
+                    with node:
+                        child = child_cls(name)
+                elif not isinstance(child, Node):
+                    raise ValueError("{} is not a node".format(child.fullname))
+                node = child
+
+            if cls is not None and type(node) is not cls:
+                raise ValueError("{} is not a {}".format(node.fullname, cls.__name__))
+            if isinstance(node, Task) and _is_json_family(record):
+                raise ValueError("tasks cannot have children")
+            _from_json(node, record)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise DefinitionError(number, line, e) from e
+
+    return list(suites.values())
@@ -0,0 +1,257 @@
+from __future__ import absolute_import
+
+import gc
+import sys
+import types
+
+from .base import Base
+from .expressions import Expression
+from .nodes import Node
+from .script import Script
+
+# Objects shared by the whole program rather than owned by the tree
+_SHARED = (
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.CodeType,
+)
+
+_UNITS = {"": 1, "k": 2**10, "m": 2**20, "g": 2**30, "t": 2**40}
+
+
+class MemoryBudgetError(RuntimeError):
+    """Raised by `MemoryReport.check` when a tree uses more memory than its budget."""
+
+
+def parse_size(size):
+    """
+    Converts a size to bytes.
+
+    Parameters:
+        size(int,str): The size, in bytes or with a unit, e.g. `"512MiB"`, `"2G"` or `"1.5 GB"` (as powers of 1024).
+
+    Returns:
+        *int*: The size in bytes.
+    """
+
+    if isinstance(size, (int, float)):
+        return int(size)
+    text = size.strip().lower().replace(" ", "")
+    for suffix in ("ib", "b"):
+        if text.endswith(suffix):
+            text = text[: -len(suffix)]
+            break
+    unit = text[-1] if text and text[-1] in "kmgt" else ""
+    try:
+        return int(float(text[: len(text) - len(unit)]) * _UNITS[unit])
+    except ValueError:
+        raise ValueError("Invalid size: {}".format(size)) from None
+
+
+def _format(size):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(size) < 1024 or unit == "GiB":
+            return "%.1f %s" % (size, unit) if unit != "B" else "%d B" % (size,)
+        size /= 1024.0
+
+
+class MemoryReport:
+    """
+    The memory used by a tree, measured as the deep size of its objects: each node and attribute, with the
+    objects it owns (names, dictionaries, values), its scripts and its expressions.
+
+    Objects shared by several nodes or attributes, e.g. expressions used by several triggers, are counted once,
+    towards the first node or attribute reaching them in tree order. Nodes and attributes referenced by others,
+    e.g. in expressions, are only counted as themselves.
+
+    Parameters:
+        node(*Node*): The root of the tree, usually a suite.
+
+    Attributes:
+        total(int): The memory used by the tree, in bytes.
+        categories(dict): The bytes used by the nodes and attributes of each class, by class name, and by their
+            scripts and expressions, under `"scripts"` and `"expressions"`.
+        counts(dict): The number of nodes and attributes of each class, by class name.
+
+    Example::
+
+        report = pyflow.MemoryReport(suite)
+        print(report)
+        report.check('2GiB')
+    """
+
+    def __init__(self, node):
+        self.node = node
+        self.total = 0
+        self.categories = {}
+        self.counts = {}
+        # The bytes of each node and its attributes, as (path, bytes) in tree order
+        self._nodes = []
+        self._kinds = {}
+
+        seen = set()
+        stack = [(node, node.fullname)]
+        while stack:
+            n, path = stack.pop()
+            size = self._measure(n, seen)
+            children = []
+            for child in n._nodes.values():
+                if isinstance(child, Node):
+                    children.append((child, path + "/" + child.name))
+                else:
+                    size += self._measure(child, seen)
+            self._nodes.append((path, size))
+            stack.extend(reversed(children))
+
+    def _measure(self, root, seen):
+        name = type(root).__name__
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+        categories = self.categories
+        kinds = self._kinds
+        getsizeof = sys.getsizeof
+        referents = gc.get_referents
+        tracked = gc.is_tracked
+        total = 0
+        seen.add(id(root))
+        stack = [(root, name)]
+        while stack:
+            obj, category = stack.pop()
+            category = kinds.get(type(obj), category) or category
+            size = getsizeof(obj)
+
+            refs = referents(obj)
+            attributes = getattr(obj, "__dict__", None)
+            if type(attributes) is dict:
+                refs.append(attributes)
+            for r in refs:
+                if id(r) in seen:
+                    continue
+                t = type(r)
+                kind = kinds.get(t)
+                if kind is None:
+                    kind = self._kind(t)
+                if kind is False:
+                    continue
+                seen.add(id(r))
+                if tracked(r):
+                    stack.append((r, category))
+                else:
+                    # Atoms, e.g. strings and numbers, have no references to follow
+                    size += getsizeof(r)
+
+            categories[category] = categories.get(category, 0) + size
+            total += size
+
+        self.total += total
+        return total
+
+    def _kind(self, t):
+        # Whether objects of a type are skipped (False), or counted towards their own category or their owner's ("")
+        if issubclass(t, _SHARED) or issubclass(t, Base):
+            kind = False
+        elif issubclass(t, Script):
+            kind = "scripts"
+        elif issubclass(t, Expression):
+            kind = "expressions"
+        else:
+            kind = ""
+        self._kinds[t] = kind
+        return kind
+
+    def subtrees(self, depth=None):
+        """
+        Returns the memory used by each subtree.
+
+        Parameters:
+            depth(int): The maximum depth of the subtrees reported, e.g. 1 for suites, 2 for their children, by
+                default all.
+
+        Returns:
+            *dict*: The bytes by path of the root of the subtrees, in tree order.
+        """
+
+        result = {}
+        for path, size in self._nodes:
+            names = path.strip("/").split("/")
+            limit = len(names) if depth is None else min(depth, len(names))
+            for i in range(1, limit + 1):
+                p = "/" + "/".join(names[:i])
+                result[p] = result.get(p, 0) + size
+        return result
+
+    def top(self, count=10, depth=None):
+        """
+        Returns the largest subtrees.
+
+        Parameters:
+            count(int): The number of subtrees.
+            depth(int): The depth of the subtrees, e.g. 2 for the children of suites, by default any.
+
+        Returns:
+            *list*: The (path, bytes) of the subtrees, largest first.
+        """
+
+        subtrees = self.subtrees(depth).items()
+        if depth is not None:
+            subtrees = [(p, s) for p, s in subtrees if p.count("/") == depth]
+        return sorted(subtrees, key=lambda x: -x[1])[:count]
+
+    def summary(self, count=10, depth=2):
+        """
+        Returns a summary of the report, serialisable as JSON.
+
+        Parameters:
+            count(int): The number of subtrees reported, the largest first.
+            depth(int): The depth of the subtrees reported.
+
+        Returns:
+            *dict*: The total, the bytes and counts by category, and the largest subtrees.
+        """
+
+        return {
+            "total": self.total,
+            "categories": dict(self.categories),
+            "counts": dict(self.counts),
+            "subtrees": dict(self.top(count, depth)),
+        }
+
+    def check(self, budget):
+        """
+        Checks that the tree fits in a memory budget, e.g. in continuous integration.
+
+        Parameters:
+            budget(int,str): The budget, in bytes or with a unit, e.g. `"2GiB"`.
+
+        Raises:
+            MemoryBudgetError: The tree uses more memory than the budget.
+        """
+
+        budget = parse_size(budget)
+        if self.total > budget:
+            largest = ", ".join(
+                "%s: %s" % (category, _format(size))
+                for category, size in sorted(
+                    self.categories.items(), key=lambda x: -x[1]
+                )[:3]
+            )
+            raise MemoryBudgetError(
+                "{} uses {}, more than its budget of {} ({})".format(
+                    self.node.fullname, _format(self.total), _format(budget), largest
+                )
+            )
+
+    def __str__(self):
+        lines = ["Total: %s" % (_format(self.total),), "", "Categories:"]
+        for category, size in sorted(self.categories.items(), key=lambda x: -x[1]):
+            count = self.counts.get(category)
+            lines.append(
+                "  %-30s %12s %s"
+                % (category, _format(size), "" if count is None else "(%d)" % count)
+            )
+        lines += ["", "Subtrees:"]
+        for path, size in self.top(10, 2):
+            lines.append("  %-60s %12s" % (path, _format(size)))
+        return "\n".join(lines)
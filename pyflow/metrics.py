@@ -0,0 +1,295 @@
+from __future__ import absolute_import
+
+from .attributes import (
+    Complete,
+    GeneratedVariable,
+    Manual,
+    Variable,
+    _Trigger,
+)
+from .dependencies import _holder
+from .expressions import Constant, generation_cache, make_expression, node_names
+from .memory import _format
+from .nodes import Node, Task
+
+#: Kinds of the references made by trigger and complete expressions.
+REFERENCES = ("local", "cross-family", "extern")
+
+# Attributes absent from the definition
+_SILENT = (GeneratedVariable, Manual)
+
+# The keywords of the definition, where they differ from the class name
+_KEYWORDS = {
+    "Variable": "edit",
+    "Follow": "trigger",
+    "DefCompleteIf": "defstatus",
+    "Crons": "cron",
+}
+
+
+def _line(attribute, indent):
+    # An estimate of the line of the definition for an attribute other than an expression or a variable
+    cls = type(attribute).__name__
+    size = indent + len(_KEYWORDS.get(cls, cls)) + 1
+    name = str(attribute.name)
+    if not name.startswith("_"):
+        size += len(name) + 1
+    if attribute.value is not None:
+        size += len(str(attribute.value)) + 1
+    return size
+
+
+class SuiteMetrics:
+    """
+    The size of a tree and the load it puts on the **ecFlow** server, computed before playing it: the numbers of
+    nodes and attributes, the shape of the tree, the trigger and complete expressions the server evaluates, the
+    variables it stores, and an estimate of the size of the definition.
+
+    The expressions are generated as for the definition, so that their lengths are those parsed by the server. A
+    reference from an expression is local when it is to a node of the same family as the node holding the
+    expression, to an extern when it is to an extern node, and cross-family otherwise.
+
+    Parameters:
+        node(*Node*): The root of the tree, usually a suite.
+
+    Attributes:
+        counts(dict): The number of nodes and attributes of each class, by class name.
+        depths(dict): The number of nodes at each depth, e.g. 1 for suites.
+        fanouts(dict): The number of suites and families by their number of child nodes.
+        expressions(dict): The `"count"`, total `"length"`, `"longest"` length and `"references"` of the trigger
+            and complete expressions, under `"trigger"` (including follows) and `"complete"`.
+        references(dict): The number of references made by expressions, by kind: `"local"`, `"cross-family"` and
+            `"extern"`.
+        variables(dict): The number of definitions of each variable, by name.
+        redundant(int): The number of variables defined with the value inherited from an ancestor.
+        total(int): The estimated size of the definition, in bytes.
+
+    Example::
+
+        metrics = pyflow.SuiteMetrics(suite)
+        print(metrics)
+        for path, length in metrics.top(10, by='expressions'):
+            print(path, length)
+    """
+
+    def __init__(self, node):
+        self.node = node
+        self.counts = {}
+        self.depths = {}
+        self.fanouts = {}
+        self.expressions = dict(
+            (kind, {"count": 0, "length": 0, "longest": 0, "references": 0})
+            for kind in ("trigger", "complete")
+        )
+        self.references = dict((kind, 0) for kind in REFERENCES)
+        self.variables = {}
+        self.redundant = 0
+        self.total = 0
+        # The (path, bytes, expression length, references) of each node, in tree order
+        self._nodes = []
+
+        counts = self.counts
+        root = node.fullname
+        depth = root.count("/")
+        with generation_cache():
+            stack = [(node, root, depth, {})]
+            while stack:
+                n, path, depth, inherited = stack.pop()
+                name = type(n).__name__
+                counts[name] = counts.get(name, 0) + 1
+                self.depths[depth] = self.depths.get(depth, 0) + 1
+
+                indent = 2 * (depth - 1)
+                size = indent + len(name) + len(n.name) + 2
+                if not isinstance(n, Task):
+                    # The closing "endfamily" or "endsuite"
+                    size += indent + len(name) + 4
+
+                variables = {}
+                length = references = 0
+                children = []
+                for child in n._nodes.values():
+                    if isinstance(child, Node):
+                        children.append(child)
+                        continue
+
+                    cls = type(child).__name__
+                    counts[cls] = counts.get(cls, 0) + 1
+                    if isinstance(child, _SILENT):
+                        continue
+                    if isinstance(child, Variable):
+                        size += self._variable(child, indent, inherited, variables)
+                    elif isinstance(child, (_Trigger, Complete)):
+                        e, r = self._expression(child, n)
+                        length += e
+                        references += r
+                        size += indent + 11 + e if e else 0
+                    else:
+                        size += _line(child, indent + 2)
+
+                if children:
+                    if variables:
+                        inherited = dict(inherited)
+                        inherited.update(variables)
+                    self.fanouts[len(children)] = self.fanouts.get(len(children), 0) + 1
+                    stack.extend(
+                        (c, path + "/" + c.name, depth + 1, inherited)
+                        for c in reversed(children)
+                    )
+                elif not isinstance(n, Task):
+                    self.fanouts[0] = self.fanouts.get(0, 0) + 1
+
+                self.total += size
+                self._nodes.append((path, size, length, references))
+
+    def _variable(self, variable, indent, inherited, variables):
+        name = str(variable.name)
+        value = str(variable.value)
+        self.variables[name] = self.variables.get(name, 0) + 1
+        if inherited.get(name) == value:
+            self.redundant += 1
+        variables[name] = value
+        # e.g. "edit NAME 'value'"
+        return indent + len(name) + len(value) + 10
+
+    def _expression(self, attribute, node):
+        # The length of the generated expression, and the number of references it makes
+        simplified = make_expression(attribute.value).simplify()
+        if isinstance(simplified, Constant):
+            return 0, 0
+        text = simplified.generate_expression(node)
+        if not isinstance(text, str):
+            return 0, 0
+
+        parent = node.parent
+        references = self.references
+        count = 0
+        for name in node_names(simplified):
+            target = _holder(name._node)
+            count += 1
+            if target._extern:
+                references["extern"] += 1
+                continue
+            while target is not None and target is not parent:
+                target = target.parent if isinstance(target, Node) else None
+            references["local" if target is parent else "cross-family"] += 1
+
+        stats = self.expressions[
+            "complete" if isinstance(attribute, Complete) else "trigger"
+        ]
+        stats["count"] += 1
+        stats["length"] += len(text)
+        stats["longest"] = max(stats["longest"], len(text))
+        stats["references"] += count
+        return len(text), count
+
+    @property
+    def duplicates(self):
+        """*dict*: The number of definitions of the variables defined on more than one node, by name."""
+        return dict((k, v) for k, v in self.variables.items() if v > 1)
+
+    def subtrees(self, depth=None):
+        """
+        Returns the estimated size of the definition of each subtree.
+
+        Parameters:
+            depth(int): The maximum depth of the subtrees reported, e.g. 1 for suites, 2 for their children, by
+                default all.
+
+        Returns:
+            *dict*: The bytes by path of the root of the subtrees, in tree order.
+        """
+
+        result = {}
+        for path, size, _, _ in self._nodes:
+            names = path.strip("/").split("/")
+            limit = len(names) if depth is None else min(depth, len(names))
+            for i in range(1, limit + 1):
+                p = "/" + "/".join(names[:i])
+                result[p] = result.get(p, 0) + size
+        return result
+
+    def top(self, count=10, by="expressions"):
+        """
+        Returns the most expensive nodes.
+
+        Parameters:
+            count(int): The number of nodes.
+            by(str): The cost of the nodes: `"expressions"` for the length of their trigger and complete
+                expressions, `"references"` for the number of references these make, or `"bytes"` for the estimated
+                size of their own definition.
+
+        Returns:
+            *list*: The (path, cost) of the nodes, most expensive first.
+        """
+
+        column = {"bytes": 1, "expressions": 2, "references": 3}[by]
+        nodes = [(n[0], n[column]) for n in self._nodes if n[column]]
+        return sorted(nodes, key=lambda x: -x[1])[:count]
+
+    def summary(self, count=10):
+        """
+        Returns a summary of the metrics, serialisable as JSON.
+
+        Parameters:
+            count(int): The number of nodes reported, the most expensive first.
+
+        Returns:
+            *dict*: The metrics, with the most expensive nodes by each cost.
+        """
+
+        return {
+            "total": self.total,
+            "counts": dict(self.counts),
+            "depths": dict(self.depths),
+            "fanouts": dict(self.fanouts),
+            "expressions": dict((k, dict(v)) for k, v in self.expressions.items()),
+            "references": dict(self.references),
+            "duplicates": self.duplicates,
+            "redundant": self.redundant,
+            "top": dict(
+                (by, dict(self.top(count, by)))
+                for by in ("expressions", "references", "bytes")
+            ),
+        }
+
+    def __str__(self):
+        lines = ["Definition: %s (estimated)" % (_format(self.total),), "", "Counts:"]
+        for name, count in sorted(self.counts.items(), key=lambda x: -x[1]):
+            lines.append("  %-30s %10d" % (name, count))
+
+        lines += ["", "Depths:"]
+        lines += ["  %-30d %10d" % x for x in sorted(self.depths.items())]
+        lines += ["", "Fan-outs:"]
+        lines += ["  %-30d %10d" % x for x in sorted(self.fanouts.items())]
+
+        lines += ["", "Expressions:"]
+        for kind, stats in self.expressions.items():
+            lines.append(
+                "  %-30s %10d expressions %10d characters %6d longest %10d references"
+                % (
+                    kind,
+                    stats["count"],
+                    stats["length"],
+                    stats["longest"],
+                    stats["references"],
+                )
+            )
+        for kind in REFERENCES:
+            lines.append("  %-30s %10d" % (kind + " references", self.references[kind]))
+
+        duplicates = sorted(self.duplicates.items(), key=lambda x: -x[1])
+        lines += ["", "Variables:"]
+        lines.append("  %-30s %10d" % ("definitions", sum(self.variables.values())))
+        lines.append("  %-30s %10d" % ("redundant", self.redundant))
+        for name, count in duplicates[:10]:
+            lines.append("  %-30s %10d" % (name, count))
+
+        lines += ["", "Expressions by node:"]
+        for path, length in self.top(10):
+            lines.append("  %-60s %10d" % (path, length))
+        lines += ["", "Subtrees:"]
+        subtrees = [(p, s) for p, s in self.subtrees(2).items() if p.count("/") == 2]
+        for path, size in sorted(subtrees, key=lambda x: -x[1])[:10]:
+            lines.append("  %-60s %12s" % (path, _format(size)))
+        return "\n".join(lines)
@@ -0,0 +1,251 @@
+from __future__ import absolute_import
+
+import asyncio
+import inspect
+from collections import namedtuple
+
+from .attributes import Event, Label, Meter
+from .client import ClientSession
+from .evaluation import StateTable
+from .values import REPEATS
+
+
+class StateChange(namedtuple("StateChange", ["path", "attribute", "old", "new"])):
+    """
+    A change of the state of a node on the server.
+
+    Attributes:
+        path(str): The path of the node.
+        attribute(str): `None` for the status of the node, otherwise the kind and name of the attribute, e.g.
+            `"event done"`, `"meter step"`, `"label info"` or `"repeat YMD"`.
+        old: The previous status or value.
+        new: The new status or value.
+    """
+
+    def __str__(self):
+        if self.attribute is None:
+            return "%s %s -> %s" % (self.path, self.old, self.new)
+        return "%s:%s %s -> %s" % (self.path, self.attribute, self.old, self.new)
+
+
+def _state(node):
+    # The state of an ecflow node as plain values, read in the polling thread
+    repeat = node.get_repeat()
+    return (
+        node.get_abs_node_path(),
+        str(node.get_dstate()),
+        [(e.name() or str(e.number()), e.value()) for e in node.events],
+        [(m.name(), m.value()) for m in node.meters],
+        [(label.name(), label.new_value() or label.value()) for label in node.labels],
+        None if repeat.empty() else repeat.value(),
+    )
+
+
+class StateMonitor:
+    """
+    Mirrors the live state of a suite on an **ecFlow** server onto its pyflow tree: the statuses of the nodes and
+    the values of their events, meters, labels and repeats.
+
+    The server is polled with the incremental `sync_local` of the client, which only transfers the changes since the
+    previous poll, and only the nodes reported as changed are read, so that each poll costs in proportion to the
+    number of changes rather than the size of the suite. The client calls run in a worker thread, leaving the event
+    loop free.
+
+    The statuses, events, meters and repeats are kept in a `StateTable`, which can seed evaluations of triggers or
+    simulations; labels are kept in `labels`.
+
+    Parameters:
+        suite(*Node*): The suite, or any node, whose subtree is mirrored.
+        host(str): Target host, possibly with the port, e.g. `localhost:3141`.
+        port(str): Port number of the target host.
+        interval(float): The polling interval, in seconds.
+        client(ecflow.Client): The client to use, by default a client of the host created on first use.
+
+    Attributes:
+        table(StateTable): The statuses of the nodes and the values of their events, meters and repeats.
+        labels(dict): The current values of the labels, by label.
+        polls(int): The number of polls so far.
+
+    Example::
+
+        monitor = pyflow.StateMonitor(suite, 'localhost:3141')
+        monitor.subscribe(lambda changes: print('\\n'.join(map(str, changes))))
+        asyncio.run(monitor.run())
+    """
+
+    def __init__(self, suite, host, port=None, interval=5, client=None):
+        self.suite = suite
+        self.interval = interval
+        self.session = ClientSession(host, port, client=client)
+        self.table = StateTable(suite)
+        self.labels = {}
+        self.polls = 0
+        self._nodes = dict((node.fullname, node) for node in self.table.nodes)
+        self._attributes = {}
+        self._callbacks = []
+        self._synced = False
+        self._stopping = False
+        self._stopped = None
+
+    def __getitem__(self, item):
+        """
+        Returns the status of a node, given as such or by path, or the current value of one of its events, meters,
+        labels or repeats.
+        """
+
+        if isinstance(item, str):
+            item = self._nodes[item]
+        if isinstance(item, Label):
+            return self.labels.get(item, item.value)
+        return self.table[item]
+
+    def subscribe(self, callback):
+        """
+        Registers a function called with the list of `StateChange` after each poll that found changes. Coroutine
+        functions are awaited, and can only be used with `poll` and `run`.
+
+        Parameters:
+            callback(function): The function.
+        """
+
+        self._callbacks.append(callback)
+
+    def _fetch(self):
+        # Runs in the polling thread: only plain values are returned to the event loop
+        client = self.session.client
+        client.sync_local()
+        defs = client.get_defs()
+        root = self.suite.fullname
+        if defs is None:
+            return []
+
+        paths = None if not self._synced else list(client.changed_node_paths)
+        if paths is None or "/" in paths:
+            node = defs.find_abs_node(root)
+            if node is None:
+                return []
+            nodes = dict((n.get_abs_node_path(), n) for n in node.get_all_nodes())
+            nodes[root] = node
+            self._synced = True
+            return [_state(n) for n in nodes.values()]
+
+        states = []
+        for path in set(paths):
+            if path == root or path.startswith(root + "/"):
+                node = defs.find_abs_node(path)
+                if node is not None:
+                    states.append(_state(node))
+        return states
+
+    def _attributes_of(self, node):
+        try:
+            return self._attributes[id(node)]
+        except KeyError:
+            pass
+
+        attributes = {}
+        for a in node.children:
+            if isinstance(a, Event):
+                attributes["event " + str(a.name)] = a
+            elif isinstance(a, Meter):
+                attributes["meter " + str(a.name)] = a
+            elif isinstance(a, Label):
+                attributes["label " + str(a.name)] = a
+            elif isinstance(a, REPEATS):
+                attributes["repeat"] = a
+        self._attributes[id(node)] = attributes
+        return attributes
+
+    def _apply(self, states):
+        changes = []
+        table = self.table
+        for path, status, events, meters, labels, repeat in states:
+            node = self._nodes.get(path)
+            if node is None:
+                continue
+
+            old = table[node]
+            if status != old:
+                table[node] = status
+                changes.append(StateChange(path, None, old, status))
+
+            attributes = self._attributes_of(node)
+            values = [("event " + n, float(v)) for n, v in events]
+            values += [("meter " + n, float(v)) for n, v in meters]
+            if repeat is not None:
+                values.append(("repeat", float(repeat)))
+            for name, value in values:
+                a = attributes.get(name)
+                if a is not None and table[a] != value:
+                    if name == "repeat":
+                        name = "repeat " + str(a.name)
+                    changes.append(StateChange(path, name, table[a], value))
+                    table[a] = value
+
+            for name, value in labels:
+                a = attributes.get("label " + name)
+                if a is not None and self[a] != value:
+                    changes.append(StateChange(path, "label " + name, self[a], value))
+                    self.labels[a] = value
+
+        self.polls += 1
+        return changes
+
+    def sync(self):
+        """
+        Polls the server once, blocking until done, and notifies the subscribers of the changes.
+
+        Returns:
+            *list*: The `StateChange` list, in no particular order.
+
+        Raises:
+            RuntimeError: If a subscriber is a coroutine function, before polling.
+        """
+
+        if any(inspect.iscoroutinefunction(c) for c in self._callbacks):
+            raise RuntimeError(
+                "Coroutine subscribers require polling with poll() or run()"
+            )
+        changes = self._apply(self._fetch())
+        if changes:
+            for callback in self._callbacks:
+                callback(changes)
+        return changes
+
+    async def poll(self):
+        """
+        Polls the server once, in a worker thread, and notifies the subscribers of the changes.
+
+        Returns:
+            *list*: The `StateChange` list, in no particular order.
+        """
+
+        loop = asyncio.get_running_loop()
+        changes = self._apply(await loop.run_in_executor(None, self._fetch))
+        if changes:
+            for callback in self._callbacks:
+                result = callback(changes)
+                if inspect.isawaitable(result):
+                    await result
+        return changes
+
+    async def run(self):
+        """
+        Polls the server every `interval` seconds until `stop` is called.
+        """
+
+        self._stopped = asyncio.Event()
+        while not self._stopping:
+            await self.poll()
+            if self._stopping:
+                break
+            try:
+                await asyncio.wait_for(self._stopped.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self):
+        """Stops `run` after the current poll, or before its first poll if called earlier."""
+        self._stopping = True
+        if self._stopped is not None:
+            self._stopped.set()
@@ -1,5 +1,6 @@
 from __future__ import absolute_import
 
+import hashlib
 import inspect
 import os
 import re
@@ -36,7 +37,13 @@ from .attributes import (
 )
 from .base import STACK, Base, GenerateError
 from .deployment import FileSystem
-from .expressions import Eq, NodeName
+from .expressions import (
+    Eq,
+    NodeName,
+    current_generation_cache,
+    generation_cache,
+    memoized_relative_path,
+)
 from .graph import Dot
 from .header import InlineCodeHeader
 from .importer import ecflow
@@ -67,32 +74,31 @@ def ecflow_name(s):
     return s
 
 
-def _from_json(node, tree):
-    builder = {"defstatus": lambda v: MAP[v]}
+_JSON_BUILDERS = {"defstatus": lambda v: MAP[v]}
 
-    def json_kids(tree):
-        n = 0
-        for k, v in tree.items():
-            if is_variable(k) or _is_reserved(k):
-                pass
-            else:
-                n += 1
-        return n
 
-    def json_build(cls, name, tree):
-        node = cls(name)
-        _from_json(node, tree)
-        return node
+def _is_json_attribute(key):
+    return is_variable(key) or _is_reserved(key)
+
+
+def _is_json_family(tree):
+    # Nodes with children are families, stopping at the first child
+    return any(not _is_json_attribute(k) for k in tree)
+
 
+def _set_json_attribute(node, key, value):
     with node:
-        for k, v in tree.items():
-            if is_variable(k) or _is_reserved(k):
-                node[k] = builder[k](v) if k in builder else v
-            else:
-                if json_kids(v):
-                    json_build(Family, k, v)
-                else:
-                    json_build(Task, k, v)
+        node[key] = _JSON_BUILDERS[key](value) if key in _JSON_BUILDERS else value
+
+
+def _from_json(node, tree):
+    for k, v in tree.items():
+        if _is_json_attribute(k):
+            _set_json_attribute(node, k, v)
+        else:
+            with node:
+                child = Family(k) if _is_json_family(v) else Task(k)
+            _from_json(child, v)
 
 
 class DuplicateNodeError(RuntimeError):
@@ -157,7 +163,6 @@ class Node(Base):
 
         super().__init__(name)
         self._nodes = OrderedDict()
-        self._functions = set(dir(self))
 
         self._modules = modules or []
         self._purge_modules = purge_modules
@@ -211,8 +216,9 @@ class Node(Base):
         # N.B. Important safety check. Do not remove. Extern nodes must never be played or generated.
         assert not self._extern, "Generating extern nodes is not permitted"
 
-        for n in list(self._nodes.values()):
-            n._build(o)
+        with generation_cache():
+            for n in list(self._nodes.values()):
+                n._build(o)
 
         return o
 
@@ -230,6 +236,9 @@ class Node(Base):
         return self.append_node(node)
 
     def __getattr__(self, item):
+        if item == "_nodes":
+            # Not set yet, e.g. while unpickling
+            raise AttributeError(item)
         try:
             return self._nodes[item]
         except KeyError:
@@ -244,6 +253,7 @@ class Node(Base):
         node.parent.remove_node(node)
         self._nodes[node.name] = node
         node._parent = self
+        self._changed()
 
     def add_node(self, node):
         """
@@ -287,6 +297,7 @@ class Node(Base):
         name = node.name
         if name in self._nodes:
             del self._nodes[name]
+            self._changed()
 
     def append_node(self, node):
         """
@@ -404,10 +415,19 @@ class Node(Base):
     @property
     def all_exportables(self):
         """*dict*: The dictionary of all exportable attributes in the current or parent node."""
+        cache = current_generation_cache()
+        if cache is not None:
+            try:
+                return dict(cache.exportables[id(self)][0])
+            except KeyError:
+                pass
+
         all_vars = self.parent.all_exportables if isinstance(self.parent, Node) else {}
         for v in self._get_accessor(Exportable):
             all_vars[v.name] = v
 
+        if cache is not None:
+            cache.exportables[id(self)] = (dict(all_vars), self)
         return all_vars
 
     ##########################################################
@@ -501,12 +521,50 @@ class Node(Base):
         """*str*: The full path of the node from the root."""
         return "/".join([""] + self.path_list)
 
+    def _ancestors(self):
+        cache = current_generation_cache()
+        if cache is not None:
+            try:
+                return cache.ancestors[id(self)][0]
+            except KeyError:
+                pass
+
+        if isinstance(self._parent, Node):
+            result = self._parent._ancestors() + [self]
+        else:
+            result = [self]
+
+        if cache is not None:
+            cache.ancestors[id(self)] = (result, self)
+        return result
+
     def _relative_path(self, node):
-        if self.suite is not node.suite:
+        target = self._ancestors()
+        context = node._ancestors()
+
+        suites = [
+            next(n for n in reversed(nodes) if isinstance(n, Suite))
+            for nodes in (target, context)
+        ]
+        if suites[0] is not suites[1]:
             return self.fullname
 
-        return os.path.relpath(self.fullname, node.parent.fullname)
+        # Equivalent to os.path.relpath(self.fullname, node.parent.fullname), going up to the
+        # lowest common ancestor and down again.
+        origin = context[:-1]
+        if not origin:
+            raise ValueError("{} has no parent node".format(node))
+
+        common = 0
+        for a, b in zip(origin, target):
+            if a is not b:
+                break
+            common += 1
 
+        path = [".."] * (len(origin) - common) + [n.name for n in target[common:]]
+        return "/".join(path) or "."
+
+    @memoized_relative_path
     def relative_path(self, node):
         """
         Returns relative path of the node.
@@ -635,6 +693,7 @@ class Node(Base):
     ################################################
 
     def __setattr__(self, name, value):
+        self._changed()
         if is_variable(name):
             # If the variable already exists, remove it first
             if name in self._nodes:
@@ -660,6 +719,7 @@ class Node(Base):
 
     def __delitem__(self, key):
         del self._nodes[key]
+        self._changed()
 
     def __contains__(self, item):
         return item in self._nodes
@@ -772,6 +832,72 @@ class Node(Base):
     def __str__(self):
         return str(self.generate_node())
 
+    ################################################
+
+    def _changed(self):
+        # The content of the node changed, and so the content hashes of its ancestors. The content of the
+        # descendants may depend on it (e.g. inherited variables and hosts): their hashes are checked against the
+        # stamp of the node, replaced when next used. Ancestors of a node without a content hash have none either.
+        self.__dict__.pop("_stamp", None)
+        node = self
+        while isinstance(node, Node) and node.__dict__.pop("_merkle", None) is not None:
+            node = node._parent
+
+    def _content_stamp(self):
+        try:
+            return self.__dict__["_stamp"]
+        except KeyError:
+            stamp = self.__dict__["_stamp"] = object()
+            return stamp
+
+    def invalidate_content_hash(self):
+        """
+        Discards the content hashes of the node, its ancestors and its descendants, e.g. after modifying a script
+        object in place.
+        """
+
+        self._changed()
+
+    def _content(self):
+        if self._extern:
+            return type(self).__name__
+        o = self.ecflow_object()
+        for n in self._nodes.values():
+            if not isinstance(n, Node):
+                n._build(o)
+        return "%s\n%s" % (type(self).__name__, o)
+
+    def _content_digests(self, context):
+        cached = self.__dict__.get("_merkle")
+        if cached is not None and cached[0] == context:
+            return cached[1:]
+
+        own = hashlib.blake2b(self._content().encode("utf-8"), digest_size=16).digest()
+        h = hashlib.blake2b(own, digest_size=16)
+        context = context + (self._content_stamp(),)
+        for n in self._nodes.values():
+            if isinstance(n, Node):
+                h.update(n._content_digests(context)[0])
+
+        digests = (h.digest(), own)
+        self.__dict__["_merkle"] = (context[:-1],) + digests
+        return digests
+
+    @property
+    def content_hash(self):
+        """
+        *str*: A hash of the content of the node and its descendants: their attributes, generated scripts and
+        headers.
+
+        The hashes of all the nodes of the tree are computed at once (bottom-up, as a Merkle tree) and kept until
+        the node, an ancestor or a descendant changes, so that comparing the hashes of unchanged trees is immediate.
+        Changes made in place to script objects are not tracked, see `invalidate_content_hash`.
+        """
+
+        context = tuple(n._content_stamp() for n in self._ancestors()[:-1])
+        with generation_cache():
+            return self._content_digests(context)[0].hex()
+
     def generate_stub(self, scripts):
         """Returns complete script by combining the fragments.
 
@@ -913,6 +1039,7 @@ class Family(Node):
         for hk in hook:
             if hk not in self._exit_hook:
                 self._exit_hook.append(hk)
+                self._changed()
         # Check if properly initialised
         if "_nodes" in self.__dict__:
             for chld in self.executable_children:
@@ -1183,6 +1310,7 @@ class Suite(AnchorMixin, Node):
         for hk in hook:
             if hk not in self._exit_hook:
                 self._exit_hook.append(hk)
+                self._changed()
         # Check if properly initialised
         if "_nodes" in self.__dict__:
             for chld in self.executable_children:
@@ -1381,6 +1509,23 @@ class Task(Node):
         for hk in hook:
             if hk not in self._exit_hook:
                 self._exit_hook.append(hk)
+                self._changed()
+
+    def _content(self):
+        content = super()._content()
+        if self._extern:
+            return content
+
+        script, includes = self.generate_script()
+        lines = [content] + script
+        for include in includes:
+            lines.append(include.include_name)
+            try:
+                lines += include._code
+            except AttributeError:
+                with open(include._path, "r") as f:
+                    lines.append(f.read())
+        return "\n".join(lines)
 
     def generate_script(self):
         """
@@ -1566,3 +1711,69 @@ for name, cls in ACCESSORS:
 
 def _is_reserved(name):
     return name in RESERVED
+
+
+def _changed_pairs(old, new):
+    """
+    Yields the (old node, new node, change) of the nodes that differ, in tree order, with `None` for added or removed
+    nodes.
+    """
+
+    if old.content_hash == new.content_hash:
+        return
+
+    stack = [(old, new)]
+    while stack:
+        a, b = stack.pop()
+        if a is None:
+            yield a, b, "added"
+            continue
+        if b is None:
+            yield a, b, "removed"
+            continue
+
+        (digest_a, own_a), (digest_b, own_b) = a._merkle[1:], b._merkle[1:]
+        if digest_a == digest_b:
+            continue
+        if own_a != own_b:
+            yield a, b, "changed"
+
+        children_a = [n for n in a.children if isinstance(n, Node)]
+        children_b = [n for n in b.children if isinstance(n, Node)]
+        names_a = set(n.name for n in children_a)
+        names_b = set(n.name for n in children_b)
+        # The order of the children is not part of the content of the node itself
+        if [n.name for n in children_a if n.name in names_b] != [
+            n.name for n in children_b if n.name in names_a
+        ]:
+            yield a, b, "reordered"
+        pairs = [(a._nodes.get(n.name), n) for n in children_b]
+        pairs = [(n if isinstance(n, Node) else None, m) for n, m in pairs]
+        pairs += [(n, None) for n in children_a if n.name not in names_b]
+        # Reversed, so that the children are visited in order
+        stack.extend(reversed(pairs))
+
+
+def changed_nodes(old, new):
+    """
+    Compares two versions of a tree by their content hashes, only descending into the subtrees that differ.
+
+    Parameters:
+        old(*Node*): The previous version of the tree, e.g. a suite from an earlier build.
+        new(*Node*): The new version of the tree.
+
+    Returns:
+        *list*: The (path, change) of the nodes that differ, in tree order, where the change is `"added"`, `"removed"`,
+        `"changed"` (the attributes, script or headers of the node itself changed) or `"reordered"` (the children
+        kept by the node are in a different order).
+
+    Example::
+
+        for path, change in pyflow.changed_nodes(previous, suite):
+            print(change, path)
+    """
+
+    return [
+        ((a if b is None else b).fullname, change)
+        for a, b, change in _changed_pairs(old, new)
+    ]
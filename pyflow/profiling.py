@@ -0,0 +1,258 @@
+from __future__ import absolute_import
+
+import functools
+import json
+import time
+
+from .base import Base
+from .deployment import Deployment
+from .nodes import Node
+
+# The instrumented methods, by the base class of the classes defining them
+_METHODS = (
+    (Node, ("__init__", "generate_node", "generate_script")),
+    (Deployment, ("save", "copy", "deploy_headers")),
+)
+
+_ACTIVE = None
+
+
+def _subclasses(cls):
+    classes = [cls]
+    for c in classes:
+        classes += [s for s in c.__subclasses__() if s not in classes]
+    return classes
+
+
+def _targets():
+    targets = []
+    for base, names in _METHODS:
+        for cls in _subclasses(base):
+            targets += [(cls, n) for n in names if n in cls.__dict__]
+    # The attributes are generated by their `_build`, nodes by `generate_node`
+    for cls in _subclasses(Base):
+        if not issubclass(cls, Node) and "_build" in cls.__dict__:
+            targets.append((cls, "_build"))
+    return targets
+
+
+def _node(obj):
+    # The node an instrumented object belongs to, if any
+    while obj is not None and not isinstance(obj, Node):
+        obj = getattr(obj, "parent", None) if isinstance(obj, Base) else None
+    return obj
+
+
+class Profiler:
+    """
+    Times tree construction, generation and deployment while active, as a context manager: the `__init__` of
+    nodes, `generate_node`, the `_build` of each attribute, `Task.generate_script`, and the `save`, `copy` and
+    `deploy_headers` of deployments.
+
+    The timers are installed when entering the context, and removed when leaving it, so that pyflow runs without
+    any overhead when not profiling.
+
+    The time spent in each method, excluding the instrumented methods it calls, is aggregated by call stack
+    (`save_folded`), by method (`functions`), by class of the objects (`classes`) and by subtree (`subtrees`).
+
+    Example::
+
+        with pyflow.Profiler() as profiler:
+            suite = MySuite(config)
+            suite.deploy_suite()
+        print(profiler.report())
+        profiler.save_folded('build.folded')  # e.g. flamegraph.pl build.folded > build.svg
+        profiler.save_json('build.json')
+    """
+
+    def __init__(self):
+        self.elapsed = 0.0
+        self._stacks = {}
+        self._objects = {}
+        self._stack = []
+        self._originals = []
+
+    def __enter__(self):
+        global _ACTIVE
+
+        if _ACTIVE is not None:
+            raise RuntimeError("Another profiler is already active")
+        _ACTIVE = self
+
+        for cls, name in _targets():
+            original = cls.__dict__[name]
+            self._originals.append((cls, name, original))
+            setattr(cls, name, self._timed(original, cls.__name__ + "." + name))
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _ACTIVE
+
+        self.elapsed += time.perf_counter() - self._start
+        for cls, name, original in reversed(self._originals):
+            setattr(cls, name, original)
+        self._originals = []
+        _ACTIVE = None
+        return False
+
+    def _timed(self, function, frame):
+        stack = self._stack
+        stacks = self._stacks
+        objects = self._objects
+        clock = time.perf_counter
+
+        @functools.wraps(function)
+        def timed(obj, *args, **kwargs):
+            # The entry is the frame and the time spent in the instrumented calls it makes
+            entry = [frame, 0.0]
+            stack.append(entry)
+            start = clock()
+            try:
+                return function(obj, *args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                own = elapsed - entry[1]
+                key = tuple(e[0] for e in stack)
+                stacks[key] = stacks.get(key, 0.0) + own
+                record = objects.get((frame, id(obj)))
+                if record is None:
+                    objects[(frame, id(obj))] = [obj, own, 1]
+                else:
+                    record[1] += own
+                    record[2] += 1
+                stack.pop()
+                if stack:
+                    stack[-1][1] += elapsed
+
+        return timed
+
+    def functions(self):
+        """
+        Returns the time spent in each instrumented method.
+
+        Returns:
+            *dict*: The (calls, own time, total time) by method, e.g. `"Task.generate_script"`, in seconds. The
+            own time excludes the time spent in the other instrumented methods called.
+        """
+
+        result = {}
+        for (frame, _), (_, own, calls) in self._objects.items():
+            r = result.setdefault(frame, [0, 0.0, 0.0])
+            r[0] += calls
+            r[1] += own
+        # Recursive calls are only counted once towards the total time
+        for stack, own in self._stacks.items():
+            for frame in set(stack):
+                result[frame][2] += own
+        return dict((k, tuple(v)) for k, v in result.items())
+
+    def classes(self):
+        """
+        Returns the time spent in the instrumented methods of each class.
+
+        Returns:
+            *dict*: The (calls, own time) by class name, in seconds.
+        """
+
+        result = {}
+        for obj, own, calls in self._objects.values():
+            r = result.setdefault(type(obj).__name__, [0, 0.0])
+            r[0] += calls
+            r[1] += own
+        return dict((k, tuple(v)) for k, v in result.items())
+
+    def subtrees(self, depth=None):
+        """
+        Returns the time spent on each subtree: in its nodes and their attributes, including their scripts.
+
+        Parameters:
+            depth(int): The depth of the subtrees reported, e.g. 1 for suites, 2 for their children, by default all.
+
+        Returns:
+            *dict*: The time by path of the root of the subtrees, in seconds.
+        """
+
+        result = {}
+        for obj, own, _ in self._objects.values():
+            node = _node(obj)
+            if node is None:
+                continue
+            names = node.fullname.strip("/").split("/")
+            limit = len(names) if depth is None else min(depth, len(names))
+            for i in range(1, limit + 1):
+                path = "/" + "/".join(names[:i])
+                result[path] = result.get(path, 0.0) + own
+        return result
+
+    def summary(self, top=20):
+        """
+        Returns a summary of the profile, serialisable as JSON.
+
+        Parameters:
+            top(int): The number of subtrees reported, the most expensive ones first.
+
+        Returns:
+            *dict*: The elapsed time, and the times by method, class and subtree.
+        """
+
+        subtrees = sorted(self.subtrees().items(), key=lambda x: -x[1])
+        return {
+            "elapsed": self.elapsed,
+            "functions": dict(
+                (k, {"calls": c, "own": o, "total": t})
+                for k, (c, o, t) in self.functions().items()
+            ),
+            "classes": dict(
+                (k, {"calls": c, "own": o}) for k, (c, o) in self.classes().items()
+            ),
+            "subtrees": dict(subtrees[:top]),
+        }
+
+    def save_json(self, path, top=20):
+        """
+        Saves the `summary` as JSON.
+
+        Parameters:
+            path(str): The path of the file.
+            top(int): The number of subtrees reported.
+        """
+
+        with open(path, "w") as f:
+            json.dump(self.summary(top), f, indent=2)
+
+    def save_folded(self, path):
+        """
+        Saves the profile in the folded stacks format of flame graph tools (e.g. `flamegraph.pl`, speedscope): one
+        line per call stack with the time spent in the innermost method, in microseconds.
+
+        Parameters:
+            path(str): The path of the file.
+        """
+
+        with open(path, "w") as f:
+            for stack, own in sorted(self._stacks.items()):
+                f.write("%s %d\n" % (";".join(stack), round(own * 1e6)))
+
+    def report(self, top=20):
+        """
+        Returns:
+            *str*: The most expensive methods, classes and subtrees, as text.
+        """
+
+        lines = ["Elapsed: %.3f s" % (self.elapsed,), "", "Methods:"]
+        functions = sorted(self.functions().items(), key=lambda x: -x[1][1])
+        for name, (calls, own, total) in functions[:top]:
+            lines.append(
+                "  %-40s %10d calls %10.3f s own %10.3f s total"
+                % (name, calls, own, total)
+            )
+        lines += ["", "Classes:"]
+        classes = sorted(self.classes().items(), key=lambda x: -x[1][1])
+        for name, (calls, own) in classes[:top]:
+            lines.append("  %-40s %10d calls %10.3f s" % (name, calls, own))
+        lines += ["", "Subtrees:"]
+        subtrees = sorted(self.subtrees().items(), key=lambda x: -x[1])
+        for path, seconds in subtrees[:top]:
+            lines.append("  %-60s %10.3f s" % (path, seconds))
+        return "\n".join(lines)
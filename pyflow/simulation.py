@@ -0,0 +1,923 @@
+from __future__ import absolute_import
+
+import datetime
+import heapq
+import random
+from collections.abc import Mapping, Sequence
+
+from .attributes import (
+    Complete,
+    Cron,
+    Crons,
+    Date,
+    Day,
+    Defstatus,
+    Event,
+    Follow,
+    InLimit,
+    Label,
+    Limit,
+    Meter,
+    Time,
+    Today,
+    Trigger,
+    Variable,
+    as_date,
+)
+from .cron import days_of_month, days_of_week, hours, minutes, months
+from .expressions import (
+    And,
+    BinOp,
+    Constant,
+    Deferred,
+    Eq,
+    Function,
+    NodeName,
+    NodeStatus,
+    Not,
+    Or,
+    make_expression,
+)
+from .nodes import Node, Task
+from .values import OPERATORS, REPEATS, repeat_values, resolve
+
+NEVER = float("inf")
+
+QUEUED, ACTIVE, COMPLETE = "queued", "active", "complete"
+
+# Events of the simulation queue, ordered so that completions are handled first at any given time
+_COMPLETION, _WAKE = range(2)
+
+
+_STATUSES = {"set": 1, "clear": 0}
+
+# The attributes which matter to the simulation
+_SIMULATED = (
+    Trigger,
+    Follow,
+    Complete,
+    Event,
+    Meter,
+    Limit,
+    InLimit,
+    Defstatus,
+    Time,
+    Today,
+    Cron,
+    Crons,
+    Date,
+    Day,
+) + REPEATS
+
+
+def _julian(value):
+    return as_date(int(value)).toordinal() + 1721425
+
+
+def _all_of(closures):
+    # The conjunction of compiled expressions, evaluated lazily
+    def evaluate():
+        for c in closures:
+            if not c():
+                return False
+        return True
+
+    return evaluate
+
+
+def _any_of(closures):
+    def evaluate():
+        for c in closures:
+            if c():
+                return True
+        return False
+
+    return evaluate
+
+
+def _time_slot(value):
+    # The first time of day in seconds of a time, today or cron attribute, and whether it is relative
+    value = value.strip()
+    if ":" in value:
+        first = value.split()[0]
+        relative = first.startswith("+")
+        h, m = first.lstrip("+").split(":")[:2]
+        return int(h) * 3600 + int(m) * 60, relative, None
+
+    minute, hour, day_of_month, month, day_of_week = value.split(" ")
+    slot = _first(hours(hour)) * 3600 + _first(minutes(minute)) * 60
+    return slot, False, _calendar(day_of_week, day_of_month, month)
+
+
+def _first(ranges):
+    return 0 if ranges is None else min(r[0] for r in ranges)
+
+
+def _members(ranges):
+    if ranges is None:
+        return None
+    return set(i for first, last, step in ranges for i in range(first, last + 1, step))
+
+
+def _calendar(week_days=None, month_days=None, month=None, last_day=False):
+    # A predicate on dates for the constraints of a cron, None when there are none
+    if isinstance(week_days, str):
+        week_days = _members(days_of_week(week_days))
+        month_days = _members(days_of_month(month_days))
+        month = _members(months(month))
+    if not (week_days or month_days or month or last_day):
+        return None
+
+    def matches(date):
+        if month and date.month not in month:
+            return False
+        if week_days and (date.weekday() + 1) % 7 not in week_days:
+            return False
+        if month_days or last_day:
+            last = (date + datetime.timedelta(days=1)).day == 1
+            return bool((month_days and date.day in month_days) or (last_day and last))
+        return True
+
+    return matches
+
+
+def _date_matches(day, month, year):
+    def matches(date):
+        return (
+            (not day or date.day == day)
+            and (not month or date.month == month)
+            and (not year or date.year == year)
+        )
+
+    return matches
+
+
+def _weekday_matches(name):
+    weekday = [
+        "monday",
+        "tuesday",
+        "wednesday",
+        "thursday",
+        "friday",
+        "saturday",
+        "sunday",
+    ].index(str(name).lower())
+
+    def matches(date):
+        return date.weekday() == weekday
+
+    return matches
+
+
+def duration_model(durations, default=None):
+    """
+    Converts a description of task run times into a function of the task and of a random generator.
+
+    Parameters:
+        durations(float,dict,function): Either the run time of every task in seconds, a dictionary of run times
+            indexed by task path, or a function of the task and of a `random.Random` instance. The values of the
+            dictionary may also be lists of past run times, sampled uniformly, or functions.
+        default(float): The run time of tasks missing from the dictionary.
+
+    Returns:
+        *function*: The run time in seconds of a task, given the task and a random generator.
+
+    Example::
+
+        pyflow.simulation.duration_model({'/s/f/t1': [50, 60, 62], '/s/f/t2': 120}, default=30)
+        pyflow.simulation.duration_model(lambda task, rng: rng.lognormvariate(4, 0.5))
+    """
+
+    if callable(durations):
+        return durations
+
+    if isinstance(durations, Mapping):
+
+        def model(task, rng):
+            try:
+                value = durations[task.fullname]
+            except KeyError:
+                if default is None:
+                    raise KeyError("No run time for task %s" % (task.fullname,))
+                return default
+            if callable(value):
+                return value(task, rng)
+            if isinstance(value, Sequence):
+                return rng.choice(value)
+            return value
+
+        return model
+
+    def constant(task, rng):
+        return durations
+
+    return constant
+
+
+class SimulationReport:
+    """
+    The outcome of a simulated run of a suite.
+
+    All times are in seconds since the start of the simulation.
+
+    Attributes:
+        makespan(float): The time when the last task completed.
+        tasks(dict): The (ready, start, end) times of each run, by task path. Tasks run several times by repeats only
+            keep their last run.
+        not_run(list): The paths of the tasks that never ran, e.g. held by triggers, dates or suspended nodes.
+        limits(dict): For each limit, by path, its ``capacity``, the ``peak`` number of tokens in use, and the number
+            of ``waits``, ``total_wait`` and ``max_wait`` times of the tasks it held back.
+        hosts(dict): For each host, by name, the number of ``runs``, the ``busy`` time summed over all tasks, the
+            ``peak`` number of tasks running at once, its ``capacity`` (the host limit, if any), and its
+            ``utilisation``, relative to its capacity or peak.
+    """
+
+    def __init__(self, makespan, tasks, not_run, limits, hosts):
+        self.makespan = makespan
+        self.tasks = tasks
+        self.not_run = not_run
+        self.limits = limits
+        self.hosts = hosts
+
+    def __str__(self):
+        lines = [
+            "Makespan: %s" % (datetime.timedelta(seconds=round(self.makespan)),),
+            "Tasks run: %d, tasks not run: %d" % (len(self.tasks), len(self.not_run)),
+        ]
+        if self.limits:
+            lines.append("Limits:")
+            for name, s in sorted(self.limits.items()):
+                lines.append(
+                    "    %s: capacity %s, peak %d, %d waits, %.0fs in total, %.0fs at most"
+                    % (
+                        name,
+                        s["capacity"],
+                        s["peak"],
+                        s["waits"],
+                        s["total_wait"],
+                        s["max_wait"],
+                    )
+                )
+        if self.hosts:
+            lines.append("Hosts:")
+            for name, s in sorted(self.hosts.items()):
+                lines.append(
+                    "    %s: %d runs, %.0fs busy, peak %d, utilisation %.1f%%"
+                    % (name, s["runs"], s["busy"], s["peak"], 100 * s["utilisation"])
+                )
+        return "\n".join(lines)
+
+
+class Simulator:
+    """
+    A discrete-event simulation of the execution of a suite by an **ecFlow** server, without a server.
+
+    Tasks are submitted in tree order as soon as their triggers and the triggers of their ancestors hold, their
+    time, date, day and cron dependencies are due, and tokens are free in all their limits. The simulation honours
+    complete expressions, default statuses (complete nodes are skipped, suspended nodes never run) and repeats,
+    whose nodes are requeued for each value.
+
+    The following simplifications apply:
+
+    * events are set, and meters reach their maximum, when tasks complete,
+    * only the first time slot of time series and crons is used, and crons do not requeue their node,
+    * a repeat day runs once,
+    * nodes outside of the suite, e.g. externs, are considered complete, with their events set.
+
+    Parameters:
+        suite(Suite_): The suite to simulate.
+        durations(float,dict,function): The run times of the tasks, see `duration_model`.
+        default(float): The run time of tasks missing from the `durations` dictionary.
+        start(datetime): The date and time at which the suite begins, today at midnight by default.
+        seed(int): The seed of the random generator given to duration models.
+        until(float): Stops the simulation after this many seconds.
+
+    Example::
+
+        report = pyflow.Simulator(suite, durations={'/s/f/t1': 120}, default=60).run()
+        print(report.makespan)
+    """
+
+    def __init__(
+        self, suite, durations=60, default=None, start=None, seed=0, until=None
+    ):
+        self._suite = suite
+        self._duration = duration_model(durations, default)
+        if start is None:
+            start = datetime.datetime.combine(datetime.date.today(), datetime.time())
+        self._start = as_date(start)
+        self._offset = (
+            self._start - datetime.datetime.combine(self._start.date(), datetime.time())
+        ).total_seconds()
+        self._seed = seed
+        self._until = NEVER if until is None else until
+
+    ###############################################################################
+
+    def _index(self):
+        # Nodes are numbered in tree order, which is also the order in which the server submits tasks
+        self._nodes = []
+        self._ids = {}
+        self._compiled = {}
+        self._parents = []
+        self._ends = []
+        stack = [(self._suite, -1)]
+        while stack:
+            node, parent = stack.pop()
+            if node is None:
+                self._ends[parent] = len(self._nodes)
+                continue
+            i = len(self._nodes)
+            self._ids[id(node)] = i
+            self._nodes.append(node)
+            self._parents.append(parent)
+            self._ends.append(None)
+            stack.append((None, i))
+            stack.extend((child, i) for child in reversed(node.executable_children))
+
+        count = len(self._nodes)
+        self._tasks = [isinstance(n, Task) for n in self._nodes]
+        self._children = [0] * count
+        for p in self._parents:
+            if p >= 0:
+                self._children[p] += 1
+
+        # Attributes referenced by expressions, as (kind, node, name)
+        self._attributes = {}
+        self._events = [None] * count
+        self._meters = [None] * count
+        self._repeats = [None] * count
+        self._limits = {}
+        self._inlimits = [()] * count
+        self._times = [None] * count
+        self._dates = [None] * count
+        self._suspended = bytearray(count)
+        self._defcomplete = bytearray(count)
+        triggers = [[] for _ in range(count)]
+        completes = [[] for _ in range(count)]
+
+        simulated = {}
+        for i, node in enumerate(self._nodes):
+            inlimits = []
+            for a in node.children:
+                # Most attributes are variables, the relevant types are only looked up once
+                relevant = simulated.get(type(a))
+                if relevant is None:
+                    relevant = simulated[type(a)] = issubclass(type(a), _SIMULATED)
+                if not relevant:
+                    continue
+                if isinstance(a, (Trigger, Follow)):
+                    triggers[i].append(a.value)
+                elif isinstance(a, Complete):
+                    completes[i].append(a.value)
+                elif isinstance(a, Event):
+                    self._events[i] = self._events[i] or {}
+                    self._events[i][a.name] = 0
+                    self._attributes[id(a)] = ("event", i, a.name)
+                elif isinstance(a, Meter):
+                    self._meters[i] = self._meters[i] or {}
+                    low, high = resolve(a._min, a), resolve(a._max, a)
+                    self._meters[i][a.name] = [low, low, high]
+                    self._attributes[id(a)] = ("meter", i, a.name)
+                elif isinstance(a, REPEATS):
+                    self._repeats[i] = [repeat_values(a), 0]
+                    self._attributes[id(a)] = ("repeat", i, a.name)
+                elif isinstance(a, Limit):
+                    self._limit(a)
+                elif isinstance(a, InLimit):
+                    inlimits.append(a)
+                elif isinstance(a, Defstatus):
+                    if str(a.value) == COMPLETE:
+                        self._defcomplete[i] = 1
+                    elif str(a.value) == "suspended":
+                        self._suspended[i] = 1
+                elif isinstance(a, (Time, Today, Cron, Crons)):
+                    slot, relative, calendar = _time_slot(a.value)
+                    if isinstance(a, Cron):
+                        calendar = calendar or _calendar(
+                            a._days_of_week,
+                            a._days_of_month,
+                            a._months,
+                            a._last_day_of_the_month,
+                        )
+                    self._times[i] = (self._times[i] or []) + [
+                        (slot, relative, calendar)
+                    ]
+                elif isinstance(a, Date):
+                    self._dates[i] = (self._dates[i] or []) + [_date_matches(*a._value)]
+                elif isinstance(a, Day):
+                    self._dates[i] = (self._dates[i] or []) + [
+                        _weekday_matches(a.value)
+                    ]
+
+            limits = [self._limit(a.limit) for a in inlimits if a.limit is not None]
+            parent = self._parents[i]
+            inherited = self._inlimits[parent] if parent >= 0 else ()
+            self._inlimits[i] = tuple(sorted(set(inherited) | set(limits)))
+
+        # Referenced nodes notify the nodes holding the expressions when they change
+        self._dependents = [[] for _ in range(count)]
+        self._triggers = [self._compile_all(i, e) for i, e in enumerate(triggers)]
+        self._completes = [self._compile_all(i, e) for i, e in enumerate(completes)]
+        self._dependents = [sorted(set(d)) for d in self._dependents]
+        self._compiled = {}
+
+    def _limit(self, limit):
+        key = id(limit)
+        if key not in self._limits:
+            self._limits[key] = {
+                "name": limit.fullname,
+                "capacity": limit.value,
+                "used": 0,
+                "peak": 0,
+                "waits": 0,
+                "total_wait": 0.0,
+                "max_wait": 0.0,
+            }
+        return key
+
+    ###############################################################################
+
+    def _compile_all(self, i, expressions):
+        if not expressions:
+            return None
+        compiled = []
+        for e in expressions:
+            closure, references = self._compile(make_expression(e))
+            compiled.append(closure)
+            for j in references:
+                self._dependents[j].append(i)
+        if len(compiled) == 1:
+            return compiled[0]
+        return _all_of(compiled)
+
+    def _compile(self, e):
+        # Compiles an expression into a closure over the state of the simulation, with the nodes it references; the
+        # subexpressions shared by several expressions, e.g. the status of a node, are compiled once
+        compiled = self._compiled.get(id(e))
+        if compiled is None:
+            compiled = self._compile_expression(e)
+            # The expression is kept, so that its identity is not reused
+            self._compiled[id(e)] = compiled + (e,)
+        return compiled[:2]
+
+    def _compile_expression(self, e):
+        if isinstance(e, Deferred):
+            return self._compile(make_expression(e._func(*e._args)))
+
+        if isinstance(e, (And, Or)):
+            # Nested operators of the same kind are flattened, without recursion
+            operands = [self._compile(o) for o in e._terms()]
+            closures = [c for c, _ in operands]
+            references = frozenset().union(*(r for _, r in operands))
+            if isinstance(e, And):
+                return _all_of(closures), references
+            return _any_of(closures), references
+
+        if isinstance(e, BinOp):
+            op = OPERATORS[type(e)]
+            left, right = e._left, e._right
+            if (
+                type(e) is Eq
+                and isinstance(right, NodeStatus)
+                and isinstance(left, NodeName)
+                and id(left._node) in self._ids
+            ):
+                # The most common comparison, of the status of a node of the suite
+                j = self._ids[id(left._node)]
+                state = self._state
+                value = _STATUSES.get(str(right._status), str(right._status))
+                return (lambda: state[j] == value), frozenset((j,))
+
+            (left, lr), (right, rr) = self._compile(left), self._compile(right)
+            return (lambda: op(left(), right())), lr | rr
+
+        if isinstance(e, Not):
+            param, references = self._compile(e._param)
+            return (lambda: not param()), references
+
+        if isinstance(e, Function):
+            param, references = self._compile(e._param)
+            if e._name == "cal::date_to_julian":
+                return (lambda: _julian(param())), references
+            raise ValueError("Cannot simulate function %s" % (e._name,))
+
+        if isinstance(e, NodeStatus):
+            value = _STATUSES.get(str(e._status), str(e._status))
+            return (lambda: value), frozenset()
+
+        if isinstance(e, Constant):
+            value = e._value
+            if type(value) not in (bool, int, float):
+                value = e.generate_expression()
+            return (lambda: value), frozenset()
+
+        if isinstance(e, NodeName):
+            return self._compile_reference(e._node)
+
+        raise ValueError("Cannot simulate expression %r" % (e,))
+
+    def _compile_reference(self, item):
+        holder = item
+        while not isinstance(holder, Node):
+            holder = holder.parent
+
+        j = self._ids.get(id(holder))
+        if j is None:
+            # Outside of the suite
+            if isinstance(item, Event):
+                return (lambda: 1), frozenset()
+            if isinstance(item, Node):
+                return (lambda: COMPLETE), frozenset()
+            return (lambda: 0), frozenset()
+
+        return self._reference(j, item), frozenset((j,))
+
+    def _reference(self, j, item):
+        if isinstance(item, Node):
+            state = self._state
+            return lambda: state[j]
+
+        kind, _, name = self._attributes.get(id(item), (None, j, item.name))
+        if kind == "event":
+            events = self._events[j]
+            return lambda: events[name]
+        if kind == "meter":
+            meter = self._meters[j][name]
+            return lambda: meter[0]
+        if kind == "repeat":
+            repeat = self._repeats[j]
+            return lambda: repeat[0][repeat[1]]
+        if isinstance(item, Variable):
+            value = item.value
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                pass
+            return lambda: value
+        if isinstance(item, Label):
+            value = item.value
+            return lambda: value
+        if isinstance(item, Limit):
+            limit = self._limits[self._limit(item)]
+            return lambda: limit["used"]
+        return lambda: 0
+
+    ###############################################################################
+
+    def _next_start(self, i, since):
+        # The first time from which the time and date dependencies of node i are satisfied
+        times, dates = self._times[i], self._dates[i]
+        if times is None and dates is None:
+            return since
+
+        absolute = self._offset + since
+        first_day = int(absolute // 86400)
+        candidates = times or [(None, False, None)]
+        for day in range(first_day, first_day + 367):
+            date = self._start.date() + datetime.timedelta(days=day)
+            if dates is not None and not any(d(date) for d in dates):
+                continue
+            best = NEVER
+            for slot, relative, calendar in candidates:
+                if calendar is not None and not calendar(date):
+                    continue
+                if slot is None:
+                    t = max(absolute, day * 86400)
+                elif relative:
+                    t = slot + self._offset
+                else:
+                    t = day * 86400 + slot
+                if t >= absolute or relative:
+                    best = min(best, t)
+            if best < NEVER:
+                return max(best - self._offset, since)
+        return NEVER
+
+    def _arm(self, i, since):
+        self._not_before[i] = self._next_start(i, since)
+        self._wakes[i] = None
+
+    ###############################################################################
+
+    def run(self):
+        """
+        Runs the simulation.
+
+        Returns:
+            SimulationReport: The makespan, queue waits and host utilisation.
+        """
+
+        self._rng = random.Random(self._seed)
+        self._reset()
+
+        makespan = 0.0
+        while True:
+            self._settle()
+            self._dispatch()
+            if not self._queue or self._queue[0][0] > self._until:
+                break
+            self._now = self._queue[0][0]
+            while self._queue and self._queue[0][0] == self._now:
+                _, kind, _, i = heapq.heappop(self._queue)
+                if kind == _COMPLETION:
+                    makespan = self._now
+                    self._complete_task(i)
+                elif self._wakes[i] == self._now:
+                    self._wakes[i] = None
+                    self._add_subtree(i)
+
+        return self._report(makespan)
+
+    def _reset(self):
+        # Indexes the suite and queues all its nodes
+        self._state = []
+        self._index()
+        count = len(self._nodes)
+
+        self._state.extend([QUEUED] * count)
+        self._incomplete = list(self._children)
+        self._not_before = [0.0] * count
+        self._wakes = [None] * count
+        self._ready_times = [None] * count
+        self._runs = {}
+        self._holding = [None] * count
+        self._hosts = {}
+        self._queue = []
+        self._sequence = 0
+        self._dirty = []
+        self._is_dirty = bytearray(count)
+        self._candidates = []
+        self._is_candidate = bytearray(count)
+        self._open = bytearray(count)
+        self._task_hosts = [None] * count
+        self._ready = {}
+        self._now = 0.0
+
+        for i in range(count):
+            self._arm(i, 0.0)
+        for i in range(count):
+            if self._defcomplete[i] and self._state[i] != COMPLETE:
+                self._force_complete(i)
+        for i in range(count):
+            self._mark_dirty(i)
+            if self._tasks[i]:
+                self._add_candidate(i)
+
+    def _report(self, makespan):
+        limits = {}
+        for s in self._limits.values():
+            limits[s["name"]] = dict(
+                (k, v) for k, v in s.items() if k not in ("name", "used")
+            )
+
+        hosts = {}
+        for name, s in self._hosts.items():
+            # Host limits only apply to the tasks in their limit
+            capacity = max(s["capacity"] or 0, s["peak"])
+            busy = s["busy"]
+            hosts[name] = dict((k, v) for k, v in s.items() if k != "running")
+            hosts[name]["utilisation"] = (
+                busy / (capacity * makespan) if capacity and makespan else 0.0
+            )
+
+        tasks = dict((self._nodes[i].fullname, run) for i, run in self._runs.items())
+        # Tasks skipped by complete expressions or default statuses did not run, but are not held either
+        not_run = [
+            n.fullname
+            for i, n in enumerate(self._nodes)
+            if self._tasks[i] and i not in self._runs and self._state[i] != COMPLETE
+        ]
+        return SimulationReport(makespan, tasks, not_run, limits, hosts)
+
+    ###############################################################################
+
+    def _mark_dirty(self, i):
+        if not self._is_dirty[i]:
+            self._is_dirty[i] = 1
+            self._dirty.append(i)
+
+    def _changed(self, i):
+        for j in self._dependents[i]:
+            self._mark_dirty(j)
+
+    def _add_candidate(self, i):
+        if not self._is_candidate[i]:
+            self._is_candidate[i] = 1
+            self._candidates.append(i)
+
+    def _add_subtree(self, i):
+        for j in range(i, self._ends[i]):
+            if self._tasks[j] and self._state[j] == QUEUED:
+                self._add_candidate(j)
+
+    def _settle(self):
+        # Re-evaluates the expressions of the nodes whose references changed
+        while self._dirty:
+            i = self._dirty.pop()
+            self._is_dirty[i] = 0
+            if self._state[i] == COMPLETE:
+                continue
+            # Complete expressions apply to queued tasks, and to families until they complete
+            complete = self._completes[i]
+            if (
+                complete is not None
+                and (self._state[i] == QUEUED or not self._tasks[i])
+                and complete()
+            ):
+                self._force_complete(i)
+                continue
+            if self._tasks[i]:
+                self._add_candidate(i)
+                continue
+            # The tasks of a family are only reconsidered when its trigger opens
+            trigger = self._triggers[i]
+            opened = trigger is None or bool(trigger())
+            if opened and not self._open[i]:
+                self._add_subtree(i)
+            self._open[i] = opened
+
+        # Queues the tasks that may run
+        candidates, self._candidates = self._candidates, []
+        for i in candidates:
+            self._is_candidate[i] = 0
+            if self._state[i] == QUEUED and self._holding[i] is None and self._free(i):
+                self._holding[i] = self._inlimits[i]
+                if self._ready_times[i] is None:
+                    self._ready_times[i] = self._now
+                heapq.heappush(self._ready.setdefault(self._inlimits[i], []), i)
+
+    def _free(self, i):
+        # Whether the triggers and the time dependencies of the task and of its ancestors are satisfied
+        while i >= 0:
+            if self._suspended[i]:
+                return False
+            trigger = self._triggers[i]
+            if trigger is not None and not trigger():
+                return False
+            if self._not_before[i] > self._now:
+                t = self._not_before[i]
+                if t < NEVER and self._wakes[i] != t:
+                    self._wakes[i] = t
+                    self._push(t, _WAKE, i)
+                return False
+            i = self._parents[i]
+        return True
+
+    def _push(self, time, kind, i):
+        self._sequence += 1
+        heapq.heappush(self._queue, (time, kind, self._sequence, i))
+
+    def _dispatch(self):
+        # Submits the ready tasks in tree order, while their limits have free tokens
+        heads = [(tasks[0], key) for key, tasks in self._ready.items() if tasks]
+        heapq.heapify(heads)
+        while heads:
+            _, key = heapq.heappop(heads)
+            tasks = self._ready[key]
+            while tasks and self._state[tasks[0]] != QUEUED:
+                self._holding[heapq.heappop(tasks)] = None
+            if not tasks:
+                continue
+            full = [
+                k for k in key if self._limits[k]["used"] >= self._limits[k]["capacity"]
+            ]
+            if full:
+                continue
+            i = heapq.heappop(tasks)
+            self._holding[i] = None
+            if self._free(i):
+                self._start_task(i)
+            else:
+                self._ready_times[i] = None
+            if tasks:
+                heapq.heappush(heads, (tasks[0], key))
+
+    def _start_task(self, i):
+        now = self._now
+        ready = self._ready_times[i]
+        wait = now - ready
+        for k in self._inlimits[i]:
+            limit = self._limits[k]
+            limit["used"] += 1
+            limit["peak"] = max(limit["peak"], limit["used"])
+        if wait > 0 and self._inlimits[i]:
+            # The wait is blamed on the most contended limit
+            limit = max(
+                (self._limits[k] for k in self._inlimits[i]),
+                key=lambda s: s["used"] / max(s["capacity"], 1),
+            )
+            limit["waits"] += 1
+            limit["total_wait"] += wait
+            limit["max_wait"] = max(limit["max_wait"], wait)
+
+        task = self._nodes[i]
+        host = self._task_hosts[i] = task.host
+        if host is not None:
+            s = self._hosts.setdefault(
+                host.name,
+                {
+                    "runs": 0,
+                    "busy": 0.0,
+                    "peak": 0,
+                    "running": 0,
+                    "capacity": host.limit,
+                },
+            )
+            s["runs"] += 1
+            s["running"] += 1
+            s["peak"] = max(s["peak"], s["running"])
+
+        self._state[i] = ACTIVE
+        self._changed(i)
+        p = self._parents[i]
+        while p >= 0 and self._state[p] == QUEUED:
+            self._state[p] = ACTIVE
+            self._changed(p)
+            p = self._parents[p]
+
+        self._launch(i)
+        self._ready_times[i] = None
+
+    def _launch(self, i):
+        # Runs the started task i, whose completion is then scheduled
+        now = self._now
+        duration = float(self._duration(self._nodes[i], self._rng))
+        self._runs[i] = (self._ready_times[i], now, now + duration)
+        if self._task_hosts[i] is not None:
+            self._hosts[self._task_hosts[i].name]["busy"] += duration
+        self._push(now + duration, _COMPLETION, i)
+
+    def _release(self, i):
+        # Frees the limit tokens and the host of task i, which stopped running
+        for k in self._inlimits[i]:
+            self._limits[k]["used"] -= 1
+        host = self._task_hosts[i]
+        if host is not None:
+            self._hosts[host.name]["running"] -= 1
+
+    def _complete_task(self, i):
+        self._release(i)
+
+        if self._events[i]:
+            for name in self._events[i]:
+                self._events[i][name] = 1
+        if self._meters[i]:
+            for meter in self._meters[i].values():
+                meter[0] = meter[2]
+
+        self._completed(i)
+
+    def _completed(self, i):
+        # Node i completed, requeues it for its next repeat value or propagates the completion upwards
+        while i >= 0:
+            if self._state[i] == COMPLETE:
+                return
+            repeat = self._repeats[i]
+            if repeat is not None and repeat[1] + 1 < len(repeat[0]):
+                repeat[1] += 1
+                self._requeue(i)
+                return
+            self._state[i] = COMPLETE
+            self._changed(i)
+            p = self._parents[i]
+            if p < 0:
+                return
+            self._incomplete[p] -= 1
+            if self._incomplete[p] > 0:
+                return
+            i = p
+
+    def _requeue(self, i):
+        for j in range(i, self._ends[i]):
+            self._state[j] = QUEUED
+            self._incomplete[j] = self._children[j]
+            if j != i and self._repeats[j] is not None:
+                self._repeats[j][1] = 0
+            if self._events[j]:
+                for name in self._events[j]:
+                    self._events[j][name] = 0
+            if self._meters[j]:
+                for meter in self._meters[j].values():
+                    meter[0] = meter[1]
+            self._open[j] = 0
+            self._arm(j, self._now)
+            self._changed(j)
+            self._mark_dirty(j)
+
+        for j in range(i, self._ends[i]):
+            if self._defcomplete[j] and self._state[j] != COMPLETE:
+                self._force_complete(j)
+
+    def _force_complete(self, i):
+        # Completes node i and its queued descendants without running them
+        for j in range(i + 1, self._ends[i]):
+            if self._state[j] == QUEUED:
+                self._state[j] = COMPLETE
+                self._incomplete[j] = 0
+                self._changed(j)
+        self._incomplete[i] = 0
+        repeat = self._repeats[i]
+        if repeat is not None:
+            repeat[1] = len(repeat[0]) - 1
+        self._completed(i)
@@ -0,0 +1,133 @@
+from __future__ import absolute_import
+
+import copyreg
+import gc
+import pickle
+from collections import deque
+from contextlib import contextmanager
+from itertools import repeat
+
+MAGIC = b"PYFLOW-SNAPSHOT"
+VERSION = 1
+
+
+class SnapshotError(ValueError):
+    """Raised when a file is not a pyflow snapshot, or was saved by an incompatible version."""
+
+
+@contextmanager
+def _gc_paused():
+    # Collections would repeatedly scan the whole tree while it is (un)pickled, without finding any garbage
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _tree(root):
+    nodes = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(reversed(list(getattr(node, "_nodes", {}).values())))
+    return nodes
+
+
+class _Pickler(pickle.Pickler):
+    """
+    Pickles the nodes of a tree in two passes: first all the nodes, empty, and then their contents. Pickling
+    each node with its contents would recurse along every chain of nodes referring to each other (e.g. a
+    family triggered by the next one, itself triggered by the next one...) before they are reached as
+    children, overflowing the stack for large suites.
+    """
+
+    def __init__(self, f, nodes):
+        super().__init__(f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._empty = set(map(id, nodes))
+
+    def reducer_override(self, obj):
+        # Only called for objects that are not pickled yet, i.e. for the nodes during the first pass
+        if id(obj) in self._empty:
+            return copyreg.__newobj__, (type(obj),)
+        return NotImplemented
+
+
+def _dump(node, f):
+    nodes = _tree(node)
+    f.write(MAGIC)
+    f.write(bytes([VERSION]))
+    with _gc_paused():
+        _Pickler(f, nodes).dump((nodes, [n.__dict__ for n in nodes]))
+
+
+def _load(f):
+    header = f.read(len(MAGIC) + 1)
+    if header[: len(MAGIC)] != MAGIC:
+        raise SnapshotError("Not a pyflow snapshot")
+    if header[len(MAGIC) :] != bytes([VERSION]):
+        raise SnapshotError(
+            "Unsupported pyflow snapshot version: {!r}".format(header[len(MAGIC) :])
+        )
+
+    with _gc_paused():
+        nodes, states = pickle.load(f)
+        # Same as setting the __dict__ of each node in a loop, without running Python code for each of them
+        deque(map(object.__setattr__, nodes, repeat("__dict__"), states), maxlen=0)
+    return nodes[0]
+
+
+def save_snapshot(node, target):
+    """
+    Saves a built tree, with its attributes, expressions, hosts and scripts, to a binary snapshot that
+    `load_snapshot` reloads without running the code that built it.
+
+    Snapshots are meant for reloading by the same version of pyflow: they store the Python objects
+    themselves, not a description of the suite.
+
+    Parameters:
+        node(*Node*): The root of the tree to save, usually a suite.
+        target(str,file): The path of the snapshot, or a file open for binary writing.
+
+    Example::
+
+        pyflow.save_snapshot(s, 'suite.snapshot')
+    """
+
+    if isinstance(target, str):
+        with open(target, "wb") as f:
+            _dump(node, f)
+    else:
+        _dump(node, target)
+
+
+def load_snapshot(source):
+    """
+    Loads a tree saved by `save_snapshot`. References between the nodes, and the expressions shared by
+    several triggers, are restored as the same objects. Expressions are interned again as they are loaded,
+    so that they are also shared with the expressions built afterwards (e.g. `t1.complete`).
+
+    Snapshots are unpickled, so that they must only be loaded from trusted sources.
+
+    Parameters:
+        source(str,file): The path of the snapshot, or a file open for binary reading.
+
+    Returns:
+        *Node*: The root of the saved tree.
+
+    Raises:
+        SnapshotError: If the source is not a snapshot saved by this version of the format.
+
+    Example::
+
+        s = pyflow.load_snapshot('suite.snapshot')
+        s.deploy_suite()
+    """
+
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return _load(f)
+    return _load(source)
@@ -0,0 +1,116 @@
+from __future__ import absolute_import
+
+import datetime
+import operator
+
+from .attributes import (
+    RepeatDate,
+    RepeatDateList,
+    RepeatDateTime,
+    RepeatDay,
+    RepeatEnumerated,
+    RepeatInteger,
+    RepeatString,
+    as_date,
+    as_delta,
+)
+from .expressions import Add, Div, Eq, Ge, Gt, Le, Lt, Mod, Ne, Sub
+
+
+def _mod(a, b):
+    # ecFlow evaluates a division or a modulo by zero as 0
+    return a % b if b else 0
+
+
+def _div(a, b):
+    return a // b if b else 0
+
+
+#: The functions of the binary operators of expressions, by class.
+OPERATORS = {
+    Eq: operator.eq,
+    Ne: operator.ne,
+    Lt: operator.lt,
+    Le: operator.le,
+    Gt: operator.gt,
+    Ge: operator.ge,
+    Add: operator.add,
+    Sub: operator.sub,
+    Mod: _mod,
+    Div: _div,
+}
+
+#: The classes of repeats, whose values are seen by expressions.
+REPEATS = (
+    RepeatDate,
+    RepeatDateList,
+    RepeatDateTime,
+    RepeatDay,
+    RepeatEnumerated,
+    RepeatInteger,
+    RepeatString,
+)
+
+
+def resolve(value, attribute):
+    """
+    Returns the value of a parameter of an attribute, which may be given as a function of the attribute.
+
+    Parameters:
+        value: The value, or a function of the attribute returning it.
+        attribute(Attribute): The attribute.
+
+    Returns:
+        The value.
+    """
+
+    return value(attribute) if callable(value) else value
+
+
+def repeat_values(repeat):
+    """
+    Returns the successive values of a repeat, as seen by trigger expressions: dates as yyyymmdd numbers, date times
+    as seconds since the epoch, and strings or enumerations which are not numbers as their positions.
+
+    Parameters:
+        repeat(Repeat): The repeat.
+
+    Returns:
+        *list*: The values, a single one for a repeat day, which loops forever.
+    """
+
+    if isinstance(repeat, RepeatInteger):
+        start, end, step = (
+            resolve(x, repeat) for x in (repeat._start, repeat._end, repeat._increment)
+        )
+        return list(range(start, end + 1, step))
+    if isinstance(repeat, RepeatDate):
+        start, end, step = (
+            resolve(x, repeat) for x in (repeat._start, repeat._end, repeat._increment)
+        )
+        start, end = as_date(start), as_date(end)
+        count = (end - start).days // step + 1
+        return [
+            int((start + datetime.timedelta(days=i * step)).strftime("%Y%m%d"))
+            for i in range(count)
+        ]
+    if isinstance(repeat, RepeatDateTime):
+        start, end, step = (
+            resolve(x, repeat) for x in (repeat._start, repeat._end, repeat._increment)
+        )
+        start, end, step = as_date(start), as_date(end), as_delta(step)
+        count = int((end - start) / step) + 1
+        epoch = datetime.datetime(1970, 1, 1)
+        return [int((start + i * step - epoch).total_seconds()) for i in range(count)]
+    if isinstance(repeat, RepeatDateList):
+        return repeat.values
+    if isinstance(repeat, RepeatEnumerated):
+        values = repeat.values
+        try:
+            return [int(v) for v in values]
+        except ValueError:
+            return list(range(len(values)))
+    if isinstance(repeat, RepeatString):
+        return list(range(len(repeat.values)))
+    # A repeat day loops forever, only one iteration is considered
+    return [0]
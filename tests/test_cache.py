@@ -0,0 +1,108 @@
+import os
+
+import pyflow
+
+
+def test_build_cache(tmpdir):
+    calls = []
+    script = str(tmpdir.join("script.sh"))
+    with open(script, "w") as f:
+        f.write("echo from file")
+
+    def build():
+        calls.append(1)
+        files = str(tmpdir.join("files"))
+        with pyflow.Suite("s", ECF_HOME=str(tmpdir), ECF_FILES=files) as s:
+            pyflow.Task("t1", script="echo foo")
+            pyflow.Task("t2", script=["echo bar", pyflow.FileScript(script)])
+        return s
+
+    cache = pyflow.BuildCache(str(tmpdir.join("cache")))
+    key = cache.fingerprint(files=[script], option="a")
+    assert key == cache.fingerprint(files=[script], option="a")
+    assert key != cache.fingerprint(files=[script], option="b")
+
+    first = cache.build(key, build)
+    assert not first.cached
+    assert first.suite.name == "s"
+    second = cache.build(key, build)
+    assert second.cached
+    assert len(calls) == 1
+    assert second.definition == first.definition
+    assert second.scripts == first.scripts
+    assert (
+        repr(cache.stats)
+        == "CacheStats(hits=1, misses=1, stale=0, stores=1, evictions=0)"
+    )
+
+    deployed = str(tmpdir.join("deployed"))
+    written = second.deploy(path=deployed)
+    assert sorted(os.path.basename(p) for p in written) == ["t1.ecf", "t2.ecf"]
+    with open(os.path.join(deployed, "t2.ecf")) as f:
+        assert "echo from file" in f.read()
+    assert second.deploy(path=deployed) == []
+
+    # Changing the source of a script discards the entry
+    with open(script, "w") as f:
+        f.write("echo changed")
+    third = cache.build(key, build)
+    assert not third.cached
+    assert (
+        "echo changed"
+        in third.scripts[os.path.join(str(tmpdir.join("files")), "t2.ecf")]
+    )
+    assert cache.stats.stale == 1
+    assert len(calls) == 2
+
+
+def test_build_cache_eviction(tmpdir):
+    def build():
+        with pyflow.Suite("s", ECF_HOME=str(tmpdir)) as s:
+            pyflow.Task("t", script="echo foo")
+        return s
+
+    cache = pyflow.BuildCache(str(tmpdir.join("cache")), max_entries=2)
+
+    keys = [cache.fingerprint(n=n) for n in range(3)]
+    for key in keys[:2]:
+        cache.build(key, build)
+    # Using the first entry makes the second one the least recently used
+    os.utime(os.path.join(cache.directory, keys[0] + ".json"), (0, 1))
+    os.utime(os.path.join(cache.directory, keys[1] + ".json"), (0, 0))
+    cache.build(keys[0], build)
+    cache.build(keys[2], build)
+
+    assert sorted(e[0] for e in cache.entries()) == sorted([keys[0], keys[2]])
+    assert cache.stats.evictions == 1
+
+    cache.max_entries = None
+    cache.max_size = 0
+    cache.evict()
+    assert cache.entries() == []
+    assert cache.stats.evictions == 3
+
+
+def test_configuration_files(tmpdir):
+    with open(str(tmpdir.join("choice.py")), "w") as f:
+        f.write(
+            "import pyflow\n\nclass Configuration(pyflow.Configuration):\n    pass\n"
+        )
+
+    class Choice(pyflow.FileConfiguration):
+        argument = "choice"
+        config_dir = str(tmpdir)
+
+    class Config(pyflow.Configurator):
+        choice = Choice
+
+    class Args:
+        choice = "choice"
+
+    config = Config(Args())
+    assert pyflow.cache.configuration_files(config) == [str(tmpdir.join("choice.py"))]
+
+    cache = pyflow.BuildCache(str(tmpdir.join("cache")))
+    key = cache.fingerprint(configurator=config)
+    with open(str(tmpdir.join("choice.py")), "a") as f:
+        f.write("# changed\n")
+    assert cache.fingerprint(configurator=config) != key
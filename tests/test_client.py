@@ -0,0 +1,74 @@
+import pytest
+
+import pyflow
+
+
+class RecordingClient:
+    def __init__(self, failures=0):
+        self.calls = []
+        self.failures = failures
+
+    def __getattr__(self, command):
+        def call(*args):
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("Connection refused")
+            if command == "replace":
+                args = args[:1]
+            self.calls.append((command,) + args)
+
+        return call
+
+
+def test_batches():
+    with pyflow.Suite("s", host=pyflow.LocalHost()) as s:
+        for i in range(3):
+            with pyflow.Family("f{}".format(i)):
+                pyflow.Task("t")
+    client = RecordingClient()
+    with pyflow.ClientSession("localhost:3141", client=client) as session:
+        session.suspend(s.f0, s.f1, "/s/f2")
+        session.alter([s.f0, s.f1], "change", "variable", "YMD", "20240101")
+        session.alter([s.f2], "change", "variable", "YMD", "20240102")
+        session.replace(s.f0, s.f0.t, s.f1)
+        session.requeue(s.f0, s.f1, option="force")
+        session.resume(s.f0)
+        assert len(session.pending) == 12
+
+    assert client.calls == [
+        ("suspend", ["/s/f0", "/s/f1", "/s/f2"]),
+        ("alter", ["/s/f0", "/s/f1"], "change", "variable", "YMD", "20240101"),
+        ("alter", "/s/f2", "change", "variable", "YMD", "20240102"),
+        ("replace", "/s/f0"),
+        ("replace", "/s/f1"),
+        ("requeue", ["/s/f0", "/s/f1"], "force"),
+        ("resume", "/s/f0"),
+    ]
+    assert session.pending == []
+    assert session.stats.calls == 7
+    assert session.stats.operations == 12
+    assert len(session.stats.latencies["replace"]) == 2
+
+
+def test_retries():
+    with pyflow.Suite("s", host=pyflow.LocalHost()) as s:
+        pyflow.Family("f0")
+        pyflow.Family("f1")
+    client = RecordingClient(failures=2)
+    session = pyflow.ClientSession("localhost", retries=2, retry_delay=0, client=client)
+    session.suspend(s.f0)
+    assert session.flush() == 1
+    assert client.calls == [("suspend", "/s/f0")]
+    assert session.stats.retries == 2
+
+    client.failures = 2
+    session = pyflow.ClientSession("localhost", retries=1, retry_delay=0, client=client)
+    session.suspend(s.f0)
+    session.resume(s.f1)
+    with pytest.raises(pyflow.ClientError):
+        session.flush()
+    assert session.stats.failures == 1
+    assert session.pending == [
+        pyflow.Operation("suspend", "/s/f0"),
+        pyflow.Operation("resume", "/s/f1"),
+    ]
@@ -0,0 +1,85 @@
+import pyflow
+
+
+def test_content_hash():
+    suites = []
+    for _ in range(2):
+        with pyflow.Suite("s", host=pyflow.LocalHost()) as s:
+            for i in range(2):
+                with pyflow.Family("f{}".format(i)):
+                    for j in range(2):
+                        pyflow.Task(
+                            "t{}".format(j), script="echo 1", labels={"info": "text"}
+                        )
+        suites.append(s)
+    a, b = suites
+    assert a.content_hash == b.content_hash
+    assert a.f0.t0.content_hash == b.f0.t0.content_hash
+    assert a.f0.t0.content_hash != a.f0.t1.content_hash
+
+    b.f1.t0.script = "echo 2"
+    assert a.content_hash != b.content_hash
+    assert a.f0.content_hash == b.f0.content_hash
+    assert a.f1.content_hash != b.f1.content_hash
+    b.f1.t0.script = "echo 1"
+    assert a.content_hash == b.content_hash
+
+    # Attributes and inherited content are part of the hash
+    with b.f0.t1:
+        pyflow.Event("done")
+    assert a.f0.content_hash != b.f0.content_hash
+    b.f1.t1.script = "echo $WORKDIR"
+    hashed = b.f1.t1.content_hash
+    # Exported by the script once defined
+    b.f1.WORKDIR = "/tmp"
+    assert b.f1.t1.content_hash != hashed
+
+    # Changes to scripts made in place must be notified
+    hashed = b.content_hash
+    b.f0.t0.script._values.append("echo more")
+    assert b.content_hash == hashed
+    b.f0.t0.invalidate_content_hash()
+    assert b.content_hash != hashed
+
+
+def test_changed_nodes():
+    suites = []
+    for _ in range(2):
+        with pyflow.Suite("s", host=pyflow.LocalHost()) as s:
+            for i in range(2):
+                with pyflow.Family("f{}".format(i)):
+                    for j in range(2):
+                        pyflow.Task("t{}".format(j), script="echo 1")
+        suites.append(s)
+    a, b = suites
+    assert pyflow.changed_nodes(a, b) == []
+
+    b.f0.t1.script = "echo 2"
+    with b.f1:
+        pyflow.Task("t2")
+    b.f1.remove_node(b.f1.t0)
+    assert pyflow.changed_nodes(a, b) == [
+        ("/s/f0/t1", "changed"),
+        ("/s/f1/t2", "added"),
+        ("/s/f1/t0", "removed"),
+    ]
+
+
+def test_reordered_content_hash():
+    with pyflow.Suite("s", host=pyflow.LocalHost()) as s:
+        pyflow.Task("a", script="echo a")
+        pyflow.Task("b", script="echo b")
+    with pyflow.Suite("s", host=pyflow.LocalHost()) as reordered:
+        pyflow.Task("b", script="echo b")
+        pyflow.Task("a", script="echo a")
+
+    before = s.content_hash
+    pyflow.DependencyGraph(s).reorder_children(durations={"/s/a": 1, "/s/b": 100})
+    assert [n.name for n in s.executable_children] == ["b", "a"]
+    assert s.content_hash != before
+    assert s.content_hash == reordered.content_hash
+
+    with pyflow.Suite("s", host=pyflow.LocalHost()) as original:
+        pyflow.Task("a", script="echo a")
+        pyflow.Task("b", script="echo b")
+    assert pyflow.changed_nodes(original, s) == [("/s", "reordered")]
@@ -0,0 +1,199 @@
+import pytest
+
+from pyflow import Event, Family, InLimit, Limit, Suite, Task, all_complete
+from pyflow.dependencies import DependencyCycleError, DependencyGraph
+from pyflow.simulation import Simulator
+
+
+def test_dependency_edges():
+    with Suite("s") as s:
+        with Family("f") as f:
+            t1 = Task("t1")
+            t1.add_node(Event("go"))
+            t2 = Task("t2", triggers=t1.go)
+        t3 = Task("t3", triggers=f & (t1.aborted | t2.complete), completes=t1)
+
+    graph = DependencyGraph(s)
+    assert len(graph) == 5
+    assert set((a.name, b.name, kind) for a, b, kind in graph.edges()) == {
+        ("t1", "t2", "trigger"),
+        ("f", "t3", "trigger"),
+        ("t1", "t3", "trigger"),
+        ("t2", "t3", "trigger"),
+        ("t1", "t3", "complete"),
+    }
+    assert [(a, b) for a, b, _ in graph.edges("complete")] == [(t1, t3)]
+    assert graph.cycles() == []
+    graph.check()
+
+
+def test_dependency_cycles():
+    with Suite("s") as s:
+        with Family("f") as f:
+            t1 = Task("t1")
+            t2 = Task("t2", triggers=t1)
+        t3 = Task("t3")
+
+    t1.triggers = t2
+    with pytest.raises(DependencyCycleError) as e:
+        DependencyGraph(s).check()
+    assert "start(/s/f/t1) -> complete(/s/f/t1) -> start(/s/f/t2)" in str(e.value)
+
+    # A task waiting for its own family never runs
+    t1.triggers = f
+    t2.triggers = t3
+    cycles = DependencyGraph(s).cycles()
+    assert len(cycles) == 1
+    assert set(node.name for node, _ in cycles[0]) == {"f", "t1"}
+
+    # Unless something else may complete the family
+    f.completes = t3
+    assert DependencyGraph(s).cycles() == []
+
+
+def test_downstream_upstream():
+    with Suite("s") as s:
+        with Family("f") as f:
+            t1 = Task("t1")
+            t1.add_node(Event("go"))
+            t2 = Task("t2", triggers=t1.go)
+            t3 = Task("t3", triggers=t2)
+        with Family("g", triggers=t1) as g:
+            t4 = Task("t4")
+            t5 = Task("t5", triggers=t4)
+        t6 = Task("t6", completes=f)
+        t7 = Task("t7", triggers=t5 | t6)
+        t8 = Task("t8")
+
+    graph = DependencyGraph(s)
+
+    assert graph.downstream(t1) == ["/s/f/t2", "/s/f/t3", "/s/g", "/s/t6", "/s/t7"]
+    assert graph.downstream(t1.go) == ["/s/f/t2", "/s/f/t3", "/s/t6", "/s/t7"]
+    assert graph.downstream(t3) == ["/s/t6", "/s/t7"]
+    assert graph.downstream(t4, t8) == ["/s/g/t5", "/s/t7"]
+    assert graph.downstream(t7) == []
+
+    assert graph.upstream(t7) == ["/s/f", "/s/g/t4", "/s/g/t5", "/s/t6"]
+    assert graph.upstream(t5) == ["/s/f/t1", "/s/g/t4"]
+    assert graph.upstream(g) == ["/s/f/t1", "/s/g/t4"]
+    assert graph.upstream(t1.go) == []
+
+    with pytest.raises(ValueError):
+        graph.downstream(Task("t9"))
+
+
+def test_reduce_triggers():
+    with Suite("s") as s:
+        t0 = Task("t0")
+        with Family("f", triggers=t0) as f:
+            t1 = Task("t1", triggers=t0)
+            t2 = Task("t2", triggers=t1)
+            t3 = Task("t3", triggers=t1 & t2 & t0.aborted)
+        t4 = Task("t4", triggers=f & t2 & t0)
+        t5 = Task("t5", triggers=t4, completes=t3)
+        t6 = Task("t6", triggers=t5 & t3)
+
+    definition = str(s.ecflow_definition())
+
+    graph = DependencyGraph(s)
+    assert graph.reduce_triggers() == {t1: [t0], t3: [t1], t4: [t2, t0]}
+    assert graph.redundant_triggers() == {}
+
+    assert list(t1.triggers) == []
+    assert repr(t3.triggers.value) == "((/s/f/t2 eq complete) and (/s/t0 eq aborted))"
+    assert repr(t4.triggers.value) == "(/s/f eq complete)"
+    # t5 may complete before t3 does
+    assert repr(t6.triggers.value) == "((/s/t5 eq complete) and (/s/f/t3 eq complete))"
+
+    assert str(s.ecflow_definition()) != definition
+
+
+def test_reduce_sliding_triggers():
+    with Suite("s") as s:
+        tasks = []
+        for i in range(20):
+            t = Task("t%d" % i)
+            if tasks:
+                t.triggers = all_complete(tasks[-3:])
+            tasks.append(t)
+
+    redundant = DependencyGraph(s).redundant_triggers()
+    # Each task only needs to wait for the previous one
+    assert redundant == dict(
+        (t, tasks[max(0, i - 3) : i - 1]) for i, t in enumerate(tasks) if i > 1
+    )
+
+
+def test_reduce_triggers_cycle():
+    with Suite("s") as s:
+        t1 = Task("t1")
+        t2 = Task("t2", triggers=t1)
+    t1.triggers = t2
+
+    with pytest.raises(DependencyCycleError):
+        DependencyGraph(s).reduce_triggers()
+
+
+def test_critical_path():
+    with Suite("s") as s:
+        limit = Limit("l", 1)
+        with Family("f", inlimits=limit):
+            t1 = Task("t1", RUN_TIME=30)
+            t2 = Task("t2", triggers=t1)
+            Task("t3")
+        Task("t4", triggers=t2)
+        Task("t5", triggers=s.f)
+
+    critical = DependencyGraph(s).critical_path(
+        {"/s/f/t2": 20, "/s/f/t3": 10, "/s/t4": 5, "/s/t5": 15}, variable="RUN_TIME"
+    )
+
+    assert critical.makespan == 65
+    assert critical.path == ["/s/f/t1", "/s/f/t2", "/s/t5"]
+    assert critical.limits == {"/s:l": 60}
+    assert critical.lower_bound == 65
+    assert critical.earliest_start["/s/t4"] == 50
+    assert critical.latest_start["/s/t4"] == 60
+    assert critical.slack["/s/t4"] == 10
+    assert critical.slack["/s/f/t3"] == 40
+    assert critical.slack["/s/f/t2"] == 0
+
+    assert DependencyGraph(s).critical_path(1).makespan == 3
+
+    t1.triggers = t2
+    with pytest.raises(DependencyCycleError):
+        DependencyGraph(s).critical_path()
+
+
+def test_reorder_children():
+    with Suite("s") as s:
+        limit = Limit("l", 2)
+        with Family("f", inlimits=limit) as f:
+            for i in range(4):
+                Task("a%d" % i)
+            b = Task("b", RUN_TIME=40)
+        Task("c", triggers=b)
+
+    def attributes():
+        return [(i, c) for i, c in enumerate(f.children) if not isinstance(c, Task)]
+
+    durations = {"/s/f/b": 40}
+    generated = str(s.ecflow_definition())
+    before = attributes()
+    assert Simulator(s, durations, default=10).run().makespan == 70
+
+    graph = DependencyGraph(s)
+    critical = graph.reorder_children(10, variable="RUN_TIME")
+    assert Simulator(s, durations, default=10).run().makespan == 50
+
+    assert critical.makespan == 50
+    assert [t.name for t in f.executable_children] == ["b", "a0", "a1", "a2", "a3"]
+    assert any(isinstance(c, InLimit) for _, c in before)
+    assert all(a == b and c is d for (a, c), (b, d) in zip(before, attributes()))
+    assert str(s.ecflow_definition()) != generated
+    assert sorted(str(s.ecflow_definition()).split("\n")) == sorted(
+        generated.split("\n")
+    )
+
+    graph.reorder_children(10, priority={"/s/f/a3": 1})
+    assert [t.name for t in f.executable_children] == ["a3", "b", "a0", "a1", "a2"]
@@ -0,0 +1,95 @@
+import pyflow
+
+
+def test_no_changes():
+    suites = []
+    for _ in range(2):
+        with pyflow.Suite("s", host=pyflow.LocalHost(), WORKDIR="/tmp") as s:
+            with pyflow.Family("f", labels={"info": "text"}):
+                t0 = pyflow.Task("t0", script="echo 1", events=["done"])
+                t1 = pyflow.Task("t1", script="echo 1")
+                t1.triggers = t0.complete
+        suites.append(s)
+
+    diff = pyflow.diff_suites(*suites)
+    assert not diff
+    assert diff.operations == []
+
+
+def test_alterations():
+    suites = []
+    for _ in range(2):
+        with pyflow.Suite("s", host=pyflow.LocalHost(), WORKDIR="/tmp") as s:
+            with pyflow.Family("f", labels={"info": "text"}):
+                t0 = pyflow.Task("t0", script="echo 1", events=["done"])
+                t1 = pyflow.Task("t1", script="echo 1")
+                t1.triggers = t0.complete
+        suites.append(s)
+    a, b = suites
+    b.WORKDIR = "/scratch"
+    b.f.labels = {"info": "other"}
+    b.f.t1.triggers = b.f.t0.aborted
+    b.f.t0.script = "echo 2"
+
+    diff = pyflow.diff_suites(a, b)
+    assert diff.operations == [
+        pyflow.Operation("alter", "/s", "change", "variable", "WORKDIR", "/scratch"),
+        pyflow.Operation("alter", "/s/f", "change", "label", "info", "other"),
+        pyflow.Operation("alter", "/s/f/t1", "change", "trigger", "", "t0 eq aborted"),
+    ]
+    assert [str(c) for c in diff.changes if c.kind == "script"] == ["script /s/f/t0"]
+    assert str(diff.operations[0]) == "--alter=change variable WORKDIR /scratch /s"
+
+
+def test_replacements():
+    suites = []
+    for _ in range(2):
+        with pyflow.Suite("s", host=pyflow.LocalHost(), WORKDIR="/tmp") as s:
+            with pyflow.Family("f", labels={"info": "text"}):
+                t0 = pyflow.Task("t0", script="echo 1", events=["done"])
+                t1 = pyflow.Task("t1", script="echo 1")
+                t1.triggers = t0.complete
+        suites.append(s)
+    a, b = suites
+    with b.f:
+        pyflow.Task("t2")
+    with b.f.t1:
+        pyflow.Event("failed")
+    b.f.t0.remove_node(b.f.t0._nodes["done"])
+
+    diff = pyflow.diff_suites(a, b)
+    assert diff.operations == [
+        pyflow.Operation("alter", "/s/f/t0", "delete", "event", "done", ""),
+        pyflow.Operation("replace", "/s/f/t1"),
+        pyflow.Operation("replace", "/s/f/t2"),
+    ]
+    assert str(diff.operations[1]) == "--replace=/s/f/t1 definition.def parent force"
+
+    diff = pyflow.diff_suites(b, a)
+    assert pyflow.Operation("delete", "/s/f/t2") in diff.operations
+
+
+def test_reordered():
+    with pyflow.Suite("s", host=pyflow.LocalHost()) as a:
+        with pyflow.Family("f"):
+            pyflow.Task("t0", script="echo 1")
+            pyflow.Task("t1", script="echo 1")
+    with pyflow.Suite("s", host=pyflow.LocalHost()) as b:
+        with pyflow.Family("f"):
+            pyflow.Task("t1", script="echo 1")
+            pyflow.Task("t0", script="echo 1")
+            pyflow.Task("t2")
+
+    diff = pyflow.diff_suites(a, b)
+    assert [str(c) for c in diff.changes] == ["reordered /s/f", "added /s/f/t2"]
+    assert diff.operations == [
+        pyflow.Operation("order", "/s/f/t1", "bottom"),
+        pyflow.Operation("order", "/s/f/t0", "bottom"),
+        pyflow.Operation("replace", "/s/f/t2"),
+    ]
+    assert str(diff.operations[0]) == "--order=/s/f/t1 bottom"
+
+    server = pyflow.FakeServer()
+    server.load(a.ecflow_definition())
+    diff.apply(server.client())
+    assert [n.path for n in server["/s/f"].nodes] == ["/s/f/t1", "/s/f/t0", "/s/f/t2"]
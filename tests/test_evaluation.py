@@ -0,0 +1,148 @@
+import pytest
+
+import pyflow
+from pyflow.evaluation import CompiledTriggers, StateTable, compile_expression
+
+BACKENDS = [
+    "python",
+    pytest.param(
+        "numpy",
+        marks=pytest.mark.skipif(pyflow.evaluation.numpy is None, reason="numpy"),
+    ),
+]
+
+
+def test_state_table():
+    with pyflow.Suite("s") as s:
+        with pyflow.Family("f"):
+            pyflow.Task("t1", events=["go"], meters=[("progress", 0, 100)])
+        with pyflow.Family("g"):
+            pyflow.RepeatDate("YMD", 20200227, 20200302)
+            pyflow.Task("t5", defstatus=pyflow.state.complete)
+    table = StateTable(s)
+
+    assert [n.fullname for n in table.nodes][:3] == ["/s", "/s/f", "/s/f/t1"]
+    assert table[s.f.t1] == "queued"
+    assert table[s.g.t5] == "complete"
+    assert table[s.f.t1.go] == 0
+    assert table[s.g.YMD] == 20200227
+
+    copy = table.copy()
+    copy[s.f.t1] = "aborted"
+    copy[s.f.t1.progress] = 30
+    assert table[s.f.t1] == "queued"
+    assert copy[s.f.t1] == "aborted"
+    assert copy[s.f.t1.progress] == 30
+
+    with pytest.raises(ValueError):
+        table[s.f.t1] = "finished"
+    with pytest.raises(KeyError):
+        table[pyflow.Task("orphan")]
+
+
+def test_compile_expression():
+    with pyflow.Suite("s") as s:
+        with pyflow.Family("f") as f:
+            t1 = pyflow.Task("t1", meters=[("progress", 0, 100)])
+            pyflow.Task("t2")
+            pyflow.Task("t3", triggers=(t1.progress >= 50) & f.t2.submitted)
+        with pyflow.Family("g"):
+            pyflow.RepeatDate("YMD", 20200227, 20200302)
+    table = StateTable(s)
+
+    holds = compile_expression(s.f.t3.triggers.value, table)
+    assert not holds(table)
+    table[s.f.t1.progress] = 50
+    table[s.f.t2] = "submitted"
+    assert holds(table)
+
+    julian = compile_expression(s.g.YMD.julian, table)
+    assert julian(table) == 2458907
+    table[s.g.YMD] = 20200301
+    assert julian(table) == 2458910
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_compiled_triggers(backend):
+    with pyflow.Suite("s") as s:
+        with pyflow.Family("f") as f:
+            t1 = pyflow.Task("t1")
+            t1.add_node(pyflow.Event("go"))
+            t1.add_node(pyflow.Meter("progress", 0, 100))
+            pyflow.Task("t2", triggers=t1.go | t1.aborted)
+            pyflow.Task("t3", triggers=(t1.progress >= 50) & f.t2.submitted)
+        with pyflow.Family("g", triggers=f.complete) as g:
+            pyflow.RepeatDate("YMD", 20200227, 20200302)
+            pyflow.Task("t4", triggers=g.YMD.julian % 7 == 2458910 % 7)
+            pyflow.Task("t5", defstatus=pyflow.state.complete)
+    table = StateTable(s)
+    triggers = CompiledTriggers(table, backend=backend)
+
+    def eligible():
+        return [n.fullname for n in triggers.eligible(table)]
+
+    assert eligible() == ["/s", "/s/f", "/s/f/t1"]
+
+    table[s.f.t1] = "aborted"
+    assert eligible() == ["/s", "/s/f", "/s/f/t2"]
+
+    table[s.f.t1] = "active"
+    table[s.f.t1.go] = "set"
+    table[s.f.t1.progress] = 60
+    assert eligible() == ["/s", "/s/f", "/s/f/t2"]
+    table[s.f.t2] = "submitted"
+    assert eligible() == ["/s", "/s/f", "/s/f/t3"]
+
+    # Triggers of families hold back their children
+    table[s.f] = "complete"
+    assert eligible() == ["/s", "/s/f/t3", "/s/g"]
+
+    table[s.g.YMD] = 20200301
+    assert "/s/g/t4" in eligible()
+    assert list(triggers.evaluate(table)) == [True] * len(table)
+
+
+def test_backends_agree():
+    pytest.importorskip("numpy")
+    with pyflow.Suite("s") as s:
+        with pyflow.Family("f") as f:
+            t1 = pyflow.Task("t1")
+            t1.add_node(pyflow.Event("go"))
+            t1.add_node(pyflow.Meter("progress", 0, 100))
+            pyflow.Task("t2", triggers=t1.go | t1.aborted)
+            pyflow.Task("t3", triggers=(t1.progress >= 50) & f.t2.submitted)
+        with pyflow.Family("g", triggers=f.complete) as g:
+            pyflow.RepeatDate("YMD", 20200227, 20200302)
+            pyflow.Task("t4", triggers=g.YMD.julian % 7 == 2458910 % 7)
+            pyflow.Task("t5", defstatus=pyflow.state.complete)
+    table = StateTable(s)
+    python = CompiledTriggers(table, backend="python")
+    vectorised = CompiledTriggers(table, backend="numpy")
+
+    for status in pyflow.evaluation.STATUSES:
+        for progress in (0, 50, 100):
+            table[s.f.t1] = status
+            table[s.f.t2] = status
+            table[s.f.t1.progress] = progress
+            assert python.evaluate(table) == list(vectorised.evaluate(table))
+            assert python.eligible(table) == vectorised.eligible(table)
+
+    with pytest.raises(ValueError):
+        CompiledTriggers(table, backend="fortran")
+
+
+def test_division_by_zero():
+    pytest.importorskip("numpy")
+    with pyflow.Suite("s") as s:
+        t1 = pyflow.Task("t1", meters=[("m", 0, 10)])
+        pyflow.Task("t2", triggers=(t1.m % t1.m) == 0)
+        pyflow.Task("t3", triggers=pyflow.expressions.Div(t1.m, t1.m) == 0)
+    table = StateTable(s)
+    python = CompiledTriggers(table, backend="python")
+    vectorised = CompiledTriggers(table, backend="numpy")
+
+    # ecFlow evaluates a division or a modulo by zero as 0
+    assert python.evaluate(table) == [True] * len(table)
+    assert list(vectorised.evaluate(table)) == [True] * len(table)
+    table[t1.m] = 5
+    assert python.evaluate(table) == list(vectorised.evaluate(table))
@@ -0,0 +1,84 @@
+import pytest
+
+import pyflow
+from pyflow.execution import JobCreationError, LocalExecutor, preprocess
+
+
+def test_preprocess():
+    includes = {
+        "head.h": ["%manual", "Not in the job", "%end", "echo %NAME% %%"],
+        "tail.h": ["%ecfmicro &", "echo &MISSING:fallback&"],
+    }
+    script = [
+        "%include <head.h>",
+        "echo %VALUE%",
+        "%nopp",
+        "echo %NOT_A_VARIABLE%",
+        "%end",
+        "%include <tail.h>",
+        "echo &VALUE&",
+    ]
+    variables = {"NAME": "%VALUE%-name", "VALUE": 42}
+
+    assert preprocess(script, variables, includes) == [
+        "echo 42-name %",
+        "echo 42",
+        "echo %NOT_A_VARIABLE%",
+        "echo fallback",
+        "echo 42",
+    ]
+
+    with pytest.raises(JobCreationError):
+        preprocess(["echo %MISSING%"], variables)
+    with pytest.raises(JobCreationError):
+        preprocess(["echo %NAME"], variables)
+    with pytest.raises(JobCreationError):
+        preprocess(["%include <missing.h>"], variables, includes)
+
+
+def test_local_executor(tmp_path):
+    output = tmp_path / "output.txt"
+    host = pyflow.LocalHost(ecflow_path="/non/existent")
+
+    with pyflow.Suite("s", host=host, ECF_HOME=str(tmp_path)) as s:
+        with pyflow.Family("f", OUTPUT=str(output)) as f:
+            t1 = pyflow.Task(
+                "t1",
+                script=[
+                    "ecflow_client --event=go",
+                    "ecflow_client --meter=progress 50",
+                    "ecflow_client --label=info 'half way'",
+                ],
+            )
+            t1.add_node(pyflow.Event("go"))
+            t1.add_node(pyflow.Meter("progress", 0, 100))
+            pyflow.Task("t2", script="echo t2 >> $OUTPUT", triggers=t1.go)
+            pyflow.Task("t3", script="exit 3", triggers=t1.progress >= 50)
+            pyflow.Task("t4", script="ecflow_client --event=undefined")
+        pyflow.Task("t5", script="true", triggers=f.t3.aborted)
+        pyflow.Task("t6", script="true", triggers=f)
+        with pyflow.Family("r", OUTPUT=str(output)):
+            pyflow.RepeatInteger("N", 1, 3)
+            pyflow.Task("t7", script="echo $N >> $OUTPUT")
+
+    report = LocalExecutor(s, processes=2, directory=str(tmp_path / "jobs")).run()
+
+    assert sorted(report.aborted) == ["/s/f/t3", "/s/f/t4"]
+    assert report.aborted["/s/f/t3"] == "exit code 3"
+    assert report.labels == {"/s/f/t1": {"info": "half way"}}
+    assert report.not_run == ["/s/t6"]
+    assert "/s/t5" in report.tasks
+    assert sorted(output.read_text().split()) == ["1", "2", "3", "t2"]
+    assert (tmp_path / "jobs" / "s" / "f" / "t1.job1").exists()
+    # Undefined events fail the call to ecflow_client
+    assert report.aborted["/s/f/t4"] == "exit code 1"
+
+
+def test_local_executor_until(tmp_path):
+    with pyflow.Suite("s", host=pyflow.LocalHost(ecflow_path="/non/existent")) as s:
+        pyflow.Task("t", script="sleep 60")
+
+    report = LocalExecutor(s, directory=str(tmp_path), until=0.5).run()
+
+    assert report.aborted == {"/s/t": "killed after 0.5s"}
+    assert report.makespan < 10
@@ -91,6 +91,123 @@ def test_sequence():
     )
 
 
+def test_shared_subexpressions():
+    """
+    Structurally identical expressions are shared, and simplifying them must not modify
+    any other expression that refers to them.
+    """
+
+    with pyflow.Suite("s"):
+        with pyflow.Family("f"):
+            t1 = pyflow.Task("t1")
+            t2 = pyflow.Task("t2")
+            t3 = pyflow.Task("t3", triggers=t1 & t2)
+            t4 = pyflow.Task("t4", triggers=t1 & t2)
+            t5 = pyflow.Task("t5", triggers=t1.complete | (1 < 2))
+
+    assert t1.complete is t1.complete
+    assert t3.triggers.value is t4.triggers.value
+    assert t1.complete is not t2.complete
+    assert t5.triggers.value._operands[0] is t1.complete
+
+    assert t3.triggers.value.simplify() is t3.triggers.value
+    assert repr(t5.triggers.value.simplify()) == "True"
+    assert str(t5.triggers.value) == "((/s/f/t1 eq complete) or True)"
+
+    assert "t1 eq complete and t2 eq complete" == t3.triggers.value.generate_expression(
+        t3
+    )
+
+
+def test_simplify_and_or():
+    """
+    And/Or chains are flattened, deduplicated and absorbed by the simplifier.
+    """
+
+    with pyflow.Suite("s"):
+        with pyflow.Family("f"):
+            tasks = [pyflow.Task("t{}".format(i)) for i in range(5)]
+            t0, t1, t2, t3, t4 = tasks
+
+    assert "t0 eq complete and t1 eq complete and t2 eq complete" == (
+        (t0 & t1) & (t2 & t0)
+    ).simplify().generate_expression(t3)
+
+    assert "((/s/f/t0 eq complete) or (/s/f/t2 eq complete))" == repr(
+        (t0 | (t0 & t1) | t2 | (t2 & t1)).simplify()
+    )
+    assert t0.complete is (t0 & (t0 | t1)).simplify()
+    assert "True" == repr((t0 | ((t1 & t2) | True)).simplify())
+    assert "False" == repr((t0 & (t1 | t2) & False).simplify())
+    assert "(t0 eq complete or t1 eq complete) and t2 eq complete" == (
+        (t0 | t1) & t2
+    ).simplify().generate_expression(t3)
+
+
+def test_deep_trigger_chain():
+    """
+    Left-deep chains of thousands of terms must not hit the recursion limit.
+    """
+
+    with pyflow.Suite("s") as s:
+        tasks = [pyflow.Task("t{}".format(i)) for i in range(5000)]
+        last = pyflow.Task("last")
+
+    last.triggers = reduce(and_, tasks + tasks[:10])
+    expected = " and ".join("t{} eq complete".format(i) for i in range(5000))
+    assert expected == last.triggers.value.simplify().generate_expression(last)
+    assert pyflow.all_complete(tasks).simplify() is last.triggers.value.simplify()
+
+    s.generate_node()
+
+
+def test_expression_from_string():
+    with pyflow.Suite("s") as s:
+        with pyflow.Family("f"):
+            pyflow.RepeatDate("YMD", 20240101, 20240131)
+            t1 = pyflow.Task("t1")
+            t1.add_node(pyflow.Event("ev"))
+            t1.add_node(pyflow.Meter("progress", 0, 100))
+            t2 = pyflow.Task("t2")
+        with pyflow.Family("g"):
+            t3 = pyflow.Task("t3")
+
+    parser = pyflow.ExpressionParser()
+
+    assert parser.parse("t1 == complete", t2) is t1.complete
+    assert parser.parse("../f/t1 eq complete", t2) is t1.complete
+    assert parser.parse("/s/f/t1:ev", t3) is pyflow.expressions.NodeName(t1.ev)
+
+    e = parser.parse("(../f/t1 == complete and /s/f/t1:ev) or ../f:YMD ge 20240115", t3)
+    assert repr(e) == (
+        "(((/s/f/t1 eq complete) and /s/f/t1:ev) or (/s/f:YMD ge 20240115))"
+    )
+
+    e = parser.parse(
+        "!(t1:progress + 10 > 50 || t2 != aborted) && "
+        "cal::date_to_julian(.:YMD) % 7 == 3",
+        t2,
+    )
+    assert e.generate_expression(t2) == (
+        "not (t1:progress + 10 gt 50 or t2 ne aborted)"
+        " and cal::date_to_julian(../f:YMD) % 7 eq 3"
+    )
+    assert parser.parse(e.generate_expression(t2), t2) is e
+    assert parser.parse("t1:ev == set", t2) is (t1.ev == "set")
+
+    for text in ["t1 ==", "t1 == complete)", "t4 == complete", "t1:missing", "t1 $ t2"]:
+        with pytest.raises(pyflow.ExpressionSyntaxError):
+            parser.parse(text, t2)
+    with pytest.raises(pyflow.ExpressionSyntaxError):
+        parser.parse("/other/t == complete", t2)
+
+    e = pyflow.expression_from_string(
+        "/other/t == complete and /other/t:ev", t2, externs=True
+    )
+    assert e.generate_expression(t2) == "/other/t eq complete and /other/t:ev"
+    s.check_definition()
+
+
 if __name__ == "__main__":
     from os import path
 
@@ -0,0 +1,142 @@
+import pytest
+
+import pyflow
+
+
+def test_replace_on_server():
+    with pyflow.Suite("s", host=pyflow.LocalHost()) as s:
+        with pyflow.Family("f", labels={"info": "none"}):
+            pyflow.Task("t", events=["done"])
+            pyflow.Task("u", meters=[("step", 0, 10)])
+    server = pyflow.FakeServer()
+    with server.patch():
+        s.replace_on_server("localhost:3141")
+        with s.f:
+            pyflow.Task("v")
+        s.f.replace_on_server("localhost", 3141)
+
+    assert [c[:2] for c in server.calls] == [("replace", "/s"), ("replace", "/s/f")]
+    assert len(server.definitions) == 2
+    assert [n.path for n in server["/s"].get_all_nodes()] == [
+        "/s/f",
+        "/s/f/t",
+        "/s/f/u",
+        "/s/f/v",
+    ]
+    assert server["/s/f"].attribute("label", "info").value() == "none"
+
+
+def test_state_transitions():
+    with pyflow.Suite("s", host=pyflow.LocalHost()) as s:
+        with pyflow.Family("f", labels={"info": "none"}):
+            pyflow.Task("t", events=["done"])
+            pyflow.Task("u", meters=[("step", 0, 10)])
+    server = pyflow.FakeServer()
+    client = server.client()
+    client.load(s.ecflow_definition())
+
+    server.set_state("/s/f/t", "complete")
+    assert server["/s/f"].state == "queued"
+    server.set_state("/s/f/u", "aborted")
+    assert server["/s"].state == "aborted"
+    server.set_attribute("/s/f/u", "meter", "step", 5)
+
+    client.requeue("/s/f/u")
+    assert server["/s/f/u"].attribute("meter", "step").value() == 0
+    client.suspend(["/s/f/t", "/s/f/u"])
+    assert server["/s/f/u"].get_dstate() == "suspended"
+    server.set_state("/s/f/u", "complete")
+    assert server["/s"].state == "complete"
+
+    with pytest.raises(RuntimeError):
+        client.resume("/s/f/missing")
+
+
+def test_failures_and_monitoring():
+    with pyflow.Suite("s", host=pyflow.LocalHost()) as s:
+        with pyflow.Family("f", labels={"info": "none"}):
+            pyflow.Task("t", events=["done"])
+            pyflow.Task("u", meters=[("step", 0, 10)])
+    server = pyflow.FakeServer()
+    server.client().load(s.ecflow_definition())
+
+    server.fail("alter", times=2)
+    with server.patch():
+        session = pyflow.ClientSession("localhost", retries=2, retry_delay=0)
+        session.alter([s.f], "change", "label", "info", "running")
+        session.flush()
+        monitor = pyflow.StateMonitor(s, "localhost")
+        monitor.sync()
+
+    assert session.stats.retries == 2
+    assert monitor[s.f.info] == "running"
+
+    server.set_state("/s/f/t", "active")
+    server.set_attribute("/s/f/t", "event", "done", True)
+    assert sorted(str(c) for c in monitor.sync()) == [
+        "/s queued -> active",
+        "/s/f queued -> active",
+        "/s/f/t queued -> active",
+        "/s/f/t:event done 0.0 -> 1.0",
+    ]
+
+
+def test_changed_node_paths():
+    with pyflow.Suite("s", host=pyflow.LocalHost()) as s:
+        with pyflow.Family("f"):
+            pyflow.Task("t")
+            pyflow.Task("u")
+    server = pyflow.FakeServer()
+    first, second = server.client(), server.client()
+    first.load(s.ecflow_definition())
+    first.sync_local()
+    second.sync_local()
+    assert first.changed_node_paths == []
+
+    server.set_state("/s/f/t", "complete")
+    first.sync_local()
+    assert first.changed_node_paths == ["/s/f/t"]
+    server.set_state("/s/f/u", "active")
+    first.sync_local()
+    assert first.changed_node_paths == ["/s/f/u", "/s/f", "/s"]
+
+    # Each client is told of the changes since its own last synchronisation
+    second.sync_local()
+    assert second.changed_node_paths == ["/s/f/t", "/s/f/u", "/s/f", "/s"]
+    second.sync_local()
+    assert second.changed_node_paths == []
+
+
+def test_delete_and_replace():
+    with pyflow.Suite("s", host=pyflow.LocalHost()) as s:
+        with pyflow.Family("f"):
+            pyflow.Task("t")
+            pyflow.Task("u")
+    server = pyflow.FakeServer()
+    client = server.client()
+    client.load(s.ecflow_definition())
+
+    # The statuses of the ancestors follow the remaining children
+    server.set_state("/s/f/t", "aborted")
+    assert server["/s"].state == "aborted"
+    client.delete("/s/f/t")
+    assert server["/s/f"].state == "queued"
+    assert server["/s"].state == "queued"
+
+    # Only the missing path down to the replaced node is created
+    with s:
+        with pyflow.Family("g"):
+            with pyflow.Family("h"):
+                pyflow.Task("a")
+                pyflow.Task("b")
+            pyflow.Task("c")
+    with pytest.raises(RuntimeError):
+        client.replace("/s/g/h/a", s.ecflow_definition(), parent=False)
+    client.replace("/s/g/h/a", s.ecflow_definition())
+    assert [n.path for n in server["/s"].get_all_nodes()] == [
+        "/s/f",
+        "/s/f/u",
+        "/s/g",
+        "/s/g/h",
+        "/s/g/h/a",
+    ]
@@ -0,0 +1,58 @@
+import pyflow
+
+
+def inlimits(node):
+    return [str(a.limit.name) for a in node.children if isinstance(a, pyflow.InLimit)]
+
+
+def test_hoist_attributes():
+    host = pyflow.LocalHost("h", limit=5)
+    with pyflow.Suite("s", host=host, VALUE="a") as s:
+        host.build_limits()
+        with pyflow.Family("f1", host=host) as f1:
+            t1 = pyflow.Task("t1", host=host, SHARED=1, OWN=1, VALUE="a")
+            t2 = pyflow.Task("t2", host=host, SHARED=1, OWN=2)
+        with pyflow.Family("f2", host=host) as f2:
+            pyflow.RepeatDate("YMD", 20240101, 20240131)
+            t3 = pyflow.Task("t3", host=host, SHARED=1, YMD_YYYY=2024)
+            t4 = pyflow.Task("t4", host=host, SHARED=1, YMD_YYYY=2024)
+            t4.triggers = t3.SHARED == 1
+        with pyflow.Family("f3", host=host) as f3:
+            for name in ("t5", "t6"):
+                with pyflow.Task(name, host=host, YMD_YYYY=2024):
+                    pyflow.RepeatDate("YMD", 20240101, 20240131)
+
+    job_cmd = str(s.ECF_JOB_CMD.value)
+    removed = pyflow.hoist_attributes(s)
+
+    # Shared by all the tasks, and then by all the families
+    assert str(s.ECF_JOB_CMD.value) == job_cmd
+    for node in (f1, f2, f3, t1, t2, t3, t4):
+        assert "ECF_JOB_CMD" not in node
+        assert "ECF_OUT" not in node
+    assert inlimits(s) == ["h"]
+    assert not any(inlimits(n) for n in (f1, f2, t1, t2, t3, t4))
+    assert f1.SHARED.value == 1 and "SHARED" not in s
+    assert t1 in removed and t4 in removed
+
+    # Redundant
+    assert "VALUE" not in t1
+
+    # Different values, and variables used by triggers or overriding those of repeats
+    assert t1.OWN.value == 1 and t2.OWN.value == 2
+    assert "SHARED" in t3
+    assert f2.YMD_YYYY.value == 2024 and "YMD_YYYY" not in t3
+    assert f3.t5.YMD_YYYY.value == 2024 and "YMD_YYYY" not in f3
+
+
+def test_hoist_attributes_unchanged():
+    with pyflow.Suite("s") as s:
+        with pyflow.Family("f1", VALUE=1):
+            t1 = pyflow.Task("t1", VALUE=2)
+        with pyflow.Family("f2"):
+            pyflow.Task("t2", VALUE=2)
+            pyflow.Task("t3")
+
+    assert pyflow.hoist_attributes(s) == {}
+    assert t1.VALUE.value == 2
+    assert "VALUE" not in s
@@ -0,0 +1,178 @@
+import io
+import json
+import os
+
+import pytest
+
+import pyflow
+
+DEFINITION = """#5.11.4
+extern /other/t:ev
+suite s # begun
+  defstatus suspended
+  edit ECF_HOME '/tmp/home'
+  edit SPACES 'a value with spaces'
+  limit l 2
+  family f
+    repeat date YMD 20240101 20240131 1
+    inlimit /s:l
+    task t1
+      label info "some \\"quoted\\" text" # "new value"
+      event 1 go
+      event done
+      meter progress 0 100 90 # 30
+    task t2
+      trigger t1 == complete or t1:go
+      trigger -a /s/g/t3:N ge 2
+      time 10:00
+      cron -w 0,5L -m 1,2 23:00
+    endtask
+  endfamily
+  family g
+    repeat string S "a" "b c"
+    clock real
+    task t3
+      repeat integer N 1 5 2
+      complete ../f/t2 == complete and /other/t:ev
+      date 1.*.*
+      day monday
+      late -s +00:15 -c +02:00
+      autocancel 3
+  endfamily
+endsuite
+"""
+
+
+def test_load_definition():
+    loader = pyflow.DefinitionLoader(host=pyflow.LocalHost(ecflow_path="/usr/bin"))
+    suites = loader.load(io.StringIO(DEFINITION))
+
+    assert [s.name for s in suites] == ["s"]
+    s = suites[0]
+    assert [n.fullname for n in s.all_tasks] == ["/s/f/t1", "/s/f/t2", "/s/g/t3"]
+    assert s.ECF_HOME.value == "/tmp/home"
+    assert s.SPACES.value == "a value with spaces"
+    assert s.l.value == 2
+    assert s.f.t1.info.value == 'some "quoted" text'
+    assert s.f.t1.go.name == "go"
+    assert s.f.t1.progress._threshold == 90
+    assert s.g.S.values == ["a", "b c"]
+    assert s.g.t3.N._end == 5
+    assert s.f._nodes["_/s:l"].limit is s.l
+
+    t2 = s.f.t2
+    assert t2.triggers.value.generate_expression(t2) == (
+        "(t1 eq complete or t1:go) and ../g/t3:N ge 2"
+    )
+    t3 = s.g.t3
+    assert t3._nodes["_complete"].value.generate_expression(t3) == (
+        "../f/t2 eq complete and /other/t:ev"
+    )
+    assert loader.lines == DEFINITION.count("\n")
+    assert loader.skipped == {"extern": 1, "clock": 1, "event number": 1}
+
+
+def test_load_definition_dropped_options():
+    host = pyflow.LocalHost(ecflow_path="/usr/bin")
+    for line, skipped in [
+        ("inlimit l", {}),
+        ("inlimit l 1", {}),
+        ("inlimit l 2", {"inlimit tokens": 1}),
+        ("inlimit -n l", {"inlimit -n": 1}),
+        ("inlimit -n l 2", {"inlimit -n": 1, "inlimit tokens": 1}),
+        ("inlimit -s /s:l", {"inlimit -s": 1}),
+        ("event 3", {}),
+        ("event done", {}),
+        ("event 1 done", {"event number": 1}),
+        ("event 1 set", {}),
+    ]:
+        loader = pyflow.DefinitionLoader(host=host)
+        text = "suite s\n  limit l 2\n  task t\n    {}\nendsuite\n".format(line)
+        (s,) = loader.load(io.StringIO(text))
+        assert loader.skipped == skipped, line
+    assert s.t._nodes["1"].name == "1"
+
+
+def test_load_definition_errors(tmp_path):
+    host = pyflow.LocalHost(ecflow_path="/usr/bin")
+    for text in [
+        "task t\n",
+        "suite s\n  family f\n    task t\n      meter m zero 10\nendsuite\n",
+        "suite s\n  family f\nendsuite\n",
+        "suite s\n  repeat weekly W 1 2\nendsuite\n",
+        "suite s\n  task t\n",
+    ]:
+        with pytest.raises(pyflow.DefinitionError):
+            pyflow.load_definition(io.StringIO(text), host=host)
+
+    path = tmp_path / "s.def"
+    path.write_text("suite s\n  task t\n    trigger /other/t == complete\nendsuite\n")
+    with pytest.raises(pyflow.ExpressionSyntaxError):
+        pyflow.load_definition(str(path), host=host, externs=False)
+    (s,) = pyflow.load_definition(str(path), host=host)
+    assert s.t.triggers.value.generate_expression(s.t) == "/other/t eq complete"
+
+
+class _Trickle(io.StringIO):
+    # Returns a few characters at a time, so that values span several reads
+    def read(self, size=-1):
+        return super().read(3)
+
+
+def _tree(node):
+    return sorted(
+        (k, type(v).__name__, _tree(v) if isinstance(v, pyflow.nodes.Node) else None)
+        for k, v in node._nodes.items()
+    )
+
+
+def test_load_json():
+    host = pyflow.LocalHost(ecflow_path="/usr/bin")
+    with open(os.path.join(os.path.dirname(__file__), "test8.json")) as f:
+        text = f.read()
+
+    expected = pyflow.Suite("s", host=host, json=json.loads(text))
+    s = pyflow.load_json(pyflow.Suite("s", host=host), _Trickle(text))
+
+    assert _tree(s) == _tree(expected)
+    assert s.f1.t8.inlimits is not None
+    assert s.FOO.value == 42
+
+    for text in ['{"f": {"t": 1}', '{"f": {"t": {}} 1', '{"f" {}}', '{"F": 1, }']:
+        with pytest.raises(ValueError):
+            pyflow.load_json(pyflow.Suite("s", host=host), io.StringIO(text))
+
+
+def test_load_json_lines():
+    lines = [
+        '{"path": "/s", "FOO": 1}',
+        '{"path": "/s/f/t1", "defstatus": "complete"}',
+        '{"path": "/s/f/t2", "triggers": {"complete": "t1"}, "BAR": "x"}',
+        '{"path": "/s/f", "limits": {"l": 2}}',
+        '{"path": "/s/f/g", "type": "family"}',
+        '{"path": "/s/h", "t3": {}, "t4": {}}',
+        "",
+        '{"path": "/r/t"}',
+    ]
+    s, r = pyflow.load_json_lines(lines, host=pyflow.LocalHost(ecflow_path="/usr/bin"))
+
+    assert [n.fullname for n in s.all_tasks] == [
+        "/s/f/t1",
+        "/s/f/t2",
+        "/s/h/t3",
+        "/s/h/t4",
+    ]
+    assert isinstance(s.f.g, pyflow.Family)
+    assert s.FOO.value == 1 and s.f.t2.BAR.value == "x"
+    assert s.f.l.value == 2
+    assert [n.fullname for n in r.all_tasks] == ["/r/t"]
+
+    for bad in [
+        ['{"path": "/s/t"}', '{"path": "/s/t/u"}'],
+        ['{"path": "/s/t", "type": "task", "u": {}}'],
+        ['{"path": "/s/f", "type": "family"}', '{"path": "/s/f", "type": "task"}'],
+        ['{"path": "/s", "type": "job"}'],
+        ["{"],
+    ]:
+        with pytest.raises(pyflow.DefinitionError):
+            pyflow.load_json_lines(bad, host=pyflow.LocalHost(ecflow_path="/usr/bin"))
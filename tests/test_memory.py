@@ -0,0 +1,38 @@
+import pytest
+
+import pyflow
+from pyflow.memory import parse_size
+
+
+def test_memory_report():
+    with pyflow.Suite("s", host=pyflow.LocalHost()) as s:
+        with pyflow.Family("f1"):
+            t1 = pyflow.Task("t1", script=["echo 1"] * 100, VALUE="x" * 10000)
+        with pyflow.Family("f2"):
+            t2 = pyflow.Task("t2", script="echo 2")
+            t2.triggers = t1.complete & t1.complete
+
+    report = pyflow.MemoryReport(s)
+    assert report.counts["Task"] == 2
+    assert report.categories["Variable"] > 10000
+    assert report.categories["scripts"] > 0
+    assert report.categories["expressions"] > 0
+    assert report.total == sum(report.categories.values())
+
+    subtrees = report.subtrees()
+    assert subtrees["/s"] == report.total
+    assert subtrees["/s/f1"] > 10000 > subtrees["/s/f2"]
+    assert report.top(1, depth=2) == [("/s/f1", subtrees["/s/f1"])]
+
+    report.check(report.total)
+    with pytest.raises(pyflow.MemoryBudgetError):
+        report.check("1 KiB")
+
+
+def test_parse_size():
+    assert parse_size(100) == 100
+    assert parse_size("512MiB") == 512 * 2**20
+    assert parse_size("1.5 GB") == 3 * 2**29
+    assert parse_size("2k") == 2048
+    with pytest.raises(ValueError):
+        parse_size("lots")
@@ -0,0 +1,44 @@
+import pyflow
+
+
+def test_suite_metrics():
+    extern = pyflow.ExternTask("/other/f/t")
+    with pyflow.Suite("s", host=pyflow.LocalHost(), VALUE="x") as s:
+        with pyflow.Family("f1", VALUE="x"):
+            t1 = pyflow.Task("t1", VALUE="y")
+            t2 = pyflow.Task("t2", VALUE="y")
+            t2.triggers = t1.complete
+        with pyflow.Family("f2"):
+            t3 = pyflow.Task("t3", events=["ready"])
+            t3.triggers = (t2.complete & extern.complete) | t1.complete
+            t3.completes = t3.ready
+        pyflow.Family("f3")
+
+    metrics = pyflow.SuiteMetrics(s)
+    assert metrics.counts["Suite"] == 1
+    assert metrics.counts["Family"] == 3
+    assert metrics.counts["Task"] == 3
+    assert metrics.counts["Trigger"] == 2
+    assert metrics.depths == {1: 1, 2: 3, 3: 3}
+    assert metrics.fanouts == {0: 1, 1: 1, 2: 1, 3: 1}
+
+    trigger = metrics.expressions["trigger"]
+    assert trigger["count"] == 2
+    assert trigger["references"] == 4
+    assert trigger["longest"] == len(
+        str(t3.triggers.value.simplify().generate_expression(t3))
+    )
+    assert metrics.expressions["complete"]["count"] == 1
+    assert metrics.references == {"local": 2, "cross-family": 2, "extern": 1}
+
+    assert metrics.variables["VALUE"] == 4
+    assert metrics.duplicates == {"VALUE": 4}
+    assert metrics.redundant == 1
+
+    subtrees = metrics.subtrees()
+    assert subtrees["/s"] == metrics.total
+    assert subtrees["/s/f2"] > subtrees["/s/f2/t3"] > 0
+    assert [p for p, _ in metrics.top(1)] == ["/s/f2/t3"]
+    assert [p for p, _ in metrics.top(2, by="references")] == ["/s/f2/t3", "/s/f1/t2"]
+    assert "/s/f2/t3" in str(metrics)
+    assert metrics.summary()["top"]["references"]["/s/f2/t3"] == 4
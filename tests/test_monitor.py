@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+
+import pyflow
+
+
+class Attribute:
+    def __init__(self, name, value):
+        self._name = name
+        self._value = value
+
+    def name(self):
+        return self._name
+
+    def value(self):
+        return self._value
+
+    def new_value(self):
+        return self._value
+
+
+class Repeat(Attribute):
+    def empty(self):
+        return self._value is None
+
+
+class ServerNode:
+    def __init__(self, path, events=(), meters=(), labels=(), repeat=None):
+        self.path = path
+        self.state = "queued"
+        self.events = [Attribute(n, False) for n in events]
+        self.meters = [Attribute(n, 0) for n in meters]
+        self.labels = [Attribute(n, "") for n in labels]
+        self.repeat = Repeat("YMD", repeat)
+        self.nodes = []
+
+    def get_abs_node_path(self):
+        return self.path
+
+    def get_dstate(self):
+        return self.state
+
+    def get_repeat(self):
+        return self.repeat
+
+    def get_all_nodes(self):
+        nodes = []
+        for n in self.nodes:
+            nodes += [n] + n.get_all_nodes()
+        return nodes
+
+
+class SyncingClient:
+    def __init__(self, nodes):
+        self.nodes = dict((n.path, n) for n in nodes)
+        self.changed_node_paths = []
+        self.changes = []
+        self.syncs = 0
+
+    def sync_local(self):
+        self.syncs += 1
+        self.changed_node_paths, self.changes = self.changes, []
+
+    def get_defs(self):
+        return self
+
+    def find_abs_node(self, path):
+        return self.nodes.get(path)
+
+
+def test_sync():
+    with pyflow.Suite("s", host=pyflow.LocalHost()) as s:
+        with pyflow.Family("f", labels={"info": ""}):
+            pyflow.Task("t", events=["done"], meters=[("step", 0, 10)])
+            with pyflow.Task("u"):
+                pyflow.RepeatDate("YMD", 20240101, 20240110)
+
+    suite = ServerNode("/s")
+    f = ServerNode("/s/f", labels=["info"])
+    t = ServerNode("/s/f/t", events=["done"], meters=["step"])
+    u = ServerNode("/s/f/u", repeat=20240101)
+    suite.nodes, f.nodes = [f], [t, u]
+    client = SyncingClient([suite, f, t, u])
+    monitor = pyflow.StateMonitor(s, "localhost", client=client)
+    assert monitor.sync() == []
+
+    client.nodes["/s/f/t"].state = "active"
+    client.nodes["/s/f/t"].meters[0]._value = 5
+    client.nodes["/s/f"].labels[0]._value = "running"
+    client.nodes["/s/f/u"].repeat._value = 20240102
+    # Changes not reported by the server are not read
+    client.nodes["/s"].state = "active"
+    client.changes = ["/s/f/t", "/s/f", "/s/f/u"]
+
+    changes = monitor.sync()
+    assert sorted(str(c) for c in changes) == [
+        "/s/f/t queued -> active",
+        "/s/f/t:meter step 0.0 -> 5.0",
+        "/s/f/u:repeat YMD 20240101.0 -> 20240102.0",
+        "/s/f:label info  -> running",
+    ]
+    assert monitor["/s/f/t"] == "active"
+    assert monitor[s.f.t.step] == 5
+    assert monitor[s.f.info] == "running"
+    assert monitor["/s"] == "queued"
+
+
+def test_run():
+    with pyflow.Suite("s", host=pyflow.LocalHost()) as s:
+        pyflow.Task("t", events=["done"])
+    suite = ServerNode("/s")
+    suite.nodes = [ServerNode("/s/t", events=["done"])]
+    client = SyncingClient([suite] + suite.nodes)
+    monitor = pyflow.StateMonitor(s, "localhost", interval=0.01, client=client)
+    seen = []
+
+    async def notify(changes):
+        seen.extend(changes)
+        monitor.stop()
+
+    async def main():
+        monitor.subscribe(notify)
+        task = asyncio.ensure_future(monitor.run())
+        await asyncio.sleep(0.05)
+        client.nodes["/s/t"].events[0]._value = True
+        client.changes = ["/s/t"]
+        await asyncio.wait_for(task, 5)
+
+    asyncio.run(main())
+    assert seen == [pyflow.StateChange("/s/t", "event done", 0.0, 1.0)]
+    assert monitor.polls == client.syncs
+
+
+def test_stop_and_coroutine_subscribers():
+    s = pyflow.Suite("s", host=pyflow.LocalHost())
+    client = SyncingClient([ServerNode("/s")])
+    monitor = pyflow.StateMonitor(s, "localhost", interval=10, client=client)
+
+    # Stopping before running is kept
+    monitor.stop()
+    asyncio.run(asyncio.wait_for(monitor.run(), 1))
+    assert client.syncs == 0
+
+    seen = []
+
+    async def notify(changes):
+        seen.extend(changes)
+
+    monitor.subscribe(seen.extend)
+    monitor.subscribe(notify)
+    client.nodes["/s"].state = "active"
+    client.changes = ["/s"]
+    # Rejected before polling, so that the changes are not lost
+    with pytest.raises(RuntimeError):
+        monitor.sync()
+    assert client.syncs == 0
+    asyncio.run(monitor.poll())
+    assert seen == [pyflow.StateChange("/s", None, "queued", "active")] * 2
@@ -0,0 +1,48 @@
+import json
+import os
+
+import pytest
+
+import pyflow
+
+
+def test_profiler(tmpdir):
+    init = pyflow.Task.__init__
+    with pyflow.Profiler() as profiler:
+        assert pyflow.Task.__init__ is not init
+        with pyflow.Suite("s", host=pyflow.LocalHost(), files=str(tmpdir)) as s:
+            with pyflow.Family("f"):
+                t1 = pyflow.Task("t1", script="echo 1", labels={"info": "text"})
+                t2 = pyflow.Task("t2", script="echo 2")
+                t2.triggers = t1.complete
+        s.ecflow_definition()
+        s.deploy_suite()
+
+        with pytest.raises(RuntimeError):
+            with pyflow.Profiler():
+                pass
+
+    assert pyflow.Task.__init__ is init
+
+    functions = profiler.functions()
+    assert functions["Task.generate_script"][0] == 2
+    assert functions["_Trigger._build"][0] == 1
+    assert "FileSystem.save" in functions
+    calls, own, total = functions["Node.generate_node"]
+    assert total >= own
+
+    subtrees = profiler.subtrees()
+    assert subtrees["/s"] >= subtrees["/s/f"] >= subtrees["/s/f/t1"] > 0
+    assert set(profiler.subtrees(depth=1)) == {"/s"}
+    # The label of the task, and the exec_host label of the host
+    assert profiler.classes()["Label"][0] == 2
+
+    profiler.save_folded(str(tmpdir.join("profile.folded")))
+    with open(str(tmpdir.join("profile.folded"))) as f:
+        stacks = [line.rsplit(" ", 1)[0] for line in f]
+    assert "Suite.__init__;Node.__init__" in stacks
+
+    profiler.save_json(str(tmpdir.join("profile.json")))
+    with open(str(tmpdir.join("profile.json"))) as f:
+        assert json.load(f)["functions"]["Task.generate_script"]["calls"] == 2
+    assert os.path.exists(str(tmpdir.join("t1.ecf")))
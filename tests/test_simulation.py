@@ -0,0 +1,88 @@
+import datetime
+import random
+
+import pytest
+
+from pyflow import Event, Family, Limit, Suite, Task, state
+from pyflow.expressions import Div
+from pyflow.simulation import Simulator, duration_model
+
+START = datetime.datetime(2020, 1, 1)
+
+
+def test_simulate_limits():
+    with Suite("s") as s:
+        limit = Limit("l", 2)
+        with Family("f", inlimits=limit):
+            for i in range(5):
+                Task("t%d" % i)
+        Task("t5", triggers=s.f)
+
+    report = Simulator(s, durations={"/s/f/t0": 100}, default=60, start=START).run()
+
+    assert report.makespan == 240
+    assert report.tasks["/s/f/t0"] == (0, 0, 100)
+    assert report.tasks["/s/f/t2"] == (0, 60, 120)
+    assert report.tasks["/s/f/t4"] == (0, 120, 180)
+    assert report.tasks["/s/t5"] == (180, 180, 240)
+    assert report.not_run == []
+
+    limits = report.limits["/s:l"]
+    assert limits["capacity"] == 2
+    assert limits["peak"] == 2
+    assert limits["waits"] == 3
+    assert limits["total_wait"] == 60 + 100 + 120
+    assert limits["max_wait"] == 120
+
+
+def test_simulate_dependencies():
+    with Suite("s") as s:
+        with Family("f", YMD=(20200101, 20200103)):
+            t1 = Task("t1")
+            t1.add_node(Event("go"))
+            Task("t2", triggers=t1.go)
+        with Family("g", defstatus=state.complete):
+            Task("t3")
+        Task("t4", time="10:00", triggers=s.g)
+        Task("t5", triggers=s.f.YMD == 20200103, completes=s.t4)
+        Task("t6", defstatus=state.suspended)
+        Task("t7", triggers=s.t6)
+        Task("t8", date="2.1.2020")
+
+    report = Simulator(s, durations=10, start=START).run()
+
+    assert report.tasks["/s/f/t2"] == (50, 50, 60)
+    assert report.tasks["/s/t4"] == (36000, 36000, 36010)
+    assert report.tasks["/s/t5"] == (40, 40, 50)
+    assert report.tasks["/s/t8"] == (86400, 86400, 86410)
+    assert "/s/g/t3" not in report.tasks
+    assert report.not_run == ["/s/t6", "/s/t7"]
+    assert report.makespan == 86410
+    assert "Tasks run: 5, tasks not run: 2" in str(report)
+
+
+def test_duration_model():
+    with Suite("s"):
+        t1 = Task("t1")
+        t2 = Task("t2")
+
+    model = duration_model({"/s/t1": [1, 2, 3]})
+    assert model(t1, random.Random(0)) in (1, 2, 3)
+    with pytest.raises(KeyError):
+        model(t2, None)
+
+    assert duration_model(5)(t2, None) == 5
+    assert duration_model({}, default=7)(t2, None) == 7
+
+
+def test_simulate_division_by_zero():
+    with Suite("s") as s:
+        t1 = Task("t1", meters=[("m", 0, 10)])
+        Task("t2", triggers=(t1.m % t1.m) == 0)
+        Task("t3", triggers=Div(t1.m, t1.m) == 0)
+
+    report = Simulator(s, durations=10, start=START).run()
+
+    # ecFlow evaluates a division or a modulo by zero as 0
+    assert report.tasks["/s/t2"] == (0, 0, 10)
+    assert report.tasks["/s/t3"] == (0, 0, 10)
@@ -0,0 +1,61 @@
+import io
+
+import pytest
+
+import pyflow
+
+
+def test_snapshot_round_trip(tmpdir):
+    with pyflow.Suite("s", host=pyflow.LocalHost(ecflow_path="/usr/bin")) as s:
+        limit = pyflow.Limit("l", 2)
+        with pyflow.Family("f") as f:
+            pyflow.RepeatDate("YMD", 20200101, 20200131)
+            t1 = pyflow.Task("t1", script="echo hi", labels={"info": "text"})
+            t1.add_node(pyflow.Event("go"))
+            pyflow.Task("t2", script=["a", "b"])
+            pyflow.Task("t3", triggers=f.YMD.julian > 3, inlimits=limit)
+        # Families triggered by the next one make a long chain of references
+        families = [pyflow.Family("g{}".format(i)) for i in range(2000)]
+        for family, following in zip(families, families[1:]):
+            family.triggers = following.complete
+    path = str(tmpdir.join("suite.snapshot"))
+    pyflow.save_snapshot(s, path)
+    loaded = pyflow.load_snapshot(path)
+
+    assert loaded is not s
+    assert str(loaded.ecflow_definition()) == str(s.ecflow_definition())
+    assert loaded.f.t1.parent is loaded.f
+    assert loaded.host.ecflow_path == s.host.ecflow_path
+    assert loaded.f.t2.script.generate_stub() == s.f.t2.script.generate_stub()
+    assert loaded.g0.triggers.value.generate_expression(loaded.g0) == "g1 eq complete"
+
+
+def test_snapshot_expression_identity():
+    with pyflow.Suite("s", host=pyflow.LocalHost()) as s:
+        with pyflow.Family("f") as f:
+            pyflow.RepeatDate("YMD", 20200101, 20200131)
+            t1 = pyflow.Task("t1", events=["go"])
+            pyflow.Task("t2", triggers=t1.complete & t1.go)
+            pyflow.Task("t3", triggers=t1.complete | (f.YMD.julian > 3))
+    f = io.BytesIO()
+    pyflow.save_snapshot(s, f)
+    f.seek(0)
+    loaded = pyflow.load_snapshot(f)
+
+    # Shared subexpressions stay shared, and refer to the loaded nodes
+    t2 = loaded.f.t2.triggers.value
+    t3 = loaded.f.t3.triggers.value
+    assert t2._operands[0] is t3._operands[0]
+    assert t2._operands[0]._left._node is loaded.f.t1
+    assert t2._operands[0]._right is s.f.t1.complete._right
+    assert loaded.f.t1.complete.generate_expression(loaded.f.t2) == "t1 eq complete"
+
+    # Loaded expressions are interned, like the ones built afterwards
+    assert loaded.f.t1.complete is t2._operands[0]
+    assert (loaded.f.t1.complete & loaded.f.t1.go) is t2
+    assert (loaded.f.YMD.julian > 3) is t3._operands[1]
+
+
+def test_snapshot_errors():
+    with pytest.raises(pyflow.SnapshotError):
+        pyflow.load_snapshot(io.BytesIO(b"suite s\nendsuite\n"))
@@ -1,9 +1,12 @@
 import datetime
+import itertools
+import os
 
 import pytest
 
 from pyflow import Family, Suite, Task
 from pyflow.base import GenerateError
+from pyflow.expressions import generation_cache
 
 
 def test_suite():
@@ -210,6 +213,40 @@ def test_generate_error(child):
         s.generate_node()
 
 
+def test_relative_paths():
+    """
+    Relative paths, with or without the generation cache, match os.path.relpath.
+    """
+
+    with Suite("s") as s:
+        with Family("a"):
+            with Family("b"):
+                Task("t1")
+                with Family("1c"):
+                    Task("t2")
+            Task("t3")
+        Task("t4")
+    with Suite("other") as other:
+        Task("t5")
+
+    nodes = [s.a, s.a.b, s.a.b.t1, s.a.b["1c"], s.a.b["1c"].t2, s.a.t3, s.t4, other.t5]
+
+    def expected(node, context):
+        if node.suite is not context.suite:
+            return node.fullname
+        f = os.path.relpath(node.fullname, context.parent.fullname)
+        return "./" + f if f[0].isdigit() else f
+
+    for node, context in itertools.product(nodes, nodes):
+        assert node.relative_path(context) == expected(node, context)
+        with generation_cache():
+            assert node.relative_path(context) == expected(node, context)
+            assert node.relative_path(context) == expected(node, context)
+
+    with pytest.raises(RuntimeError):
+        s.t4.relative_path(s)
+
+
 if __name__ == "__main__":
     from os import path
 